@@ -0,0 +1,134 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Columns the Python fallback needs; never select text_content for analytics
+ANALYTICS_COLUMNS = "code, content_type, file_name, view_count, created_at"
+
+
+def _rpc_object(client: Any, fn: str, params: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    try:
+        resp = client.rpc(fn, params).execute()
+    except Exception as e:
+        return None, str(e)
+    data = getattr(resp, "data", None)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if not isinstance(data, dict):
+        return None, f"{fn} returned no data"
+    return data, None
+
+
+def empty_views_by_date(days: int = 30) -> Dict[str, int]:
+    now = datetime.now(timezone.utc)
+    return {(now - timedelta(days=i)).strftime("%Y-%m-%d"): 0 for i in range(days)}
+
+
+def summarize_shares(rows: List[Dict[str, Any]], top_n: int = 5, recent_days: int = 7, history_days: int = 30) -> Dict[str, Any]:
+    """Python fallback for get_user_share_analytics over projected share rows."""
+    total_views = sum(int(row.get("view_count") or 0) for row in rows)
+
+    content_types: Dict[str, int] = {}
+    for row in rows:
+        ct = row.get("content_type") or "unknown"
+        content_types[ct] = content_types.get(ct, 0) + 1
+
+    top = sorted(rows, key=lambda x: int(x.get("view_count") or 0), reverse=True)[:top_n]
+    top_shares = [
+        {
+            "code": share.get("code"),
+            "views": int(share.get("view_count") or 0),
+            "type": share.get("content_type"),
+            "name": share.get("file_name") or "Text Share",
+        }
+        for share in top
+    ]
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=recent_days)
+    recent = 0
+    for row in rows:
+        try:
+            created = datetime.fromisoformat(str(row.get("created_at", "")).replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        if created > cutoff:
+            recent += 1
+
+    return {
+        "total_shares": len(rows),
+        "total_views": total_views,
+        "recent_shares": recent,
+        "content_types": content_types,
+        # Views per day need the activities table, which only the RPC reads
+        "views_by_date": empty_views_by_date(history_days),
+        "top_shares": top_shares,
+    }
+
+
+def fetch_user_stats(client: Any, user_id: str) -> Tuple[Optional[Dict[str, int]], Optional[str]]:
+    """Return ({total_shares, total_views}, error) aggregated in the database.
+
+    Falls back to an exact count plus a view_count-only projection when the
+    get_user_share_stats RPC is not deployed.
+    """
+    data, rpc_err = _rpc_object(client, "get_user_share_stats", {"p_user_id": user_id})
+    if data is not None:
+        return {"total_shares": int(data.get("total_shares") or 0), "total_views": int(data.get("total_views") or 0)}, None
+
+    logger.debug(f"get_user_share_stats unavailable, aggregating in Python: {rpc_err}")
+    try:
+        resp = client.table("shares").select("view_count", count="exact").eq("user_id", user_id).execute()
+    except Exception as e:
+        return None, str(e)
+    rows = getattr(resp, "data", None) or []
+    total_shares = getattr(resp, "count", None)
+    if total_shares is None:
+        total_shares = len(rows)
+    total_views = 0
+    for row in rows:
+        try:
+            total_views += int(row.get("view_count") or 0)
+        except (TypeError, ValueError):
+            continue
+    return {"total_shares": int(total_shares), "total_views": total_views}, None
+
+
+def fetch_user_analytics(
+    client: Any,
+    user_id: str,
+    top_n: int = 5,
+    recent_days: int = 7,
+    history_days: int = 30,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Return (analytics, error) for a user in one round trip when possible.
+
+    Uses the get_user_share_analytics RPC (totals, grouped counts, top-N,
+    windowed counts and views per day from activities); falls back to
+    summarizing projected rows in Python.
+    """
+    params = {"p_user_id": user_id, "p_top_n": top_n, "p_recent_days": recent_days, "p_history_days": history_days}
+    data, rpc_err = _rpc_object(client, "get_user_share_analytics", params)
+    if data is None:
+        logger.debug(f"get_user_share_analytics unavailable, aggregating in Python: {rpc_err}")
+        try:
+            resp = client.table("shares").select(ANALYTICS_COLUMNS).eq("user_id", user_id).execute()
+        except Exception as e:
+            return None, str(e)
+        data = summarize_shares(getattr(resp, "data", None) or [], top_n, recent_days, history_days)
+
+    total_shares = int(data.get("total_shares") or 0)
+    total_views = int(data.get("total_views") or 0)
+    return {
+        "total_shares": total_shares,
+        "total_views": total_views,
+        "avg_views": round(total_views / total_shares, 2) if total_shares > 0 else 0,
+        "recent_shares": int(data.get("recent_shares") or 0),
+        "content_types": data.get("content_types") or {},
+        "views_by_date": data.get("views_by_date") or empty_views_by_date(history_days),
+        "top_shares": data.get("top_shares") or [],
+    }, None
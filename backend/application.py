@@ -1,7 +1,14 @@
+import io
 import os
+import json
 import time
+import hashlib
+import hmac
 import logging
-from flask import Flask, jsonify, request, Response, make_response
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import Flask, g, jsonify, request, Response, make_response, redirect
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -10,9 +17,50 @@ try:
 except Exception:  # pragma: no cover - optional import for docs
     Swagger = None  # type: ignore
 
-from config import Config
-from supabase_client import connection_report, create_client, rpc_get_share_by_code
-from werkzeug.security import generate_password_hash, check_password_hash
+from analytics import fetch_user_analytics, fetch_user_stats
+from auth_tokens import configure_token_verifier, forget_access_token, token_cache_stats, verify_access_token
+from compression import apply_etag, compress_response
+from config import DEFAULT_SECRET_KEY, Config
+from file_proxy import open_upstream, stream_response
+from health import HealthProber
+from janitor import ShareJanitor
+from negative_cache import NegativeLookupCache
+from metrics import RATE_LIMITED, REQUEST_LATENCY, REQUESTS, registry as metrics_registry, stats_collector
+from pagination import keyset_query, page_params, split_page
+from rate_limits import limiter_options
+from serializers import (
+    SHARE_CONTENT_FIELDS,
+    SHARE_CREATED_FIELDS,
+    SHARE_DETAIL_FIELDS,
+    SHARE_LIST_FIELDS,
+    serialize,
+    share_summary,
+    share_version,
+)
+from share_access import ShareAccessTokens, cookie_name, hash_method_prefix, hash_share_password, needs_rehash
+from share_cache import ShareCache, ViewCounter, backend_from_url, is_servable
+from share_codes import CodeAllocator, is_code_conflict
+from uploads import UploadError, UploadSpool, sha256_stream, tus_upload
+from supabase_client import (
+    client_pool_stats,
+    configure_client_pool,
+    connection_report,
+    create_client,
+    discard_client,
+    get_client,
+    rpc_get_share_by_code,
+    rpc_claim_storage_object,
+    rpc_increment_share_views,
+    rpc_mark_storage_object_ready,
+    rpc_open_share,
+    rpc_release_storage_object,
+    rpc_view_share,
+    rpc_view_shares,
+    share_lookup_rpc,
+    signed_url_from_response,
+    SignedUrlCache,
+)
+from werkzeug.security import check_password_hash
 
 
 # Logging
@@ -27,6 +75,156 @@ logger = logging.getLogger(__name__)
 application = Flask(__name__)
 application.config.from_object(Config)
 
+# Reuse Supabase clients (and their keep-alive connections) across requests
+configure_client_pool(
+    pool_size=Config.SUPABASE_POOL_SIZE,
+    timeout=Config.SUPABASE_HTTP_TIMEOUT,
+    storage_timeout=Config.SUPABASE_STORAGE_TIMEOUT,
+    max_connections=Config.SUPABASE_MAX_CONNECTIONS,
+    max_keepalive=Config.SUPABASE_MAX_KEEPALIVE,
+)
+
+# Verify Supabase access tokens locally instead of calling GoTrue per request
+configure_token_verifier(
+    supabase_url=Config.SUPABASE_URL,
+    jwt_secret=Config.SUPABASE_JWT_SECRET,
+    audience=Config.SUPABASE_JWT_AUDIENCE,
+    cache_size=Config.AUTH_TOKEN_CACHE_SIZE,
+    cache_ttl=Config.AUTH_TOKEN_CACHE_TTL,
+    jwks_ttl=Config.SUPABASE_JWKS_TTL,
+)
+
+# Read-through cache for share rows, with view counts written behind in batches
+share_cache = ShareCache(
+    backend=backend_from_url(Config.SHARE_CACHE_URL, maxsize=Config.SHARE_CACHE_SIZE, ttl=Config.SHARE_CACHE_TTL),
+    ttl=Config.SHARE_CACHE_TTL,
+)
+
+
+def _flush_share_views(deltas: dict) -> None:
+    client, err = get_client()
+    if err or client is None:
+        raise RuntimeError(err or "Failed to create Supabase client")
+    _, rpc_err = rpc_increment_share_views(client, deltas)
+    if rpc_err:
+        raise RuntimeError(rpc_err)
+
+
+def _apply_flushed_views(deltas: dict) -> None:
+    for share_code, delta in deltas.items():
+        share_cache.add_views(share_code, delta)
+
+
+view_counter = ViewCounter(
+    _flush_share_views,
+    interval=Config.SHARE_VIEW_FLUSH_INTERVAL,
+    batch_size=Config.SHARE_VIEW_FLUSH_BATCH,
+    on_flushed=_apply_flushed_views,
+)
+
+# Unknown share codes are answered from memory instead of several Supabase lookups
+missing_codes = NegativeLookupCache(
+    get_client,
+    ttl=Config.SHARE_MISS_CACHE_TTL,
+    maxsize=Config.SHARE_MISS_CACHE_SIZE,
+    bloom_capacity=Config.SHARE_CODE_BLOOM_CAPACITY,
+    bloom_error_rate=Config.SHARE_CODE_BLOOM_ERROR_RATE,
+    rebuild_interval=Config.SHARE_CODE_BLOOM_REBUILD,
+    sync_interval=Config.SHARE_CODE_BLOOM_SYNC_INTERVAL,
+)
+missing_codes.start()
+
+# Signed URLs for private storage objects, shared by fetch_file requests
+signed_urls = SignedUrlCache(
+    expires_in=Config.SIGNED_URL_EXPIRES_IN,
+    refresh_margin=Config.SIGNED_URL_REFRESH_MARGIN,
+)
+
+
+def _taken_share_codes(codes) -> set:
+    client, err = get_client()
+    if err or client is None:
+        raise RuntimeError(err or "Failed to create Supabase client")
+    resp = client.table("shares").select("code").in_("code", list(codes)).execute()
+    return {row.get("code") for row in (getattr(resp, "data", None) or [])}
+
+
+# CSPRNG share codes, optionally drawn from a reserve already checked against the table
+code_allocator = CodeAllocator(
+    length=Config.CODE_LENGTH,
+    pool_size=Config.CODE_POOL_SIZE,
+    taken_fn=_taken_share_codes,
+)
+
+# Signed tokens that let a protected share be re-read without re-hashing its password
+# (disabled while SECRET_KEY is the public default, which would let anyone forge them)
+if Config.SECRET_KEY == DEFAULT_SECRET_KEY:
+    logger.warning("SECRET_KEY is not set; share access tokens are disabled")
+    share_tokens = ShareAccessTokens(Config.SECRET_KEY, ttl=0)
+else:
+    share_tokens = ShareAccessTokens(Config.SECRET_KEY, ttl=Config.SHARE_ACCESS_TOKEN_TTL)
+
+# Resolve PASSWORD_HASH_METHOD to werkzeug's canonical prefix once, so a bad
+# value fails at startup and rehash checks never pay for a sample hash
+if Config.PASSWORD_HASH_METHOD:
+    hash_method_prefix(Config.PASSWORD_HASH_METHOD)
+
+# Spool directory for chunked, resumable uploads
+upload_spool = UploadSpool(
+    directory=Config.UPLOAD_SPOOL_DIR,
+    max_size=Config.UPLOAD_MAX_FILE_SIZE,
+    ttl=Config.UPLOAD_SESSION_TTL,
+    max_total=Config.UPLOAD_SPOOL_MAX_BYTES,
+    max_per_client=Config.UPLOAD_MAX_SESSIONS_PER_CLIENT,
+)
+
+
+def _forget_purged_shares(codes) -> None:
+    for share_code in codes:
+        share_cache.invalidate(share_code)
+
+
+def _discover_rpc_signatures() -> None:
+    client, err = get_client()
+    if err or client is None:
+        logger.info(f"Skipping RPC discovery until Supabase is reachable: {err}")
+        return
+    if share_lookup_rpc.resolve(client):
+        logger.info(f"Share lookups use {share_lookup_rpc.stats()['path']}")
+    else:
+        logger.warning(f"get_share_by_code unavailable, share lookups use a direct select: {share_lookup_rpc.last_error}")
+
+
+# Work out the get_share_by_code signature now rather than on the first share view
+threading.Thread(target=_discover_rpc_signatures, name="rpc-discovery", daemon=True).start()
+
+
+# Background purge of expired/exhausted shares and their storage objects
+janitor = ShareJanitor(
+    get_client,
+    batch_size=Config.JANITOR_BATCH_SIZE,
+    max_batches=Config.JANITOR_MAX_BATCHES,
+    storage_batch=Config.JANITOR_STORAGE_BATCH,
+    interval=Config.JANITOR_INTERVAL,
+    archive=Config.JANITOR_ARCHIVE,
+    include_inactive=Config.JANITOR_PURGE_INACTIVE,
+    on_purged=_forget_purged_shares,
+)
+janitor.start()
+
+# Cache effectiveness for /metrics, read from the existing stats() counters
+metrics_registry.add_collector(stats_collector(
+    "cache",
+    "Read-through cache counters",
+    lambda: {
+        "share": share_cache.stats(),
+        "access_token": token_cache_stats(),
+        "signed_url": signed_urls.stats(),
+        "supabase_client": client_pool_stats(),
+    },
+    ("hits", "misses", "hit_ratio", "size"),
+))
+
 # CORS: explicitly allow common dev origins (including port 8080 and 8081)
 _origins = set(application.config.get("CORS_ORIGINS", []))
 _origins.update({
@@ -44,9 +242,12 @@ cors.init_app(application, resources={
     r"/api/*": {
         "origins": list(_origins),
         "methods": ["GET", "POST", "OPTIONS", "PUT", "DELETE"],
-        "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
+        "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Range", "Upload-Offset", "X-Share-Token"],
         "supports_credentials": True,
-        "expose_headers": ["Content-Type", "Content-Length", "Authorization"],
+        "expose_headers": [
+            "Content-Type", "Content-Length", "Authorization",
+            "Content-Range", "Accept-Ranges", "ETag", "Last-Modified",
+        ],
         "max_age": 600  # Cache preflight response for 10 minutes
     }
 })
@@ -56,29 +257,56 @@ limiter = Limiter(
     app=application,
     key_func=get_remote_address,  # Rate limit by IP address
     default_limits=["200 per day", "50 per hour"],  # Global limits
-    storage_uri="memory://",  # Use in-memory storage (upgrade to Redis for production)
-    strategy="fixed-window",  # Count requests in fixed time windows
+    **limiter_options(Config),  # Shared storage and strategy from RATELIMIT_* settings
 )
 
 # Add custom error handler for rate limit exceeded
 @application.errorhandler(429)
 def ratelimit_handler(e):
+    RATE_LIMITED.inc(endpoint=request.endpoint or "unmatched")
     return jsonify({
         "error": "Rate limit exceeded",
         "message": "Too many requests. Please try again later.",
         "retry_after": e.description
     }), 429
 
+@application.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@application.after_request
+def record_request_metrics(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method)
+        REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
 @application.before_request
 def handle_preflight():
     if request.method == "OPTIONS":
         response = make_response()
         response.headers.add('Access-Control-Allow-Origin', request.headers.get('Origin', '*'))
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Range,Upload-Offset,X-Share-Token')
         response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS,PUT,DELETE')
         response.headers.add('Access-Control-Allow-Credentials', 'true')
         return response
 
+
+@application.after_request
+def finalize_response(response):
+    # Conditional GET first (on the identity body), then negotiated compression
+    if Config.RESPONSE_ETAGS:
+        response = apply_etag(request, response)
+    return compress_response(
+        request, response,
+        min_size=Config.RESPONSE_COMPRESSION_MIN_SIZE,
+        level=Config.RESPONSE_COMPRESSION_LEVEL,
+    )
+
 # Swagger UI at /docs (optional)
 if Swagger is not None:
     # Basic template metadata
@@ -125,16 +353,76 @@ def health():
     return jsonify({"status": "healthy"}), 200
 
 
-@application.route("/supabase/health")
-def supabase_health():
+def _probe_supabase() -> dict:
     report = connection_report()
     ok = bool(report.get("auth", {}).get("ok")) and (
         (not report.get("configured")) or report.get("client_created")
     )
     report["status"] = "ok" if ok else "degraded"
+    return report
+
+
+# Upstream checks run in the background; health endpoints read the snapshot
+health_prober = HealthProber(
+    _probe_supabase,
+    interval=Config.HEALTH_PROBE_INTERVAL,
+    stale_after=Config.HEALTH_STALE_AFTER,
+)
+health_prober.start()
+
+
+@application.route("/health/live")
+@limiter.exempt
+def liveness():
+    """Process is up and serving; no upstream calls."""
+    return jsonify({"status": "alive"}), 200
+
+
+@application.route("/health/ready")
+@limiter.exempt
+def readiness():
+    """Ready while the process serves and the background probe runs.
+
+    Supabase's state is reported under "upstream" without failing the check,
+    so an upstream blip does not mark every instance unhealthy at once.
+    """
+    ready, detail = health_prober.ready()
+    return jsonify(detail), (200 if ready else 503)
+
+
+@application.route("/supabase/health")
+def supabase_health():
+    """Cached upstream report (see age_seconds) plus this worker's local stats."""
+    report, age = health_prober.snapshot()
+    report["age_seconds"] = age
+    report["prober"] = health_prober.stats()
+    report["client_pool"] = client_pool_stats()
+    report["token_cache"] = token_cache_stats()
+    report["share_lookup"] = share_lookup_rpc.stats()
+    report["share_cache"] = share_cache.stats()
+    report["missing_codes"] = missing_codes.stats()
+    report["view_counter"] = view_counter.stats()
+    report["signed_urls"] = signed_urls.stats()
+    report["share_codes"] = code_allocator.stats()
+    report["share_tokens"] = share_tokens.stats()
+    report["janitor"] = janitor.stats()
     return jsonify(report), 200
 
 
+@application.route("/metrics", methods=["GET"])
+@limiter.exempt
+def metrics():
+    """Prometheus text exposition of this worker's request, upstream and cache metrics.
+
+    Off (404) unless METRICS_TOKEN is configured; scrapers must present it.
+    """
+    if not Config.METRICS_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {Config.METRICS_TOKEN}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+
 @application.route("/api/auth/login", methods=["POST"])
 @limiter.limit("5 per minute")  # Strict limit to prevent brute force attacks
 def auth_login():
@@ -146,6 +434,7 @@ def auth_login():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
         
+    # Fresh client: signing in stores the session on the client, so never use a pooled one
     client, err = create_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
@@ -181,6 +470,7 @@ def auth_signup():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
         
+    # Fresh client: signing up stores the session on the client, so never use a pooled one
     client, err = create_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
@@ -216,6 +506,7 @@ def auth_logout():
         return jsonify({"message": "Logged out"}), 200
         
     token = auth_header.split(" ", 1)[1].strip()
+    forget_access_token(token)
     
     client, err = create_client()
     if err or client is None:
@@ -238,29 +529,39 @@ def auth_user():
         
     token = auth_header.split(" ", 1)[1].strip()
     
-    client, err = create_client()
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
         
-    try:
-        uresp = client.auth.get_user(token)
-        user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
-        user_id = getattr(user_obj, "id", None) or (user_obj.get("id") if isinstance(user_obj, dict) else None)
-        email = getattr(user_obj, "email", None) or (user_obj.get("email") if isinstance(user_obj, dict) else None)
-        
-        return jsonify({
-            "user": {
-                "id": user_id,
-                "email": email
-            }
-        }), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 401
+    user = verify_access_token(client, token)
+    if not user:
+        return jsonify({"error": "Invalid token"}), 401
+
+    return jsonify({
+        "user": {
+            "id": user.get("id"),
+            "email": user.get("email")
+        }
+    }), 200
 
 
-def _generate_code(length: int = 6) -> str:
-    import random, string
-    return ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(length))
+def _generate_code() -> str:
+    return code_allocator.allocate()
+
+
+def _share_expiry(raw_hours):
+    """Return (expires_at ISO timestamp, error) for a requested lifetime in hours.
+
+    Defaults to DEFAULT_EXPIRY_HOURS and is capped at MAX_EXPIRY_HOURS.
+    """
+    try:
+        hours = float(raw_hours) if raw_hours not in (None, "") else float(Config.DEFAULT_EXPIRY_HOURS)
+    except (TypeError, ValueError):
+        return None, "expires_in_hours must be a number"
+    if hours <= 0:
+        return None, "expires_in_hours must be positive"
+    hours = min(hours, float(Config.MAX_EXPIRY_HOURS))
+    return (datetime.now(timezone.utc) + timedelta(hours=hours)).isoformat(), None
 
 
 # Dangerous file extensions that should never be allowed
@@ -318,6 +619,147 @@ def validate_file_extension(filename: str) -> tuple[bool, str]:
     return True, "Valid"
 
 
+def _store_object(client, storage, bucket: str, path: str, source, size: int, upsert: bool = False) -> None:
+    """Write one object to storage; raises on failure.
+
+    Streams larger than STORAGE_RESUMABLE_THRESHOLD go through the TUS
+    resumable endpoint in fixed-size chunks so no single request has to
+    carry the whole file within SUPABASE_STORAGE_TIMEOUT.
+    """
+    storage_url = getattr(client, "storage_url", None)
+    key = getattr(client, "supabase_key", None)
+    if storage_url and key and not isinstance(source, bytes) and size > Config.STORAGE_RESUMABLE_THRESHOLD:
+        endpoint = f"{str(storage_url).rstrip('/')}/upload/resumable"
+        tus_upload(endpoint, key, bucket, path, source, size, upsert=upsert, timeout=Config.SUPABASE_STORAGE_TIMEOUT)
+        return
+    body = source if isinstance(source, (bytes, io.BufferedReader)) else source.read()
+    up_resp = storage.upload(path, body, {"upsert": "true"}) if upsert else storage.upload(path, body)
+    # Check for error in response if dict-like
+    if isinstance(up_resp, dict) and up_resp.get("error"):
+        raise RuntimeError(up_resp.get("error"))
+
+
+def _upload_share_file(client, code: str, filename: str, source, size: int) -> dict:
+    """Upload file content to the shared-files bucket and work out how to serve it.
+
+    `source` is the file bytes or a seekable binary stream; streams are only
+    read into the request when they have to be uploaded. With UPLOAD_DEDUP the
+    content is hashed first and stored once per SHA-256 digest, so a repeat
+    upload only registers another reference to the existing object.
+    Returns the file_info dict stored on the share row; raises on upload failure.
+    """
+    name = filename
+    ext = (name.rsplit('.', 1)[-1] if '.' in name else 'bin')
+    path = f"{code}-{int(time.time())}.{ext}"
+    bucket = "shared-files"
+    storage = client.storage.from_(bucket)
+
+    digest = None
+    needs_upload = True
+    overwrite = False
+    if Config.UPLOAD_DEDUP:
+        content_hash = hashlib.sha256(source).hexdigest() if isinstance(source, bytes) else sha256_stream(source)
+        claim, claim_err = rpc_claim_storage_object(client, content_hash, bucket, f"sha256/{content_hash}.{ext}", size)
+        if claim_err:
+            # storage_objects not deployed: fall back to one object per upload
+            logger.debug(f"Content dedup unavailable: {claim_err}")
+        else:
+            digest = content_hash
+            bucket = claim.get("bucket") or bucket
+            path = claim.get("path")
+            # Registered by another upload that has not reached storage yet:
+            # write the same bytes ourselves rather than point at nothing
+            overwrite = not claim.get("created") and claim.get("ready") is False
+            needs_upload = bool(claim.get("created")) or overwrite
+            storage = client.storage.from_(bucket)
+
+    if needs_upload:
+        try:
+            _store_object(client, storage, bucket, path, source, size, upsert=overwrite)
+        except Exception as e:
+            # A content-addressed object left behind by an earlier attempt is still valid
+            if not (digest and "already exists" in str(e).lower()):
+                if digest:
+                    rpc_release_storage_object(client, digest)
+                raise
+        if digest:
+            _, ready_err = rpc_mark_storage_object_ready(client, digest)
+            if ready_err:
+                logger.debug(f"Could not mark {path} ready: {ready_err}")
+    else:
+        logger.info(f"Reusing stored object {path} for duplicate upload {name}")
+
+    # Try to get public URL
+    pub = storage.get_public_url(path)
+    public_url = None
+    # Normalize response shapes: dict with data.public_url/publicUrl or attributes
+    if isinstance(pub, dict):
+        data_obj = pub.get("data") or pub
+        public_url = (
+            data_obj.get("publicUrl")
+            or data_obj.get("public_url")
+            or data_obj.get("signedUrl")
+            or data_obj.get("signed_url")
+        )
+    else:
+        data_obj = getattr(pub, "data", None) or {}
+        public_url = (
+            (data_obj.get("publicUrl") if isinstance(data_obj, dict) else None)
+            or (data_obj.get("public_url") if isinstance(data_obj, dict) else None)
+            or (data_obj.get("signedUrl") if isinstance(data_obj, dict) else None)
+            or (data_obj.get("signed_url") if isinstance(data_obj, dict) else None)
+        )
+
+    # Fallback to signed URL if no public URL is available (e.g., private bucket)
+    if not public_url:
+        try:
+            signed = storage.create_signed_url(path, 24 * 3600)
+            public_url = signed_url_from_response(signed)
+        except Exception as e:
+            logger.warning(f"Failed to create signed URL: {e}")
+
+    # If we still don't have a URL, we'll use our backend proxy with the storage path
+    if not public_url:
+        logger.warning(f"No public URL available for {path}, will use backend proxy")
+        # Store the path for backend proxy access
+        public_url = f"proxy:{bucket}/{path}"
+
+    return {"url": public_url, "name": name, "size": size, "path": path, "bucket": bucket, "digest": digest}
+
+
+def _insert_share(client, payload: dict, generated_code: bool = False):
+    """Insert a shares row; returns an error response tuple, or None on success.
+
+    When the code was generated rather than chosen by the caller, a collision
+    on shares.code is retried with a fresh code and payload["code"] is updated.
+    """
+    attempts = max(1, Config.CODE_ALLOCATION_ATTEMPTS) if generated_code else 1
+    error: Exception = RuntimeError("Insert not attempted")
+    for attempt in range(attempts):
+        try:
+            client.table("shares").insert(payload).execute()
+            missing_codes.add(payload["code"])
+            return None
+        except Exception as e:
+            error = e
+        if not is_code_conflict(error):
+            break
+        if attempt + 1 < attempts:
+            logger.info(f"Share code {payload['code']} already taken, retrying with a new code")
+            payload["code"] = _generate_code()
+
+    discard_client(client, error)
+    if payload.get("content_digest"):
+        rpc_release_storage_object(client, payload["content_digest"])
+    msg = str(error)
+    if is_code_conflict(error):
+        return jsonify({"error": "Share code already in use"}), 409
+    if "row level security" in msg.lower() or "42501" in msg:
+        return jsonify({"error": "Insert blocked by RLS; ensure service role key is used on the backend and policies permit insert."}), 403
+    if "401" in msg or "unauthorized" in msg.lower():
+        return jsonify({"error": "Unauthorized to insert; check SUPABASE_SERVICE_ROLE_KEY is set and valid."}), 401
+    return jsonify({"error": f"Failed to create share: {msg}"}), 500
+
 
 @application.route("/api/shares", methods=["POST"])
 @limiter.limit("10 per minute")  # Prevent share spam
@@ -363,7 +805,7 @@ def create_share():
       - text: optional text content
     Or JSON body with { text: string }
     """
-    client, err = create_client()
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
 
@@ -372,30 +814,17 @@ def create_share():
     user_id = None
     if auth_header.startswith("Bearer "):
         token = auth_header.split(" ", 1)[1].strip()
-        try:
-            # supabase-py v2 exposes auth.get_user(jwt)
-            uresp = client.auth.get_user(token)  # type: ignore[attr-defined]
-            user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
-            user_id = getattr(user_obj, "id", None) or (user_obj.get("id") if isinstance(user_obj, dict) else None)
-        except Exception as e:
-            logger.warning(f"Failed to resolve user from token: {e}")
-
-    code = None
-    text_content = None
-    file_info = {"url": None, "name": None, "size": None, "path": None, "bucket": None}
-    had_file = False
-    is_protected = False
-    password_hash = None
-    language = None
+        user = verify_access_token(client, token)
+        user_id = user.get("id") if user else None
+
+    file_info = None
     metadata: dict = {}
 
     if request.content_type and request.content_type.startswith("multipart/form-data"):
-        code = request.form.get("code") or _generate_code()
+        requested_code = request.form.get("code")
+        code = requested_code or _generate_code()
         text_content = (request.form.get("text") or "").strip() or None
-        raw_password = (request.form.get("password") or "").strip()
-        if raw_password:
-            is_protected = True
-            password_hash = generate_password_hash(raw_password)
+        password = (request.form.get("password") or "").strip()
         raw_metadata = (request.form.get("metadata") or "").strip()
         if raw_metadata:
             try:
@@ -403,11 +832,12 @@ def create_share():
                 metadata = _json.loads(raw_metadata)
             except Exception:
                 metadata = {}
+        expires_at, expiry_err = _share_expiry(request.form.get("expires_in_hours"))
+        if expiry_err:
+            return jsonify({"error": expiry_err}), 400
 
         uploaded = request.files.get("file")
         if uploaded and (uploaded.filename or uploaded.content_length):
-            had_file = True
-            
             # Validate file extension first (security check)
             filename = uploaded.filename or f"upload-{int(time.time())}"
             is_valid, error_msg = validate_file_extension(filename)
@@ -421,174 +851,778 @@ def create_share():
             if size > application.config.get("MAX_FILE_SIZE", 10 * 1024 * 1024):
                 return jsonify({"error": "File too large"}), 400
 
-            # Build path and upload
-            name = filename
-            ext = (name.rsplit('.', 1)[-1] if '.' in name else 'bin')
-            path = f"{code}-{int(time.time())}.{ext}"
-            bucket = "shared-files"
             try:
-                storage = client.storage.from_(bucket)
-                up_resp = storage.upload(path, uploaded.read())
-                # Check for error in response if dict-like
-                if isinstance(up_resp, dict) and up_resp.get("error"):
-                    return jsonify({"error": f"Upload failed: {up_resp.get('error')}"}), 500
-
-                # Try to get public URL
-                pub = storage.get_public_url(path)
-                public_url = None
-                # Normalize response shapes: dict with data.public_url/publicUrl or attributes
-                if isinstance(pub, dict):
-                    data_obj = pub.get("data") or pub
-                    public_url = (
-                        data_obj.get("publicUrl")
-                        or data_obj.get("public_url")
-                        or data_obj.get("signedUrl")
-                        or data_obj.get("signed_url")
-                    )
-                else:
-                    data_obj = getattr(pub, "data", None) or {}
-                    public_url = (
-                        (data_obj.get("publicUrl") if isinstance(data_obj, dict) else None)
-                        or (data_obj.get("public_url") if isinstance(data_obj, dict) else None)
-                        or (data_obj.get("signedUrl") if isinstance(data_obj, dict) else None)
-                        or (data_obj.get("signed_url") if isinstance(data_obj, dict) else None)
-                    )
-
-                # Fallback to signed URL if no public URL is available (e.g., private bucket)
-                if not public_url:
-                    try:
-                        signed = storage.create_signed_url(path, 24 * 3600)
-                        if isinstance(signed, dict):
-                            sdata = signed.get("data") or signed
-                            public_url = sdata.get("signedUrl") or sdata.get("signed_url")
-                        else:
-                            sdata = getattr(signed, "data", None) or {}
-                            if isinstance(sdata, dict):
-                                public_url = sdata.get("signedUrl") or sdata.get("signed_url")
-                    except Exception as e:
-                        logger.warning(f"Failed to create signed URL: {e}")
-
-                # If we still don't have a URL, we'll use our backend proxy with the storage path
-                if not public_url:
-                    logger.warning(f"No public URL available for {path}, will use backend proxy")
-                    # Store the path for backend proxy access
-                    public_url = f"proxy:{bucket}/{path}"
-
-                file_info = {"url": public_url, "name": name, "size": size, "path": path, "bucket": bucket}
+                file_info = _upload_share_file(client, code, filename, uploaded.stream, size)
             except Exception as e:
+                discard_client(client, e)
                 return jsonify({"error": f"Upload failed: {e}"}), 500
     else:
         body = request.get_json(silent=True) or {}
-        code = body.get("code") or _generate_code()
+        requested_code = body.get("code")
+        code = requested_code or _generate_code()
         text_content = (body.get("text") or "").strip() or None
-        raw_password = (body.get("password") or "").strip()
-        if raw_password:
-            is_protected = True
-            password_hash = generate_password_hash(raw_password)
+        password = (body.get("password") or "").strip()
         metadata = body.get("metadata") or {}
+        expires_at, expiry_err = _share_expiry(body.get("expires_in_hours"))
+        if expiry_err:
+            return jsonify({"error": expiry_err}), 400
 
-    # Mark as file when a file was provided, regardless of URL visibility
-    content_type = "file" if had_file else "text"
+    # Insert into shares table
+    payload = _share_payload(code, text_content, file_info, password, metadata, expires_at, user_id)
+    insert_error = _insert_share(client, payload, generated_code=not requested_code)
+    if insert_error:
+        return insert_error
+    return jsonify(serialize(payload, SHARE_CREATED_FIELDS)), 201
+
+
+def _share_payload(code, text_content, file_info, password, metadata, expires_at, user_id=None) -> dict:
+    """shares row for a new text or file share (password is hashed here)."""
+    file_info = file_info or {}
+    metadata = metadata if isinstance(metadata, dict) else {}
+    password_hash = hash_share_password(password, Config.PASSWORD_HASH_METHOD) if password else None
+    payload = {
+        "code": code,
+        "content_type": "file" if file_info.get("name") else "text",
+        "text_content": text_content,
+        "file_name": file_info.get("name"),
+        "file_size": file_info.get("size"),
+        "file_url": file_info.get("url"),
+        "is_protected": bool(password_hash),
+        "password_hash": password_hash,
+        "language": metadata.get("language"),
+        "metadata": metadata,
+        "expires_at": expires_at,
+    }
+    if user_id:
+        payload["user_id"] = user_id
+    if file_info.get("digest"):
+        payload["content_digest"] = file_info["digest"]
+    return payload
+
+
+def _bulk_items():
+    """Read bulk-create items from a multipart request or a JSON manifest.
 
-    # Extract language from metadata if present (for code/text shares)
+    Returns (items, defaults) where each item is a dict with optional text,
+    file (a FileStorage), code, password, metadata and expires_in_hours, and
+    defaults holds request-level values for the same options; raises ValueError.
+    """
+    if request.content_type and request.content_type.startswith("multipart/form-data"):
+        form = request.form
+        defaults = {key: form.get(key) for key in ("password", "expires_in_hours") if form.get(key)}
+        if form.get("metadata"):
+            try:
+                defaults["metadata"] = json.loads(form["metadata"])
+            except ValueError:
+                raise ValueError("metadata must be JSON")
+        uploads = [f for field in request.files for f in request.files.getlist(field) if f and f.filename]
+        if form.get("manifest"):
+            try:
+                manifest = json.loads(form["manifest"])
+            except ValueError:
+                raise ValueError("manifest must be a JSON list")
+            if not isinstance(manifest, list):
+                raise ValueError("manifest must be a JSON list")
+            by_name = {}
+            for field in request.files:
+                for f in request.files.getlist(field):
+                    by_name.setdefault(field, f)
+                    by_name.setdefault(f.filename, f)
+            items = []
+            used = set()
+            for entry in manifest:
+                if not isinstance(entry, dict):
+                    raise ValueError("manifest entries must be objects")
+                item = dict(entry)
+                if entry.get("file") is not None:
+                    item["file"] = by_name.get(entry["file"])
+                    if item["file"] is None:
+                        raise ValueError(f"manifest refers to missing file {entry['file']!r}")
+                    # Items are uploaded in parallel; two items must not read one stream
+                    if id(item["file"]) in used:
+                        raise ValueError(f"manifest refers to file {entry['file']!r} more than once")
+                    used.add(id(item["file"]))
+                items.append(item)
+        else:
+            items = [{"file": f} for f in uploads] + [{"text": t} for t in form.getlist("texts")]
+    else:
+        body = request.get_json(silent=True) or {}
+        defaults = {key: body[key] for key in ("password", "expires_in_hours", "metadata") if body.get(key)}
+        items = body.get("items")
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError("items must be a list of objects")
+        items = [{k: v for k, v in item.items() if k != "file"} for item in items]
+    if not items:
+        raise ValueError("No items to create")
+    if len(items) > Config.SHARE_BULK_MAX_ITEMS:
+        raise ValueError(f"At most {Config.SHARE_BULK_MAX_ITEMS} items per request")
+    return items, defaults
+
+
+def _insert_shares_bulk(client, entries) -> None:
+    """Insert all rows with one bulk insert, filling entry["result"] per item.
+
+    Collisions on generated codes are retried with fresh codes. If the bulk
+    insert still fails, rows are inserted one by one so a bad row only fails
+    its own item.
+    """
+    attempts = max(1, Config.CODE_ALLOCATION_ATTEMPTS)
+    error = None
+    for attempt in range(attempts):
+        try:
+            client.table("shares").insert([entry["payload"] for entry in entries]).execute()
+            error = None
+            break
+        except Exception as e:
+            error = e
+        if not is_code_conflict(error) or not any(not entry["requested"] for entry in entries):
+            break
+        for entry in entries:
+            if not entry["requested"]:
+                entry["payload"]["code"] = _generate_code()
+
+    if error is None:
+        for entry in entries:
+            missing_codes.add(entry["payload"]["code"])
+            entry["result"] = {"status": 201, "share": serialize(entry["payload"], SHARE_CREATED_FIELDS)}
+        return
+
+    logger.warning(f"Bulk insert of {len(entries)} shares failed, inserting individually: {error}")
+    for entry in entries:
+        failed = _insert_share(client, entry["payload"], generated_code=not entry["requested"])
+        if failed is None:
+            entry["result"] = {"status": 201, "share": serialize(entry["payload"], SHARE_CREATED_FIELDS)}
+        else:
+            resp, status = failed
+            entry["result"] = {"status": status, "error": (resp.get_json() or {}).get("error")}
+
+
+@application.route("/api/shares/bulk", methods=["POST"])
+@limiter.limit("10 per minute")  # The whole batch counts once
+def create_shares_bulk():
+    """Create many shares in one request.
+
+    multipart/form-data: every uploaded file and every `texts` field becomes
+    a share; `password`, `expires_in_hours` and `metadata` apply to all. An
+    optional `manifest` field (JSON list of {file | text, code, password,
+    metadata, expires_in_hours}) describes items individually, referring to
+    files by field name or filename. application/json: {"items": [{text,
+    ...}], ...defaults}. Files are uploaded concurrently and all rows are
+    written with one bulk insert. Returns {"results": [...]} in item order,
+    each with its HTTP-style status and either the share or an error.
+    """
     try:
-        if isinstance(metadata, dict):
-            language = metadata.get("language")
-    except Exception:
-        language = None
+        items, defaults = _bulk_items()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Insert into shares table
+    client, err = get_client()
+    if err or client is None:
+        return jsonify({"error": err or "Failed to create Supabase client"}), 500
+
+    user_id = None
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        user = verify_access_token(client, auth_header.split(" ", 1)[1].strip())
+        user_id = user.get("id") if user else None
+
+    entries = []
+    total_size = 0
+    for index, item in enumerate(items):
+        entry = {"index": index, "result": None}
+        entries.append(entry)
+        upload = item.get("file")
+        text_content = (item.get("text") or "").strip() or None
+        if upload is None and text_content is None:
+            entry["result"] = {"status": 400, "error": "Item needs a file or text"}
+            continue
+        options = dict(defaults, **{k: v for k, v in item.items() if k in ("password", "expires_in_hours", "metadata") and v})
+        expires_at, expiry_err = _share_expiry(options.get("expires_in_hours"))
+        if expiry_err:
+            entry["result"] = {"status": 400, "error": expiry_err}
+            continue
+        requested_code = (item.get("code") or "").strip().upper() or None
+        entry.update({
+            "requested": requested_code,
+            "code": requested_code or _generate_code(),
+            "text": text_content,
+            "password": (options.get("password") or "").strip(),
+            "metadata": options.get("metadata") or {},
+            "expires_at": expires_at,
+            "file": upload,
+        })
+        if upload is not None:
+            entry["filename"] = upload.filename or f"upload-{int(time.time())}-{index}"
+            entry["name"] = entry["filename"]
+            is_valid, error_msg = validate_file_extension(entry["filename"])
+            if not is_valid:
+                entry["result"] = {"status": 400, "error": error_msg}
+                continue
+            upload.seek(0, os.SEEK_END)
+            entry["size"] = upload.tell()
+            upload.seek(0)
+            if entry["size"] > application.config.get("MAX_FILE_SIZE", 10 * 1024 * 1024):
+                entry["result"] = {"status": 400, "error": "File too large"}
+                continue
+            total_size += entry["size"]
+    if total_size > Config.SHARE_BULK_MAX_BYTES:
+        return jsonify({"error": f"Batch larger than {Config.SHARE_BULK_MAX_BYTES} bytes"}), 413
+
+    # Caller-chosen codes: duplicates within the batch, then one query for taken ones
+    pending = [entry for entry in entries if entry["result"] is None]
+    seen = set()
+    for entry in pending:
+        if entry["requested"] and entry["requested"] in seen:
+            entry["result"] = {"status": 409, "error": "Share code already in use"}
+        seen.add(entry["requested"])
+    requested = [entry["requested"] for entry in pending if entry["requested"] and entry["result"] is None]
+    if requested:
+        try:
+            taken = _taken_share_codes(requested)
+        except Exception as e:
+            discard_client(client, e)
+            return jsonify({"error": f"Failed to check share codes: {e}"}), 500
+        for entry in pending:
+            if entry["requested"] in taken:
+                entry["result"] = {"status": 409, "error": "Share code already in use"}
+
+    # Fan the storage uploads out over a bounded pool; the httpx client is thread-safe
+    uploads = [entry for entry in entries if entry["result"] is None and entry.get("file") is not None]
+    if uploads:
+        workers = max(1, min(Config.SHARE_BULK_UPLOAD_WORKERS, len(uploads)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-upload") as pool:
+            futures = [
+                (entry, pool.submit(_upload_share_file, client, entry["code"], entry["filename"], entry["file"].stream, entry["size"]))
+                for entry in uploads
+            ]
+            for entry, future in futures:
+                try:
+                    entry["file_info"] = future.result()
+                except Exception as e:
+                    discard_client(client, e)
+                    entry["result"] = {"status": 500, "error": f"Upload failed: {e}"}
+
+    ready = [entry for entry in entries if entry["result"] is None]
+    for entry in ready:
+        entry["payload"] = _share_payload(
+            entry["code"], entry["text"], entry.get("file_info"), entry["password"],
+            entry["metadata"], entry["expires_at"], user_id,
+        )
+    if ready:
+        _insert_shares_bulk(client, ready)
+
+    results = []
+    for entry in entries:
+        result = {"index": entry["index"]}
+        if entry.get("name"):
+            result["name"] = entry["name"]
+        result.update(entry["result"])
+        results.append(result)
+    created = sum(1 for result in results if result["status"] == 201)
+    status = 201 if created else max(result["status"] for result in results)
+    return jsonify({"results": results, "created": created, "failed": len(results) - created}), status
+
+
+@application.route("/api/uploads", methods=["POST"])
+@limiter.limit("10 per minute")
+def init_upload():
+    """Start a resumable upload.
+
+    JSON body: { filename: string, size: int }. Returns an upload_id; send the
+    bytes with PUT /api/uploads/<upload_id> (Upload-Offset header) in chunks of
+    up to chunk_size, then POST /api/uploads/<upload_id>/complete.
+    """
+    body = request.get_json(silent=True) or {}
+    filename = (body.get("filename") or "").strip()
+    is_valid, error_msg = validate_file_extension(filename)
+    if not is_valid:
+        return jsonify({"error": error_msg}), 400
     try:
-        payload = {
-            "code": code,
-            "content_type": content_type,
-            "text_content": text_content,
-            "file_name": file_info["name"],
-            "file_size": file_info["size"],
-            "file_url": file_info["url"],
-            "is_protected": is_protected,
-            "password_hash": password_hash,
-            "language": language,
-            "metadata": metadata,
-        }
+        size = int(body.get("size") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid size"}), 400
 
-        if user_id:
-            payload["user_id"] = user_id
-        resp = client.table("shares").insert(payload).execute()
-        data = getattr(resp, "data", None) if resp is not None else None
-    except Exception as e:
-        msg = str(e)
-        if "row level security" in msg.lower() or "42501" in msg:
-            return jsonify({"error": "Insert blocked by RLS; ensure service role key is used on the backend and policies permit insert."}), 403
-        if "401" in msg or "unauthorized" in msg.lower():
-            return jsonify({"error": "Unauthorized to insert; check SUPABASE_SERVICE_ROLE_KEY is set and valid."}), 401
-        return jsonify({"error": f"Failed to create share: {msg}"}), 500
+    user_id = None
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        client, _ = get_client()
+        user = verify_access_token(client, auth_header.split(" ", 1)[1].strip())
+        user_id = user.get("id") if user else None
+
+    try:
+        # Signed-in users are capped per account, anonymous clients per address
+        owner = f"user:{user_id}" if user_id else f"ip:{get_remote_address()}"
+        session = upload_spool.create(filename, size, client=owner, user_id=user_id)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
 
     return jsonify({
-        "code": code,
-        "content_type": content_type,
-        "text_content": text_content,
-        "file_url": file_info["url"],
-        "file_name": file_info["name"],
-        "file_size": file_info["size"],
-        "is_protected": is_protected,
-        "password_hash": password_hash,
-        "language": language,
-        "metadata": metadata,
+        "upload_id": session["upload_id"],
+        "offset": 0,
+        "size": session["size"],
+        "chunk_size": Config.UPLOAD_CHUNK_SIZE,
     }), 201
 
 
+@application.route("/api/uploads/<upload_id>", methods=["GET"])
+def get_upload(upload_id: str):
+    """Report how many bytes were received so a client can resume."""
+    session = upload_spool.load(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    return jsonify({"upload_id": upload_id, "offset": session["offset"], "size": session["size"]}), 200
 
 
-@application.route("/api/shares/<code>", methods=["GET"])
-def get_share(code: str):
-    client, err = create_client()
+@application.route("/api/uploads/<upload_id>", methods=["PUT"])
+@limiter.limit("300 per minute")
+def put_upload_chunk(upload_id: str):
+    """Append the raw request body at the offset given by Upload-Offset (or ?offset=)."""
+    raw_offset = request.headers.get("Upload-Offset") or request.args.get("offset")
+    try:
+        offset = int(raw_offset)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Missing or invalid Upload-Offset"}), 400
+
+    length = request.content_length
+    if length is not None and length > Config.UPLOAD_MAX_CHUNK_SIZE:
+        return jsonify({"error": "Chunk too large"}), 413
+
+    try:
+        new_offset = upload_spool.append(upload_id, offset, request.stream, length)
+    except UploadError as e:
+        return jsonify({"error": str(e), "offset": e.offset}), e.status
+
+    session = upload_spool.load(upload_id) or {}
+    size = session.get("size")
+    return jsonify({
+        "upload_id": upload_id,
+        "offset": new_offset,
+        "size": size,
+        "complete": new_offset == size,
+    }), 200
+
+
+@application.route("/api/uploads/<upload_id>/complete", methods=["POST"])
+@limiter.limit("10 per minute")
+def complete_upload(upload_id: str):
+    """Move a fully received upload into storage and create its share.
+
+    Optional JSON body: { code, text, password, metadata } as for POST /api/shares.
+    The session is claimed first, so concurrent completes create one share;
+    on failure it is released and the client may retry.
+    """
+    session = upload_spool.claim(upload_id)
+    if session is None:
+        return jsonify({"error": "Upload not found"}), 404
+    response = _finalize_upload(upload_id, session)
+    if response[1] == 201:
+        upload_spool.discard(upload_id)
+    else:
+        upload_spool.release(upload_id)
+    return response
+
 
+def _finalize_upload(upload_id: str, session: dict):
+    """Store a claimed upload and insert its share; returns (response, status)."""
+    if session["offset"] != session["size"]:
+        return jsonify({"error": "Upload incomplete", "offset": session["offset"]}), 409
+
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
+
+    body = request.get_json(silent=True) or {}
+    requested_code = body.get("code")
+    code = requested_code or _generate_code()
+    text_content = (body.get("text") or "").strip() or None
+    password = (body.get("password") or "").strip()
+    expires_at, expiry_err = _share_expiry(body.get("expires_in_hours"))
+    if expiry_err:
+        return jsonify({"error": expiry_err}), 400
+
+    try:
+        # Hand the SDK an open file so the body is streamed from disk
+        with open(upload_spool.data_path(upload_id), "rb") as fh:
+            file_info = _upload_share_file(client, code, session["filename"], fh, session["size"])
+    except Exception as e:
+        discard_client(client, e)
+        return jsonify({"error": f"Upload failed: {e}"}), 500
+
+    payload = _share_payload(code, text_content, file_info, password, body.get("metadata"), expires_at, session.get("user_id"))
+    insert_error = _insert_share(client, payload, generated_code=not requested_code)
+    if insert_error:
+        return insert_error
+    return jsonify(serialize(payload, SHARE_CREATED_FIELDS)), 201
+
+
+def _upgrade_password_hash(client, code: str, password: str):
+    """Re-hash a share password with PASSWORD_HASH_METHOD; returns the new hash or None."""
+    new_hash = hash_share_password(password, Config.PASSWORD_HASH_METHOD)
+    try:
+        if client is None:
+            client, err = get_client()
+            if err or client is None:
+                return None
+        client.table("shares").update({"password_hash": new_hash}).eq("code", code).execute()
+    except Exception as e:
+        discard_client(client, e)
+        logger.warning(f"Failed to upgrade password hash for share {code}: {e}")
+        return None
+    share_cache.invalidate(code)
+    return new_hash
+
+
+def _check_share_access(client, code: str, stored_hash, password: str, presented_token):
+    """Password check for a protected share; returns (allowed, new_access_token).
+
+    A token from an earlier successful check skips the password hash. A
+    correct password issues a new token (and upgrades an outdated hash).
+    """
+    if share_tokens.verify(presented_token, code, stored_hash):
+        return True, None
+    if not password or not stored_hash or not check_password_hash(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash, Config.PASSWORD_HASH_METHOD):
+        stored_hash = _upgrade_password_hash(client, code, password) or stored_hash
+    return True, share_tokens.issue(code, stored_hash)
+
+
+def _count_view_atomically(client, code: str):
+    """Count one view with the view_share RPC; returns (row, gone).
+
+    `gone` is True when the database refused the view (expired, inactive or
+    out of views). If the RPC is unavailable the view is buffered instead.
+    """
+    if client is None:
+        client, err = get_client()
+        if err or client is None:
+            view_counter.record(code)
+            return None, False
+    viewed, view_err = rpc_view_share(client, code)
+    if view_err:
+        logger.warning(f"view_share unavailable, buffering view instead: {view_err}")
+        view_counter.record(code)
+        return None, False
+    if viewed is None:
+        share_cache.invalidate(code)
+        return None, True
+    share_cache.put(viewed)
+    return viewed, False
+
+
+def _serve_share(code: str, render, count_view: bool = True, version_etag: bool = False):
+    """Look up a share, enforce its password and answer with render(row).
+
+    `render` picks the whitelisted fields for the endpoint; count_view=False
+    serves metadata-only previews without spending a view. version_etag tags
+    the response with a weak ETag that ignores view_count, so repeat views of
+    unchanged content can be answered with 304.
+    """
+    code = code.upper()
+    client = None
+    viewed = None
     try:
         requested_password = (request.args.get("password") or "").strip()
 
-        # Prefer calling the RPC to respect business logic (expiry/views) if defined
-        row, rpc_err = rpc_get_share_by_code(client, code)
+        # Hot codes are served from the share cache without touching Supabase
+        row = share_cache.get(code, view_counter.pending(code))
+        if row is None and missing_codes.known_missing(code):
+            return jsonify({"error": "Not found"}), 404
+        if row is None:
+            client, err = get_client()
+            if err or client is None:
+                return jsonify({"error": err or "Failed to create Supabase client"}), 500
 
-        # If RPC errored or returned no row, fall back to direct select.
-        # This ensures that existing rows are still accessible even if the RPC
-        # is missing, misconfigured, or filtered by RLS/expiry logic.
-        if rpc_err or not row:
-            resp = client.table("shares").select("*").eq("code", code.upper()).limit(1).execute()
-            data = getattr(resp, "data", []) if resp is not None else []
-            if not data:
+            # The RPCs apply the serving rules (active, expiry, max_views).
+            # open_share also counts the view of an unprotected share, so an
+            # atomic view of an uncached share is a single round trip.
+            open_view = count_view and Config.SHARE_VIEW_MODE == "atomic"
+            if open_view:
+                row, rpc_err = rpc_open_share(client, code)
+                if row is not None and not row.get("is_protected"):
+                    viewed = row
+            if not open_view or rpc_err:
+                row, rpc_err = rpc_get_share_by_code(client, code)
+
+            # Without a working RPC, fall back to a direct select
+            if rpc_err:
+                resp = client.table("shares").select("*").eq("code", code).limit(1).execute()
+                data = getattr(resp, "data", []) if resp is not None else []
+                row = data[0] if data else None
+            if not row:
+                missing_codes.record_miss(code)
+                return jsonify({"error": "Not found"}), 404
+            # The select fallback applies no rules, and the lookups do not know
+            # about views still buffered in view_counter (a counted view was
+            # already allowed by the database)
+            if viewed is None and not is_servable(row, view_counter.pending(code)):
                 return jsonify({"error": "Not found"}), 404
-            row = data[0]
+            share_cache.put(row)
 
         # Enforce password protection if enabled
         is_protected = bool(row.get("is_protected"))
         stored_hash = row.get("password_hash")
 
+        access_token = None
+
         if is_protected:
-            if not requested_password or not stored_hash or not check_password_hash(stored_hash, requested_password):
+            presented = request.headers.get("X-Share-Token") or request.cookies.get(cookie_name(code))
+            allowed, access_token = _check_share_access(client, code, stored_hash, requested_password, presented)
+            if not allowed:
                 return jsonify({"error": "Password required or incorrect", "locked": True}), 403
 
-        # When access is allowed, update view count and include explicit locked flag in response
-        try:
-            # Increment view count
-            client.table("shares").update({"view_count": row.get("view_count", 0) + 1}).eq("code", code.upper()).execute()
-            # Update the row data with new view count
-            row["view_count"] = row.get("view_count", 0) + 1
-        except Exception as e:
-            logger.warning(f"Failed to update view count: {e}")
-        
+        # When access is allowed, count the view and include explicit locked flag in response.
+        # Shares with max_views are always counted in the database: views
+        # buffered per process could serve them once per worker.
+        if count_view and viewed is None and (Config.SHARE_VIEW_MODE == "atomic" or row.get("max_views") is not None):
+            viewed, gone = _count_view_atomically(client, code)
+            if gone:
+                return jsonify({"error": "Not found"}), 404
+            if viewed is not None:
+                row["view_count"] = viewed["view_count"]
+        elif count_view and viewed is None:
+            # Written behind in batches by view_counter
+            view_counter.record(code)
+        row["view_count"] = int(row.get("view_count") or 0) + view_counter.pending(code)
+
         row["locked"] = False
-        return jsonify(row), 200
+        if access_token:
+            row["access_token"] = access_token
+        body = render(row)
+        response = jsonify(body)
+        if version_etag:
+            response.set_etag(share_version(body), weak=True)
+        if access_token:
+            response.set_cookie(
+                cookie_name(code), access_token, max_age=share_tokens.ttl,
+                path="/api", httponly=True, secure=request.is_secure, samesite="Lax",
+            )
+        return response, 200
     except Exception as e:
+        discard_client(client, e)
         return jsonify({"error": str(e)}), 500
 
 
+def _batch_lookup_cost() -> int:
+    """Charge a batch one lookup per requested code (capped at the batch maximum)."""
+    codes = (request.get_json(silent=True) or {}).get("codes")
+    if not isinstance(codes, list) or not codes:
+        return 1
+    return min(len(codes), Config.SHARE_BATCH_MAX_CODES)
+
+
+# Single and batch lookups draw from one budget, so batching cannot be used
+# to enumerate codes faster than /api/shares/<code> allows
+SHARE_LOOKUP_LIMITS = "200 per day;50 per hour"
+share_lookup_limit = limiter.shared_limit(SHARE_LOOKUP_LIMITS, scope="share_lookup")
+batch_lookup_limit = limiter.shared_limit(SHARE_LOOKUP_LIMITS, scope="share_lookup", cost=_batch_lookup_cost)
+
+
+@application.route("/api/shares/<code>", methods=["GET"])
+@share_lookup_limit
+def get_share(code: str):
+    """Return a share. With ?content=0 only metadata is returned (no text body,
+    no view counted); fetch the body from /api/shares/<code>/content."""
+    if (request.args.get("content") or "").lower() in ("0", "false", "no"):
+        return _serve_share(code, share_summary, count_view=False)
+    return _serve_share(code, lambda row: serialize(row, SHARE_DETAIL_FIELDS), version_etag=True)
+
+
+@application.route("/api/shares/<code>/content", methods=["GET"])
+def get_share_content(code: str):
+    """Return just the text body of a share (counts as a view)."""
+    return _serve_share(code, lambda row: serialize(row, SHARE_CONTENT_FIELDS))
+
+
+def _batch_request_items(body: dict):
+    """Normalize {"codes": [...], "passwords": {...}, "tokens": {...}} into
+    an ordered, de-duplicated list of (code, password, token); raises ValueError."""
+    raw_codes = body.get("codes")
+    if not isinstance(raw_codes, list) or not raw_codes:
+        raise ValueError("codes must be a non-empty list")
+    passwords = {str(k).upper(): v for k, v in (body.get("passwords") or {}).items()}
+    tokens = {str(k).upper(): v for k, v in (body.get("tokens") or {}).items()}
+    items, seen = [], set()
+    for entry in raw_codes:
+        if isinstance(entry, dict):
+            code, password, token = entry.get("code"), entry.get("password"), entry.get("access_token")
+        else:
+            code, password, token = entry, None, None
+        if not isinstance(code, str) or not code.strip() or len(code.strip()) > 64:
+            raise ValueError("Each code must be a non-empty string")
+        code = code.strip().upper()
+        if code in seen:
+            continue
+        seen.add(code)
+        items.append((code, (password or passwords.get(code) or "").strip(), token or tokens.get(code)))
+    if len(items) > Config.SHARE_BATCH_MAX_CODES:
+        raise ValueError(f"At most {Config.SHARE_BATCH_MAX_CODES} codes per request")
+    return items
+
+
+@application.route("/api/shares/batch", methods=["POST"])
+@batch_lookup_limit
+def get_shares_batch():
+    """Resolve many share codes in one request.
+
+    Body: {"codes": ["ABC123", {"code": "XYZ789", "password": "..."}],
+    "passwords": {"CODE": "..."}, "tokens": {"CODE": "<access_token>"},
+    "content": true}. Each code counts against the same rate limit as a
+    single /api/shares/<code> lookup. Codes that are not cached are read
+    with a single in("code", ...) query. Served codes count one view each,
+    in one view_shares call under SHARE_VIEW_MODE=atomic; codes the database
+    refuses to count are reported as not_found. Returns {"results": [...]}
+    in request order, each with status "ok" (and share), "locked" or
+    "not_found".
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        items = _batch_request_items(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with_content = body.get("content", True) not in (False, 0, "0", "false", "no")
+    render = (lambda row: serialize(row, SHARE_DETAIL_FIELDS)) if with_content else share_summary
+
+    rows = {}
+    not_found = set()
+    to_fetch = []
+    for code, _, _ in items:
+        row = share_cache.get(code, view_counter.pending(code))
+        if row is not None:
+            rows[code] = row
+        elif missing_codes.known_missing(code):
+            not_found.add(code)
+        else:
+            to_fetch.append(code)
+
+    client = None
+    if to_fetch:
+        client, err = get_client()
+        if err or client is None:
+            return jsonify({"error": err or "Failed to create Supabase client"}), 500
+        try:
+            resp = client.table("shares").select("*").in_("code", to_fetch).execute()
+        except Exception as e:
+            discard_client(client, e)
+            return jsonify({"error": f"Failed to fetch shares: {e}"}), 500
+        fetched = {str(row.get("code") or "").upper(): row for row in (getattr(resp, "data", None) or [])}
+        for code in to_fetch:
+            row = fetched.get(code)
+            if row is None:
+                missing_codes.record_miss(code)
+                not_found.add(code)
+            elif not is_servable(row, view_counter.pending(code)):
+                # Same rules get_share_by_code applies to single lookups
+                not_found.add(code)
+            else:
+                share_cache.put(row)
+                rows[code] = row
+
+    allowed = []
+    for code, password, token in items:
+        row = rows.get(code)
+        if code in not_found or row is None:
+            continue
+        access_token = None
+        if row.get("is_protected"):
+            ok, access_token = _check_share_access(client, code, row.get("password_hash"), password, token)
+            if not ok:
+                continue
+        allowed.append((code, access_token))
+
+    if with_content:
+        # Views are counted in the database as for single lookups (always for
+        # shares with max_views), with one view_shares call for the batch
+        exact = [code for code, _ in allowed if Config.SHARE_VIEW_MODE == "atomic" or rows[code].get("max_views") is not None]
+        if exact:
+            if client is None:
+                client, _ = get_client()
+            counted, view_err = rpc_view_shares(client, exact)
+            if view_err:
+                logger.warning(f"view_shares unavailable, counting views one by one: {view_err}")
+                counted = []
+                for code in exact:
+                    viewed_row, gone = _count_view_atomically(client, code)
+                    if viewed_row is not None:
+                        counted.append(viewed_row)
+                    elif not gone:
+                        counted.append(rows[code])
+            else:
+                for viewed_row in counted:
+                    share_cache.put(viewed_row)
+            counted_codes = {str(row.get("code") or "").upper() for row in counted}
+            for viewed_row in counted:
+                code = str(viewed_row.get("code") or "").upper()
+                rows[code]["view_count"] = viewed_row.get("view_count")
+            for code in exact:
+                if code not in counted_codes:
+                    # The database refused the view: expired, inactive or out of views
+                    share_cache.invalidate(code)
+                    not_found.add(code)
+        for code, _ in allowed:
+            if code not in exact:
+                # Written behind in batches by view_counter
+                view_counter.record(code)
+
+    tokens = dict(allowed)
+    results = []
+    for code, _, _ in items:
+        row = rows.get(code)
+        if code in not_found or row is None:
+            results.append({"code": code, "status": "not_found", "error": "Not found"})
+            continue
+        if code not in tokens:
+            results.append({"code": code, "status": "locked", "locked": True, "error": "Password required or incorrect"})
+            continue
+        row["view_count"] = int(row.get("view_count") or 0) + view_counter.pending(code)
+        row["locked"] = False
+        if tokens[code]:
+            row["access_token"] = tokens[code]
+        results.append({"code": code, "status": "ok", "share": render(row)})
+
+    return jsonify({"results": results}), 200
+
+
+# Column projections for the dashboard list endpoints (id is needed for cursors)
+MY_SHARES_COLUMNS = "id, code, content_type, file_name, file_size, file_url, created_at, view_count"
+ACTIVITY_COLUMNS = "id, code, file_name, created_at, view_count"
+
+
+def _activity_feed(shares) -> list:
+    """Activity entries (created / viewed) for a page of share rows, newest first."""
+    activities = []
+    for share in shares:
+        # Share creation activity
+        activities.append({
+            "type": "share_created",
+            "action": "Created share",
+            "item": share.get("file_name") or share.get("code", "Unknown"),
+            "code": share.get("code"),
+            "timestamp": share.get("created_at"),
+            "icon": "📤"
+        })
+
+        # If share has views, add view activity
+        view_count = int(share.get("view_count") or 0)
+        if view_count > 0:
+            activities.append({
+                "type": "share_viewed",
+                "action": f"Share viewed ({view_count} times)",
+                "item": share.get("file_name") or share.get("code", "Unknown"),
+                "code": share.get("code"),
+                "timestamp": share.get("created_at"),
+                "icon": "👁️"
+            })
+
+    # Sort by timestamp (most recent first)
+    activities.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    return activities
+
+
 @application.route("/api/me/stats", methods=["GET"])
 def get_my_stats():
     """Return basic stats for the authenticated user: total shares and total views."""
-    client, err = create_client()
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
 
@@ -597,38 +1631,23 @@ def get_my_stats():
         return jsonify({"error": "Missing or invalid Authorization header"}), 401
 
     token = auth_header.split(" ", 1)[1].strip()
-    try:
-        uresp = client.auth.get_user(token)  # type: ignore[attr-defined]
-        user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
-        user_id = getattr(user_obj, "id", None) or (user_obj.get("id") if isinstance(user_obj, dict) else None)
-    except Exception as e:
-        logger.warning(f"Failed to resolve user from token in stats: {e}")
-        user_id = None
+    user = verify_access_token(client, token)
+    user_id = user.get("id") if user else None
 
     if not user_id:
         return jsonify({"error": "Invalid token"}), 401
 
-    try:
-        # Fetch all shares for this user and aggregate views client-side for simplicity
-        resp = client.table("shares").select("view_count", count="exact").eq("user_id", user_id).execute()
-        data = getattr(resp, "data", []) if resp is not None else []
-        total_shares = len(data)
-        total_views = 0
-        if isinstance(data, list):
-            for row in data:
-                try:
-                    total_views += int(row.get("view_count", 0))
-                except Exception:
-                    continue
-        return jsonify({"total_shares": total_shares, "total_views": total_views}), 200
-    except Exception as e:
-        return jsonify({"error": f"Failed to fetch stats: {e}"}), 500
+    # Totals are aggregated in the database; no share rows are transferred
+    stats, stats_err = fetch_user_stats(client, user_id)
+    if stats_err:
+        return jsonify({"error": f"Failed to fetch stats: {stats_err}"}), 500
+    return jsonify(stats), 200
 
 
 @application.route("/api/me/shares", methods=["GET"])
 def get_my_shares():
     """Return the list of shares for the authenticated user (primarily file uploads)."""
-    client, err = create_client()
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
 
@@ -637,36 +1656,32 @@ def get_my_shares():
         return jsonify({"error": "Missing or invalid Authorization header"}), 401
 
     token = auth_header.split(" ", 1)[1].strip()
-    try:
-        uresp = client.auth.get_user(token)  # type: ignore[attr-defined]
-        user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
-        user_id = getattr(user_obj, "id", None) or (user_obj.get("id") if isinstance(user_obj, dict) else None)
-    except Exception as e:
-        logger.warning(f"Failed to resolve user from token in shares: {e}")
-        user_id = None
+    user = verify_access_token(client, token)
+    user_id = user.get("id") if user else None
 
     if not user_id:
         return jsonify({"error": "Invalid token"}), 401
 
     try:
-        resp = (
-            client
-            .table("shares")
-            .select("code, content_type, file_name, file_size, file_url, created_at, view_count")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
-            .execute()
-        )
+        limit, cursor = page_params(request.args, Config.SHARES_PAGE_SIZE, Config.MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query = client.table("shares").select(MY_SHARES_COLUMNS).eq("user_id", user_id)
+        resp = keyset_query(query, cursor, limit).execute()
         data = getattr(resp, "data", []) if resp is not None else []
-        return jsonify({"shares": data}), 200
+        shares, next_cursor = split_page(data, limit)
+        return jsonify({"shares": [serialize(share, SHARE_LIST_FIELDS) for share in shares], "next_cursor": next_cursor}), 200
     except Exception as e:
+        discard_client(client, e)
         return jsonify({"error": f"Failed to fetch shares: {e}"}), 500
 
 
 @application.route("/api/me/analytics", methods=["GET"])
 def get_my_analytics():
     """Return detailed analytics data for the authenticated user."""
-    client, err = create_client()
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
 
@@ -675,78 +1690,24 @@ def get_my_analytics():
         return jsonify({"error": "Missing or invalid Authorization header"}), 401
 
     token = auth_header.split(" ", 1)[1].strip()
-    try:
-        uresp = client.auth.get_user(token)
-        user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
-        user_id = getattr(user_obj, "id", None) or (user_obj.get("id") if isinstance(user_obj, dict) else None)
-    except Exception as e:
-        logger.warning(f"Failed to resolve user from token in analytics: {e}")
-        user_id = None
+    user = verify_access_token(client, token)
+    user_id = user.get("id") if user else None
 
     if not user_id:
         return jsonify({"error": "Invalid token"}), 401
 
-    try:
-        # Fetch all shares for this user
-        resp = client.table("shares").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-        data = getattr(resp, "data", []) if resp is not None else []
-        
-        # Calculate analytics
-        total_shares = len(data)
-        total_views = sum(int(row.get("view_count", 0)) for row in data)
-        
-        # Content type distribution
-        content_types = {}
-        for row in data:
-            ct = row.get("content_type", "unknown")
-            content_types[ct] = content_types.get(ct, 0) + 1
-        
-        # Views over time (last 30 days)
-        from datetime import datetime, timedelta
-        
-        views_by_date = {}
-        now = datetime.utcnow()
-        for i in range(30):
-            date = (now - timedelta(days=i)).strftime("%Y-%m-%d")
-            views_by_date[date] = 0
-        
-        # Top shares by views
-        top_shares = sorted(data, key=lambda x: int(x.get("view_count", 0)), reverse=True)[:5]
-        top_shares_data = [
-            {
-                "code": share.get("code"),
-                "views": int(share.get("view_count", 0)),
-                "type": share.get("content_type"),
-                "name": share.get("file_name") or "Text Share"
-            }
-            for share in top_shares
-        ]
-        
-        # Recent shares (last 7 days)
-        seven_days_ago = now - timedelta(days=7)
-        recent_count = sum(
-            1 for row in data 
-            if datetime.fromisoformat(row.get("created_at", "").replace("Z", "+00:00")) > seven_days_ago
-        ) if data else 0
-        
-        return jsonify({
-            "total_shares": total_shares,
-            "total_views": total_views,
-            "avg_views": round(total_views / total_shares, 2) if total_shares > 0 else 0,
-            "recent_shares": recent_count,
-            "content_types": content_types,
-            "views_by_date": views_by_date,
-            "top_shares": top_shares_data
-        }), 200
-    except Exception as e:
-        logger.error(f"Failed to fetch analytics: {e}")
-        return jsonify({"error": f"Failed to fetch analytics: {e}"}), 500
+    # One round trip: totals, grouped counts, top shares and views per day
+    analytics, analytics_err = fetch_user_analytics(client, user_id)
+    if analytics_err:
+        logger.error(f"Failed to fetch analytics: {analytics_err}")
+        return jsonify({"error": f"Failed to fetch analytics: {analytics_err}"}), 500
+    return jsonify(analytics), 200
 
 
 @application.route("/api/me/activity", methods=["GET"])
 def get_my_activity():
     """Return activity feed for the authenticated user."""
-    client, err = create_client()
+    client, err = get_client()
     if err or client is None:
         return jsonify({"error": err or "Failed to create Supabase client"}), 500
 
@@ -755,56 +1716,142 @@ def get_my_activity():
         return jsonify({"error": "Missing or invalid Authorization header"}), 401
 
     token = auth_header.split(" ", 1)[1].strip()
-    try:
-        uresp = client.auth.get_user(token)
-        user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
-        user_id = getattr(user_obj, "id", None) or (user_obj.get("id") if isinstance(user_obj, dict) else None)
-    except Exception as e:
-        logger.warning(f"Failed to resolve user from token in activity: {e}")
-        user_id = None
+    user = verify_access_token(client, token)
+    user_id = user.get("id") if user else None
 
     if not user_id:
         return jsonify({"error": "Invalid token"}), 401
 
     try:
-        # Fetch recent shares
-        resp = client.table("shares").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(20).execute()
+        limit, cursor = page_params(request.args, Config.ACTIVITY_PAGE_SIZE, Config.MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Fetch one page of recent shares, only the columns the feed needs
+        query = client.table("shares").select(ACTIVITY_COLUMNS).eq("user_id", user_id)
+        resp = keyset_query(query, cursor, limit).execute()
         data = getattr(resp, "data", []) if resp is not None else []
+        data, next_cursor = split_page(data, limit)
         
-        # Build activity feed
-        activities = []
-        for share in data:
-            # Share creation activity
-            activities.append({
-                "type": "share_created",
-                "action": "Created share",
-                "item": share.get("file_name") or share.get("code", "Unknown"),
-                "code": share.get("code"),
-                "timestamp": share.get("created_at"),
-                "icon": "📤"
-            })
-            
-            # If share has views, add view activity
-            view_count = int(share.get("view_count", 0))
-            if view_count > 0:
-                activities.append({
-                    "type": "share_viewed",
-                    "action": f"Share viewed ({view_count} times)",
-                    "item": share.get("file_name") or share.get("code", "Unknown"),
-                    "code": share.get("code"),
-                    "timestamp": share.get("created_at"),
-                    "icon": "👁️"
-                })
-        
-        # Sort by timestamp (most recent first)
-        activities.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        
-        return jsonify({"activities": activities[:20]}), 200
+        activities = _activity_feed(data)
+        return jsonify({"activities": activities, "next_cursor": next_cursor}), 200
     except Exception as e:
+        discard_client(client, e)
         logger.error(f"Failed to fetch activity: {e}")
         return jsonify({"error": f"Failed to fetch activity: {e}"}), 500
 
 
+DASHBOARD_SECTIONS = ("stats", "shares", "analytics", "activity")
+
+# Shared by dashboard requests so page loads don't pay for thread start-up
+dashboard_pool = ThreadPoolExecutor(max_workers=max(1, Config.DASHBOARD_WORKERS), thread_name_prefix="dashboard")
+
+
+def _dashboard_rows(client, user_id: str, limit: int) -> list:
+    """Newest share rows for the user, projected for both the list and the feed."""
+    query = client.table("shares").select(MY_SHARES_COLUMNS).eq("user_id", user_id)
+    resp = keyset_query(query, None, limit).execute()
+    return getattr(resp, "data", None) or []
+
+
+@application.route("/api/me/dashboard", methods=["GET"])
+def get_my_dashboard():
+    """Everything the dashboard page needs in one request.
+
+    ?sections=stats,shares,analytics,activity (default: all). The token is
+    verified once and the upstream queries run concurrently: the analytics
+    RPC (which also yields the stats totals), the stats RPC when analytics
+    is not requested, and one share-row query whose rows feed both the
+    shares list and the activity feed (first page of each; use the
+    per-section endpoints with ?cursor= for later pages). A failed section
+    is reported under "errors" without failing the others.
+    """
+    raw_sections = request.args.get("sections")
+    sections = [s.strip().lower() for s in raw_sections.split(",") if s.strip()] if raw_sections else list(DASHBOARD_SECTIONS)
+    unknown = [s for s in sections if s not in DASHBOARD_SECTIONS]
+    if unknown or not sections:
+        return jsonify({"error": f"Unknown sections: {', '.join(unknown)}; choose from {', '.join(DASHBOARD_SECTIONS)}"}), 400
+
+    client, err = get_client()
+    if err or client is None:
+        return jsonify({"error": err or "Failed to create Supabase client"}), 500
+
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return jsonify({"error": "Missing or invalid Authorization header"}), 401
+
+    token = auth_header.split(" ", 1)[1].strip()
+    user = verify_access_token(client, token)
+    user_id = user.get("id") if user else None
+
+    if not user_id:
+        return jsonify({"error": "Invalid token"}), 401
+
+    shares_limit = min(Config.SHARES_PAGE_SIZE, Config.MAX_PAGE_SIZE)
+    activity_limit = min(Config.ACTIVITY_PAGE_SIZE, Config.MAX_PAGE_SIZE)
+    row_limit = max(shares_limit if "shares" in sections else 0, activity_limit if "activity" in sections else 0)
+
+    futures = {}
+    if "analytics" in sections:
+        futures["analytics"] = dashboard_pool.submit(fetch_user_analytics, client, user_id)
+    elif "stats" in sections:
+        futures["stats"] = dashboard_pool.submit(fetch_user_stats, client, user_id)
+    if row_limit:
+        futures["rows"] = dashboard_pool.submit(_dashboard_rows, client, user_id, row_limit)
+
+    outcomes = {}
+    for name, future in futures.items():
+        try:
+            outcomes[name] = future.result(timeout=Config.DASHBOARD_TIMEOUT)
+        except Exception as e:
+            # A timeout only means the query is still running on the shared
+            # client; discard it just for errors the query itself raised
+            error = future.exception() if future.done() else None
+            if error is not None:
+                discard_client(client, error)
+            outcomes[name] = e
+
+    body = {}
+    errors = {}
+    if "analytics" in outcomes:
+        analytics = outcomes["analytics"]
+        if isinstance(analytics, Exception) or analytics[1]:
+            message = str(analytics) if isinstance(analytics, Exception) else analytics[1]
+            errors["analytics"] = f"Failed to fetch analytics: {message}"
+            if "stats" in sections:
+                errors["stats"] = f"Failed to fetch stats: {message}"
+        else:
+            if "analytics" in sections:
+                body["analytics"] = analytics[0]
+            if "stats" in sections:
+                body["stats"] = {"total_shares": analytics[0]["total_shares"], "total_views": analytics[0]["total_views"]}
+    if "stats" in outcomes:
+        stats = outcomes["stats"]
+        if isinstance(stats, Exception) or stats[1]:
+            errors["stats"] = f"Failed to fetch stats: {stats if isinstance(stats, Exception) else stats[1]}"
+        else:
+            body["stats"] = stats[0]
+    if "rows" in outcomes:
+        rows = outcomes["rows"]
+        if isinstance(rows, Exception):
+            for section in ("shares", "activity"):
+                if section in sections:
+                    errors[section] = f"Failed to fetch {section}: {rows}"
+        else:
+            if "shares" in sections:
+                page, next_cursor = split_page(rows[:shares_limit + 1], shares_limit)
+                body["shares"] = {"shares": [serialize(share, SHARE_LIST_FIELDS) for share in page], "next_cursor": next_cursor}
+            if "activity" in sections:
+                page, next_cursor = split_page(rows[:activity_limit + 1], activity_limit)
+                body["activity"] = {"activities": _activity_feed(page), "next_cursor": next_cursor}
+
+    if errors:
+        logger.error(f"Dashboard sections failed: {errors}")
+        body["errors"] = errors
+    return jsonify(body), (200 if len(errors) < len(sections) else 500)
+
+
 @application.route("/api/files/fetch", methods=["GET"])
 def fetch_file():
     """Proxy file fetch endpoint. Accepts file URLs in query param 'url'.
@@ -821,41 +1868,40 @@ def fetch_file():
             proxy_part = file_url[6:]  # Remove "proxy:" prefix
             bucket, path = proxy_part.split("/", 1)
             
-            client, err = create_client()
+            client, err = get_client()
             if err or client is None:
                 return jsonify({"error": err or "Failed to create Supabase client"}), 500
             
-            storage = client.storage.from_(bucket)
-            
-            # Try to get a fresh signed URL first
-            try:
-                signed = storage.create_signed_url(path, 3600)  # 1 hour
-                if isinstance(signed, dict):
-                    sdata = signed.get("data") or signed
-                    signed_url = sdata.get("signedUrl") or sdata.get("signed_url")
-                    if signed_url:
-                        # Redirect to the signed URL or fetch it
-                        import urllib.request
-                        req = urllib.request.Request(signed_url, headers={"User-Agent": "api-app/file-fetch"})
-                        with urllib.request.urlopen(req, timeout=10) as resp:
-                            data = resp.read()
-                            content_type = resp.headers.get("Content-Type", "application/octet-stream")
-                            cd = resp.headers.get("Content-Disposition")
-                            headers = {}
-                            if cd:
-                                headers["Content-Disposition"] = cd
-                            return Response(data, headers=headers, content_type=content_type, status=200)
-            except Exception as e:
-                logger.warning(f"Failed to access file via signed URL: {e}")
+            # Reuse a cached signed URL; re-signed only ahead of its expiry
+            signed_url, sign_err = signed_urls.get(client, bucket, path)
+            if sign_err:
+                logger.warning(f"Failed to create signed URL: {sign_err}")
+
+            if signed_url:
+                # Opt-in: let the client download straight from storage
+                wants_redirect = (request.args.get("redirect") or "").lower() in ("1", "true", "yes")
+                if Config.FILE_FETCH_REDIRECT or wants_redirect:
+                    return redirect(signed_url, code=302)
+                try:
+                    resp = open_upstream(signed_url, request.headers, timeout=Config.FILE_PROXY_TIMEOUT)
+                    return stream_response(resp, chunk_size=Config.FILE_PROXY_CHUNK_SIZE)
+                except Exception as e:
+                    signed_urls.invalidate(bucket, path)
+                    logger.warning(f"Failed to access file via signed URL: {e}")
             
-            # If signed URL fails, try direct download (requires service role)
+            storage = client.storage.from_(bucket)
+
+            # If signed URL fails, try direct download (requires service role).
+            # The SDK buffers the whole object here, so this is a last resort.
             try:
                 download_resp = storage.download(path)
+                if isinstance(download_resp, dict):
+                    download_resp = download_resp.get("data")
                 if isinstance(download_resp, bytes):
-                    return Response(download_resp, content_type="application/octet-stream", status=200)
-                elif isinstance(download_resp, dict) and download_resp.get("data"):
-                    return Response(download_resp["data"], content_type="application/octet-stream", status=200)
+                    resp = Response(download_resp, content_type="application/octet-stream", status=200)
+                    return resp.make_conditional(request, accept_ranges=True, complete_length=len(download_resp))
             except Exception as e:
+                discard_client(client, e)
                 logger.error(f"Failed to download file directly: {e}")
                 return jsonify({"error": f"File access failed: {e}"}), 502
             
@@ -865,7 +1911,6 @@ def fetch_file():
 
     # Handle regular public URLs
     from urllib.parse import urlparse
-    import urllib.request
 
     try:
         allowed_host = urlparse(application.config.get("SUPABASE_URL", "")).netloc
@@ -873,15 +1918,9 @@ def fetch_file():
         if not allowed_host or parsed.netloc != allowed_host:
             return jsonify({"error": "Invalid file host"}), 400
 
-        req = urllib.request.Request(file_url, headers={"User-Agent": "api-app/file-fetch"})
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = resp.read()
-            content_type = resp.headers.get("Content-Type", "application/octet-stream")
-            cd = resp.headers.get("Content-Disposition")
-            headers = {}
-            if cd:
-                headers["Content-Disposition"] = cd
-            return Response(data, headers=headers, content_type=content_type, status=200)
+        # Relay chunks as they arrive instead of buffering the whole object
+        resp = open_upstream(file_url, request.headers, timeout=Config.FILE_PROXY_TIMEOUT)
+        return stream_response(resp, chunk_size=Config.FILE_PROXY_CHUNK_SIZE)
     except Exception as e:
         return jsonify({"error": f"Fetch failed: {e}"}), 502
 
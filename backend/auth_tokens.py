@@ -0,0 +1,235 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from caching import TTLCache
+
+try:
+    import jwt  # type: ignore  # PyJWT, installed with supabase/gotrue
+except Exception:  # pragma: no cover - optional import
+    jwt = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Unverifiable(Exception):
+    """The token could not be checked locally; ask GoTrue instead."""
+
+
+class TokenVerifier:
+    """Resolve Supabase access tokens to users without a GoTrue round trip.
+
+    Tokens are verified locally with the project's JWT secret (HS256) or with
+    keys from the project's JWKS endpoint (asymmetric signing keys). The JWKS
+    is cached and refetched when an unknown `kid` shows up, which covers key
+    rotation. Verified users are cached by token hash until the token expires
+    (capped by `cache_ttl`). Tokens that cannot be verified locally fall back
+    to `client.auth.get_user(token)`.
+    """
+
+    def __init__(
+        self,
+        supabase_url: Optional[str] = None,
+        jwt_secret: Optional[str] = None,
+        audience: Optional[str] = "authenticated",
+        cache_size: int = 1024,
+        cache_ttl: float = 300.0,
+        jwks_ttl: float = 600.0,
+        jwks_min_refresh: float = 30.0,
+    ):
+        self.supabase_url = (supabase_url or "").rstrip("/") or None
+        self.jwt_secret = jwt_secret or None
+        self.audience = audience or None
+        self.jwks_ttl = float(jwks_ttl)
+        self.jwks_min_refresh = float(jwks_min_refresh)
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._jwks_lock = threading.Lock()
+        self._jwks: Dict[str, Any] = {}
+        self._jwks_fetched_at = 0.0
+        self.local_verified = 0
+        self.remote_verified = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def verify(self, client: Any, token: str) -> Optional[Dict[str, Any]]:
+        """Return {"id", "email", "role"} for a valid token, else None."""
+        if not token:
+            return None
+        key = self._cache_key(token)
+        user = self._cache.get(key)
+        if user is not None:
+            return user
+
+        try:
+            claims = self._verify_locally(token)
+        except _Unverifiable as e:
+            logger.debug(f"Falling back to remote token check: {e}")
+            user = self._verify_remotely(client, token)
+            if user is None:
+                self.rejected += 1
+                return None
+            self.remote_verified += 1
+            self._cache.set(key, user, ttl=self._ttl_for(self._unverified_exp(token)))
+            return user
+        except Exception as e:
+            logger.warning(f"Rejected access token: {e}")
+            self.rejected += 1
+            return None
+
+        user = {"id": claims.get("sub"), "email": claims.get("email"), "role": claims.get("role")}
+        if not user["id"]:
+            self.rejected += 1
+            return None
+        self.local_verified += 1
+        self._cache.set(key, user, ttl=self._ttl_for(claims.get("exp")))
+        return user
+
+    def _ttl_for(self, exp: Any) -> float:
+        ttl = self._cache.ttl
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, float(exp) - time.time())
+        return ttl
+
+    @staticmethod
+    def _unverified_exp(token: str) -> Optional[float]:
+        if jwt is None:
+            return None
+        try:
+            return jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except Exception:
+            return None
+
+    def _verify_locally(self, token: str) -> Dict[str, Any]:
+        if jwt is None:
+            raise _Unverifiable("PyJWT not installed")
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+        options = {"require": ["exp", "sub"], "verify_aud": bool(self.audience)}
+
+        if alg == "HS256":
+            if not self.jwt_secret:
+                raise _Unverifiable("no JWT secret configured")
+            try:
+                return jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience=self.audience, options=options)
+            except jwt.InvalidSignatureError:
+                # Secret may be stale or belong to another project; let GoTrue decide
+                raise _Unverifiable("signature did not match configured secret")
+
+        kid = header.get("kid")
+        if not kid or not alg:
+            raise _Unverifiable("token has no key id")
+        signing_key = self._get_signing_key(kid)
+        if signing_key is None:
+            raise _Unverifiable(f"unknown signing key {kid}")
+        # The key decides the algorithm (its "alg", or the default for its key
+        # type); a token header naming anything else is rejected
+        expected = signing_key.algorithm_name
+        if alg != expected:
+            raise jwt.InvalidAlgorithmError(f"token algorithm {alg} does not match key {kid} ({expected})")
+        return jwt.decode(token, signing_key.key, algorithms=[expected], audience=self.audience, options=options)
+
+    def _get_signing_key(self, kid: str) -> Any:
+        now = time.monotonic()
+        with self._jwks_lock:
+            fresh = (now - self._jwks_fetched_at) < self.jwks_ttl
+            if kid in self._jwks and fresh:
+                return self._jwks[kid]
+            # Unknown kid (rotation) or stale set: refetch, but not more often than jwks_min_refresh
+            if self._jwks_fetched_at and (now - self._jwks_fetched_at) < self.jwks_min_refresh:
+                return self._jwks.get(kid)
+            self._jwks_fetched_at = now
+            keys = self._fetch_jwks()
+            if keys is not None:
+                self._jwks = keys
+            return self._jwks.get(kid)
+
+    def _fetch_jwks(self) -> Optional[Dict[str, Any]]:
+        if not self.supabase_url:
+            return None
+        import urllib.request
+
+        url = self.supabase_url + "/auth/v1/.well-known/jwks.json"
+        try:
+            req = urllib.request.Request(url, headers={"Accept": "application/json", "User-Agent": "api-app/jwks"})
+            with urllib.request.urlopen(req, timeout=3) as resp:
+                payload = json.loads(resp.read().decode("utf-8"))
+            keys: Dict[str, Any] = {}
+            for jwk in payload.get("keys", []):
+                try:
+                    parsed = jwt.PyJWK(jwk)
+                except Exception:
+                    continue
+                if parsed.key_id:
+                    keys[parsed.key_id] = parsed
+            return keys
+        except Exception as e:  # pragma: no cover - relies on network
+            logger.warning(f"Failed to fetch JWKS: {e}")
+            return None
+
+    @staticmethod
+    def _verify_remotely(client: Any, token: str) -> Optional[Dict[str, Any]]:
+        if client is None:
+            return None
+        try:
+            uresp = client.auth.get_user(token)  # type: ignore[attr-defined]
+            user_obj = getattr(uresp, "user", None) or getattr(uresp, "data", None) or {}
+            if isinstance(user_obj, dict):
+                user_id, email, role = user_obj.get("id"), user_obj.get("email"), user_obj.get("role")
+            else:
+                user_id = getattr(user_obj, "id", None)
+                email = getattr(user_obj, "email", None)
+                role = getattr(user_obj, "role", None)
+        except Exception as e:
+            logger.warning(f"Failed to resolve user from token: {e}")
+            return None
+        if not user_id:
+            return None
+        return {"id": user_id, "email": email, "role": role}
+
+    def forget(self, token: str) -> None:
+        """Drop a token from the cache (e.g. on logout)."""
+        if token:
+            self._cache.pop(self._cache_key(token))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats.update({
+            "local_verified": self.local_verified,
+            "remote_verified": self.remote_verified,
+            "rejected": self.rejected,
+            "mode": "secret" if self.jwt_secret else ("jwks" if self.supabase_url else "remote"),
+        })
+        return stats
+
+
+_verifier = TokenVerifier()
+
+
+def configure_token_verifier(**kwargs: Any) -> None:
+    """Replace the shared verifier (typically once, from Config, at startup)."""
+    global _verifier
+    _verifier = TokenVerifier(**kwargs)
+
+
+def verify_access_token(client: Any, token: str) -> Optional[Dict[str, Any]]:
+    """Resolve a bearer token to {"id", "email", "role"}, or None when invalid."""
+    return _verifier.verify(client, token)
+
+
+def forget_access_token(token: str) -> None:
+    """Stop trusting a cached token, e.g. after the user signs out."""
+    _verifier.forget(token)
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    return _verifier.stats()
@@ -0,0 +1,460 @@
+"""Throughput and latency benchmark for the share API against a local fake Supabase.
+
+Runs the real Flask app on a threaded local server, backed by FakeSupabase
+with injected latency, and drives each scenario at every concurrency level
+(and file size, where the scenario uses one). Results are printed as a table
+and can be written as JSON and compared against an earlier run:
+
+    python benchmark.py --concurrency 1,8,32 --sizes 1024,1048576 --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.2   # exit 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import platform
+import argparse
+import threading
+import contextlib
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+from fake_supabase import FakeSupabase
+
+SCENARIOS = (
+    "create_share_text",
+    "create_share_file",
+    "create_shares_bulk",
+    "get_share",
+    "get_share_missing",
+    "get_shares_batch",
+    "fetch_file",
+    "me_stats",
+    "me_shares",
+    "me_analytics",
+    "me_activity",
+    "me_dashboard",
+)
+EXPECTED_STATUS = {"get_share_missing": 404}
+BULK_FILES = 10
+SIZED_SCENARIOS = {"create_share_text", "create_share_file", "create_shares_bulk", "get_share", "get_shares_batch", "fetch_file"}
+BENCH_USER = "00000000-0000-4000-8000-00000000be4c"
+SEED_SHARES = 50
+
+Request = Callable[[], int]
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_kb() -> Optional[int]:
+    """High-water resident set size of this process (app, fake and driver together)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return int(peak / 1024) if sys.platform == "darwin" else int(peak)
+
+
+@contextlib.contextmanager
+def use_fake_supabase(fake: FakeSupabase, rate_limits: bool = False) -> Iterator[Any]:
+    """Point the already-imported app at `fake` and restore it afterwards.
+
+    Settings read at import time (client pool, token verifier, allowed file
+    host) are reconfigured here, so this works whether or not `application`
+    was imported before the fake existed. Yields the application module.
+    """
+    env = {
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_SERVICE_ROLE_KEY": fake.service_key,
+        "SUPABASE_JWT_SECRET": fake.jwt_secret,
+    }
+    saved_env = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+
+    import application as app_module
+    from auth_tokens import configure_token_verifier
+    from config import Config
+    from supabase_client import configure_client_pool, share_lookup_rpc, share_open_rpc
+
+    app = app_module.application
+    saved_url = app.config.get("SUPABASE_URL")
+    saved_enabled = app_module.limiter.enabled
+    app.config["SUPABASE_URL"] = fake.url
+    app_module.limiter.enabled = rate_limits
+
+    def configure(url: Optional[str], secret: Optional[str]) -> None:
+        share_lookup_rpc.invalidate()
+        share_open_rpc.invalidate()
+        configure_client_pool(
+            pool_size=Config.SUPABASE_POOL_SIZE,
+            timeout=Config.SUPABASE_HTTP_TIMEOUT,
+            storage_timeout=Config.SUPABASE_STORAGE_TIMEOUT,
+            max_connections=Config.SUPABASE_MAX_CONNECTIONS,
+            max_keepalive=Config.SUPABASE_MAX_KEEPALIVE,
+        )
+        configure_token_verifier(
+            supabase_url=url,
+            jwt_secret=secret,
+            audience=Config.SUPABASE_JWT_AUDIENCE,
+            cache_size=Config.AUTH_TOKEN_CACHE_SIZE,
+            cache_ttl=Config.AUTH_TOKEN_CACHE_TTL,
+            jwks_ttl=Config.SUPABASE_JWKS_TTL,
+        )
+
+    configure(fake.url, fake.jwt_secret)
+    try:
+        yield app_module
+    finally:
+        # Write batched view counts to the fake before it goes away
+        app_module.view_counter.flush()
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        app.config["SUPABASE_URL"] = saved_url
+        app_module.limiter.enabled = saved_enabled
+        configure(Config.SUPABASE_URL, Config.SUPABASE_JWT_SECRET)
+
+
+@contextlib.contextmanager
+def serve(app: Any) -> Iterator[str]:
+    """Run `app` on a threaded local HTTP server; yields its base URL."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    WSGIRequestHandler.log_request = lambda *args, **kwargs: None  # type: ignore[assignment]
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="bench-app", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _call(req: urllib.request.Request, timeout: float = 60.0) -> int:
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def _multipart_files(fields: Dict[str, str], files: List[Tuple[str, str, bytes]]) -> Tuple[bytes, str]:
+    """Encode form fields and (field, filename, data) files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8"))
+    for field, filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode("utf-8")
+        )
+        parts.append(data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _multipart(fields: Dict[str, str], filename: str, data: bytes) -> Tuple[bytes, str]:
+    return _multipart_files(fields, [("file", filename, data)])
+
+
+def seed(fake: FakeSupabase, size: int, count: int = SEED_SHARES) -> List[str]:
+    """Insert `count` text shares of `size` bytes owned by BENCH_USER; returns their codes."""
+    text = ("x" * max(1, size))
+    start = datetime.now(timezone.utc) - timedelta(days=count)
+    codes = []
+    for i in range(count):
+        code = f"B{size % 100000:05d}{i:03d}"[:10]
+        if any(row["code"] == code for row in fake.tables["shares"]):
+            codes.append(code)
+            continue
+        fake.insert("shares", {
+            "code": code,
+            "content_type": "text",
+            "text_content": text,
+            "user_id": BENCH_USER,
+            "view_count": random.randint(0, 50),
+            "created_at": (start + timedelta(days=i)).isoformat(),
+        })
+        codes.append(code)
+    return codes
+
+
+def build_scenario(name: str, base_url: str, fake: FakeSupabase, size: Optional[int], token: str) -> Request:
+    """Seed what `name` needs and return a callable that performs one request."""
+    auth = {"Authorization": f"Bearer {token}"}
+    size = size or 0
+
+    if name == "create_share_text":
+        body = json.dumps({"text": "x" * max(1, size)}).encode("utf-8")
+        return lambda: _call(urllib.request.Request(
+            f"{base_url}/api/shares", data=body, headers={"Content-Type": "application/json", **auth}, method="POST"))
+
+    if name == "create_share_file":
+        payload = os.urandom(max(1, size))
+        counter = iter(range(10 ** 9))
+
+        def create_file() -> int:
+            # Vary the bytes so content dedup does not turn every upload into a no-op
+            data = payload[:-8] + next(counter).to_bytes(8, "big") if len(payload) > 8 else payload
+            body, content_type = _multipart({}, "bench.txt", data)
+            return _call(urllib.request.Request(
+                f"{base_url}/api/shares", data=body, headers={"Content-Type": content_type, **auth}, method="POST"))
+
+        return create_file
+
+    if name == "create_shares_bulk":
+        counter = iter(range(10 ** 9))
+
+        def create_bulk() -> int:
+            batch = next(counter)
+            files = [(f"file{i}", f"bench-{i}.txt", os.urandom(max(1, size))) for i in range(BULK_FILES)]
+            body, content_type = _multipart_files({"texts": f"bulk text {batch}"}, files)
+            return _call(urllib.request.Request(
+                f"{base_url}/api/shares/bulk", data=body, headers={"Content-Type": content_type, **auth}, method="POST"))
+
+        return create_bulk
+
+    if name == "get_share":
+        codes = seed(fake, size)
+        cycle = iter(range(10 ** 9))
+        return lambda: _call(urllib.request.Request(f"{base_url}/api/shares/{codes[next(cycle) % len(codes)]}"))
+
+    if name == "get_shares_batch":
+        body = json.dumps({"codes": seed(fake, size)}).encode("utf-8")
+        return lambda: _call(urllib.request.Request(
+            f"{base_url}/api/shares/batch", data=body, headers={"Content-Type": "application/json"}, method="POST"))
+
+    if name == "get_share_missing":
+        # Enumeration-style traffic: a small set of unknown codes, requested repeatedly
+        missing = [f"N{i:05d}" for i in range(20)]
+        cycle = iter(range(10 ** 9))
+        return lambda: _call(urllib.request.Request(f"{base_url}/api/shares/{missing[next(cycle) % len(missing)]}"))
+
+    if name == "fetch_file":
+        path = f"bench/{size}.bin"
+        fake.put_object("shared-files", path, os.urandom(max(1, size)))
+        url = f"{base_url}/api/files/fetch?" + urllib.parse.urlencode({"url": f"proxy:shared-files/{path}"})
+        return lambda: _call(urllib.request.Request(url))
+
+    if name.startswith("me_"):
+        seed(fake, 256)
+        url = f"{base_url}/api/me/{name[len('me_'):]}"
+        return lambda: _call(urllib.request.Request(url, headers=auth))
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def run_scenario(request: Request, concurrency: int, total: int, warmup: int = 0, expected_status: Optional[int] = None) -> Dict[str, Any]:
+    """Issue `total` requests from `concurrency` threads and summarize latency.
+
+    Any 2xx/3xx counts as success, as does `expected_status` (e.g. 404 for
+    unknown-code scenarios).
+    """
+    for _ in range(warmup):
+        request()
+
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = iter(range(total))
+
+    def worker() -> None:
+        nonlocal errors
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            try:
+                status = request()
+            except Exception:
+                status = 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not 200 <= status < 400 and status != expected_status:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "rps": round(len(latencies) / duration, 2) if duration > 0 else None,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        "p50_ms": _round(percentile(ms, 50)),
+        "p95_ms": _round(percentile(ms, 95)),
+        "p99_ms": _round(percentile(ms, 99)),
+        "max_ms": _round(ms[-1] if ms else None),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def run_benchmarks(
+    scenarios: List[str],
+    concurrency: List[int],
+    sizes: List[int],
+    requests: int,
+    latency: Dict[str, float],
+    jitter: float = 0.0,
+    missing_rpcs: Tuple[str, ...] = (),
+    warmup: int = 5,
+    rate_limits: bool = False,
+) -> Dict[str, Any]:
+    """Run every scenario/concurrency/size combination; returns the JSON report."""
+    results = []
+    with FakeSupabase(latency=latency, jitter=jitter, missing_rpcs=missing_rpcs) as fake:
+        token = fake.issue_token(BENCH_USER)
+        with use_fake_supabase(fake, rate_limits=rate_limits) as app_module, serve(app_module.application) as base_url:
+            for name in scenarios:
+                for size in (sizes if name in SIZED_SCENARIOS else [None]):
+                    request = build_scenario(name, base_url, fake, size, token)
+                    for level in concurrency:
+                        fake.reset_stats()
+                        result = run_scenario(request, level, requests, warmup, EXPECTED_STATUS.get(name))
+                        upstream = fake.stats()
+                        result.update({
+                            "scenario": name,
+                            "concurrency": level,
+                            "size": size,
+                            "upstream_calls_per_request": round(sum(upstream.values()) / max(1, requests + warmup), 2),
+                            "peak_rss_kb": peak_rss_kb(),
+                        })
+                        results.append(result)
+                        print(_format_row(result), flush=True)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": requests,
+            "latency": latency,
+            "jitter": jitter,
+            "missing_rpcs": list(missing_rpcs),
+        },
+        "results": results,
+    }
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, int, Optional[int]]:
+    return result["scenario"], result["concurrency"], result.get("size")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Describe results that are more than `tolerance` slower than the baseline."""
+    before = {_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        old = before.get(_key(result))
+        if old is None:
+            continue
+        label = "{} c={} size={}".format(*_key(result))
+        if old.get("p95_ms") and result.get("p95_ms") and result["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old['p95_ms']}ms -> {result['p95_ms']}ms")
+        if old.get("rps") and result.get("rps") and result["rps"] < old["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: rps {old['rps']} -> {result['rps']}")
+        if result.get("errors", 0) > old.get("errors", 0):
+            regressions.append(f"{label}: errors {old.get('errors', 0)} -> {result['errors']}")
+    return regressions
+
+
+def _format_row(result: Dict[str, Any]) -> str:
+    return (
+        f"{result['scenario']:<18} c={result['concurrency']:<4} size={str(result['size']):<9} "
+        f"rps={result['rps']:<9} p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+        f"errors={result['errors']} upstream/req={result['upstream_calls_per_request']} rss={result['peak_rss_kb']}kB"
+    )
+
+
+def _int_list(raw: str) -> List[int]:
+    return [int(item) for item in raw.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client thread counts")
+    parser.add_argument("--sizes", default="1024,262144", help="comma-separated text/file sizes in bytes")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario/concurrency/size")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="injected seconds per Supabase call")
+    parser.add_argument("--storage-latency", type=float, default=None, help="override for storage calls")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- fraction applied to the latency")
+    parser.add_argument("--missing-rpcs", default="", help="RPCs to treat as not deployed (fallback paths)")
+    parser.add_argument("--rate-limits", action="store_true", help="keep flask-limiter enabled")
+    parser.add_argument("--verbose", action="store_true", help="keep per-request INFO logging")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    latency = {kind: args.latency for kind in FakeSupabase.KINDS}
+    if args.storage_latency is not None:
+        latency["storage"] = args.storage_latency
+
+    report = run_benchmarks(
+        scenarios,
+        _int_list(args.concurrency),
+        _int_list(args.sizes),
+        args.requests,
+        latency,
+        jitter=args.jitter,
+        missing_rpcs=tuple(name.strip() for name in args.missing_rpcs.split(",") if name.strip()),
+        warmup=args.warmup,
+        rate_limits=args.rate_limits,
+    )
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(json.load(fh), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+from typing import Any, Optional
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/css", "application/javascript"}
+
+
+def _is_buffered(response: Any) -> bool:
+    # Streamed file proxies must pass through untouched
+    return not (response.direct_passthrough or response.is_streamed)
+
+
+def body_etag(response: Any) -> str:
+    """Strong validator for a buffered response: a digest of its identity body."""
+    return hashlib.sha256(response.get_data()).hexdigest()[:32]
+
+
+def _matches(request: Any, tag: str, weak: bool) -> bool:
+    inm = request.if_none_match
+    if not inm:
+        return False
+    # Compressed responses carry "<tag>-<encoding>"; any variant of the same body matches
+    candidates = [tag] + [f"{tag}-{enc}" for enc in ("gzip", "br")]
+    check = inm.contains_weak if weak else inm.contains
+    return any(check(candidate) for candidate in candidates)
+
+
+def apply_etag(request: Any, response: Any) -> Any:
+    """Tag GET JSON responses and answer If-None-Match with 304.
+
+    Views may set their own (usually weak) ETag from a row version; otherwise
+    a strong ETag is derived from the body.
+    """
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+    if response.mimetype != "application/json" or not _is_buffered(response):
+        return response
+    tag, weak = response.get_etag()
+    if tag is None:
+        tag, weak = body_etag(response), False
+        response.set_etag(tag)
+    if _matches(request, tag, weak):
+        response.status_code = 304
+        response.set_data(b"")
+        response.headers.pop("Content-Length", None)
+    return response
+
+
+def choose_encoding(request: Any) -> Optional[str]:
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def compress_response(request: Any, response: Any, min_size: int = 1024, level: int = 6) -> Any:
+    """gzip/brotli-encode buffered text responses of at least `min_size` bytes."""
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or not _is_buffered(response):
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request)
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=min(11, max(0, level)))
+    else:
+        compressed = gzip.compress(body, compresslevel=min(9, max(1, level)))
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    tag, weak = response.get_etag()
+    if tag is not None and not weak:
+        # A different encoding is a different strong representation
+        response.set_etag(f"{tag}-{encoding}")
+    return response
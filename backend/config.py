@@ -6,6 +6,9 @@ from dotenv import load_dotenv
 # Load environment variables from a .env file if present
 load_dotenv()
 
+# Placeholder SECRET_KEY; anything signed with it can be forged
+DEFAULT_SECRET_KEY = "dev-secret-key-change-in-production"
+
 
 def _cors_origins_from_env(defaults: List[str]) -> List[str]:
     raw = os.getenv("CORS_ORIGINS")
@@ -19,7 +22,7 @@ class Config:
     """Base configuration class"""
 
     # IMPORTANT: Override in production via environment variables
-    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")
+    SECRET_KEY = os.environ.get("SECRET_KEY", DEFAULT_SECRET_KEY)
 
     # Supabase configuration
     SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -29,8 +32,51 @@ class Config:
     )
     SUPABASE_KEY = os.environ.get("SUPABASE_KEY") or os.environ.get("SUPABASE_ANON_KEY")
 
+    # Supabase client pooling: clients are kept per worker thread and reused
+    SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "4"))
+    SUPABASE_HTTP_TIMEOUT = float(os.environ.get("SUPABASE_HTTP_TIMEOUT", "10"))
+    SUPABASE_STORAGE_TIMEOUT = float(os.environ.get("SUPABASE_STORAGE_TIMEOUT", "30"))
+    SUPABASE_MAX_CONNECTIONS = int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "20"))
+    SUPABASE_MAX_KEEPALIVE = int(os.environ.get("SUPABASE_MAX_KEEPALIVE", "10"))
+
+    # Serving mode read by gunicorn.conf.py: "sync" (threaded workers) or
+    # "async" (gevent workers multiplexing many in-flight Supabase calls)
+    SERVER_MODE = os.environ.get("SERVER_MODE", "sync")
+    # Sync defaults match Elastic Beanstalk's stock gunicorn command (3 workers
+    # x 20 threads), which the Procfile replaces
+    SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "3"))
+    SERVER_THREADS = int(os.environ.get("SERVER_THREADS", "20"))
+    SERVER_TIMEOUT = int(os.environ.get("SERVER_TIMEOUT", "60"))
+    ASYNC_WORKER_CONNECTIONS = int(os.environ.get("ASYNC_WORKER_CONNECTIONS", "500"))
+
+    # Local access-token verification (Project Settings -> API -> JWT secret).
+    # Without a secret, tokens are checked against the project's JWKS, then GoTrue.
+    SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+    SUPABASE_JWT_AUDIENCE = os.environ.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+    SUPABASE_JWKS_TTL = float(os.environ.get("SUPABASE_JWKS_TTL", "600"))
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "2048"))
+    AUTH_TOKEN_CACHE_TTL = float(os.environ.get("AUTH_TOKEN_CACHE_TTL", "300"))
+
     # File upload settings
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB (single-request uploads via POST /api/shares)
+    # Resumable uploads (POST /api/uploads): chunks are spooled to disk, not memory.
+    # Keep UPLOAD_MAX_FILE_SIZE within the project's storage "upload file size limit"
+    UPLOAD_MAX_FILE_SIZE = int(os.environ.get("UPLOAD_MAX_FILE_SIZE", str(1024 * 1024 * 1024)))  # 1GB
+    UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))  # suggested to clients
+    UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get("UPLOAD_MAX_CHUNK_SIZE", str(32 * 1024 * 1024)))
+    # Sessions live on the instance that created them: with several instances
+    # behind a load balancer, enable sticky sessions or point this at shared storage
+    UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR")  # defaults to <tmp>/codeshare-uploads
+    # Files above this size go to storage through the TUS resumable endpoint in
+    # 6MB chunks (SUPABASE_STORAGE_TIMEOUT then applies per chunk)
+    STORAGE_RESUMABLE_THRESHOLD = int(os.environ.get("STORAGE_RESUMABLE_THRESHOLD", str(6 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL = float(os.environ.get("UPLOAD_SESSION_TTL", str(24 * 3600)))
+    # Disk budget shared by all open upload sessions (by declared size) and how
+    # many sessions one client may hold open at once; 0 disables either cap
+    UPLOAD_SPOOL_MAX_BYTES = int(os.environ.get("UPLOAD_SPOOL_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))  # 5GB
+    UPLOAD_MAX_SESSIONS_PER_CLIENT = int(os.environ.get("UPLOAD_MAX_SESSIONS_PER_CLIENT", "3"))
+    # Store identical files once, keyed by SHA-256 (needs storage_objects in full_schema.sql)
+    UPLOAD_DEDUP = os.environ.get("UPLOAD_DEDUP", "true").lower() in ("1", "true", "yes")
     ALLOWED_EXTENSIONS = {
         "txt",
         "pdf",
@@ -51,10 +97,110 @@ class Config:
         "gz",
     }
 
+    # /api/files/fetch streams upstream objects; at most one chunk is buffered per request
+    FILE_PROXY_CHUNK_SIZE = int(os.environ.get("FILE_PROXY_CHUNK_SIZE", str(64 * 1024)))
+    FILE_PROXY_TIMEOUT = float(os.environ.get("FILE_PROXY_TIMEOUT", "10"))
+    # Signed URLs for proxy:bucket/path files are cached and re-signed ahead of expiry
+    SIGNED_URL_EXPIRES_IN = int(os.environ.get("SIGNED_URL_EXPIRES_IN", "3600"))
+    SIGNED_URL_REFRESH_MARGIN = int(os.environ.get("SIGNED_URL_REFRESH_MARGIN", "300"))
+    # When enabled, /api/files/fetch answers proxy: URLs with a 302 to the signed URL
+    # instead of relaying the bytes (clients can also opt in with ?redirect=1)
+    FILE_FETCH_REDIRECT = os.environ.get("FILE_FETCH_REDIRECT", "false").lower() in ("1", "true", "yes")
+
+    # Rate limiting: memory:// keeps counters per worker; point every worker at
+    # one store (redis://host:6379/0, or fakeredis:// locally) to share them.
+    # Strategies: sliding-window-counter, moving-window, fixed-window.
+    RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "memory://")
+    RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY", "sliding-window-counter")
+    RATELIMIT_KEY_PREFIX = os.environ.get("RATELIMIT_KEY_PREFIX", "codeshare")
+    RATELIMIT_IN_MEMORY_FALLBACK = os.environ.get("RATELIMIT_IN_MEMORY_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+    # JSON responses: ETag/304 on GETs, gzip (or brotli when installed) above a size threshold.
+    # RESPONSE_COMPRESSION_MIN_SIZE=0 compresses everything; set it very large to disable.
+    RESPONSE_ETAGS = os.environ.get("RESPONSE_ETAGS", "true").lower() in ("1", "true", "yes")
+    RESPONSE_COMPRESSION_MIN_SIZE = int(os.environ.get("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+    RESPONSE_COMPRESSION_LEVEL = int(os.environ.get("RESPONSE_COMPRESSION_LEVEL", "6"))
+
+    # Background Supabase health probing; /supabase/health and /health/ready read
+    # the cached result, reported as stale once older than HEALTH_STALE_AFTER.
+    # Upstream state never fails /health/ready (safe as the EB health check).
+    HEALTH_PROBE_INTERVAL = float(os.environ.get("HEALTH_PROBE_INTERVAL", "30"))
+    HEALTH_STALE_AFTER = float(os.environ.get("HEALTH_STALE_AFTER", "90"))
+
+    # /metrics (Prometheus text format) is served only when this is set, and
+    # scrapers must send "Authorization: Bearer <METRICS_TOKEN>".
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
     # Share settings
-    DEFAULT_EXPIRY_HOURS = 24
-    MAX_EXPIRY_HOURS = 168  # 7 days
-    CODE_LENGTH = 6
+    # Every new share expires; clients may ask for 1..MAX_EXPIRY_HOURS via expires_in_hours
+    DEFAULT_EXPIRY_HOURS = int(os.environ.get("DEFAULT_EXPIRY_HOURS", "24"))
+    MAX_EXPIRY_HOURS = int(os.environ.get("MAX_EXPIRY_HOURS", "168"))  # 7 days
+    CODE_LENGTH = int(os.environ.get("CODE_LENGTH", "6"))
+    # Pre-checked share codes kept in reserve per worker (0 disables the reserve)
+    CODE_POOL_SIZE = int(os.environ.get("CODE_POOL_SIZE", "0"))
+    # Inserts that hit a code collision are retried with a fresh code this many times
+    CODE_ALLOCATION_ATTEMPTS = int(os.environ.get("CODE_ALLOCATION_ATTEMPTS", "5"))
+
+    # werkzeug hash method for share passwords, including its cost, e.g.
+    # "scrypt:32768:8:1" or "pbkdf2:sha256:600000" (empty = werkzeug default).
+    # Hashes made with another method are upgraded on the next successful check.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "")
+    # Lifetime of the signed token issued after a protected share's password check
+    SHARE_ACCESS_TOKEN_TTL = int(os.environ.get("SHARE_ACCESS_TOKEN_TTL", "900"))
+
+    # Janitor: purge expired/exhausted shares and their storage objects.
+    # Each run handles up to JANITOR_BATCH_SIZE * JANITOR_MAX_BATCHES rows;
+    # JANITOR_INTERVAL=0 disables the background thread.
+    JANITOR_INTERVAL = float(os.environ.get("JANITOR_INTERVAL", "900"))
+    JANITOR_BATCH_SIZE = int(os.environ.get("JANITOR_BATCH_SIZE", "500"))
+    JANITOR_MAX_BATCHES = int(os.environ.get("JANITOR_MAX_BATCHES", "10"))
+    JANITOR_STORAGE_BATCH = int(os.environ.get("JANITOR_STORAGE_BATCH", "100"))
+    # Copy purged rows into shares_archive instead of only deleting them
+    JANITOR_ARCHIVE = os.environ.get("JANITOR_ARCHIVE", "false").lower() in ("1", "true", "yes")
+    # Also purge deactivated (is_active = false) shares; off so they can be restored
+    JANITOR_PURGE_INACTIVE = os.environ.get("JANITOR_PURGE_INACTIVE", "false").lower() in ("1", "true", "yes")
+
+    # Share read cache: memory:// (per worker) or redis://host:6379/0 (shared).
+    # SHARE_CACHE_TTL=0 disables caching.
+    SHARE_CACHE_URL = os.environ.get("SHARE_CACHE_URL", "memory://")
+    SHARE_CACHE_SIZE = int(os.environ.get("SHARE_CACHE_SIZE", "2048"))
+    SHARE_CACHE_TTL = float(os.environ.get("SHARE_CACHE_TTL", "30"))
+    # Unknown share codes: misses are remembered for SHARE_MISS_CACHE_TTL seconds
+    # (0 disables). SHARE_CODE_BLOOM_CAPACITY > 0 also keeps a Bloom filter of
+    # every code, rebuilt every SHARE_CODE_BLOOM_REBUILD seconds; a negative is
+    # trusted once the filter has synced rows created up to
+    # SHARE_CODE_BLOOM_SYNC_INTERVAL seconds ago.
+    SHARE_MISS_CACHE_TTL = float(os.environ.get("SHARE_MISS_CACHE_TTL", "30"))
+    SHARE_MISS_CACHE_SIZE = int(os.environ.get("SHARE_MISS_CACHE_SIZE", "10000"))
+    SHARE_CODE_BLOOM_CAPACITY = int(os.environ.get("SHARE_CODE_BLOOM_CAPACITY", "0"))
+    SHARE_CODE_BLOOM_ERROR_RATE = float(os.environ.get("SHARE_CODE_BLOOM_ERROR_RATE", "0.01"))
+    SHARE_CODE_BLOOM_REBUILD = float(os.environ.get("SHARE_CODE_BLOOM_REBUILD", "3600"))
+    SHARE_CODE_BLOOM_SYNC_INTERVAL = float(os.environ.get("SHARE_CODE_BLOOM_SYNC_INTERVAL", "1"))
+    # View accounting: "atomic" counts each view in the database (open_share /
+    # view_share), enforcing max_views exactly under concurrency; "batched"
+    # buffers increments in process and flushes them with increment_share_views,
+    # for very hot shares. Shares with max_views are always counted atomically.
+    SHARE_VIEW_MODE = os.environ.get("SHARE_VIEW_MODE", "atomic").lower()
+    # View counts are buffered and written in batches; interval 0 writes each view
+    SHARE_VIEW_FLUSH_INTERVAL = float(os.environ.get("SHARE_VIEW_FLUSH_INTERVAL", "5"))
+    SHARE_VIEW_FLUSH_BATCH = int(os.environ.get("SHARE_VIEW_FLUSH_BATCH", "200"))
+
+    # POST /api/shares/bulk: items per request, combined file bytes, and how
+    # many storage uploads run at once
+    SHARE_BULK_MAX_ITEMS = int(os.environ.get("SHARE_BULK_MAX_ITEMS", "50"))
+    SHARE_BULK_MAX_BYTES = int(os.environ.get("SHARE_BULK_MAX_BYTES", str(100 * 1024 * 1024)))
+    SHARE_BULK_UPLOAD_WORKERS = int(os.environ.get("SHARE_BULK_UPLOAD_WORKERS", "4"))
+    # Most codes accepted by POST /api/shares/batch
+    SHARE_BATCH_MAX_CODES = int(os.environ.get("SHARE_BATCH_MAX_CODES", "50"))
+
+    # Keyset pagination for /api/me/shares and /api/me/activity
+    SHARES_PAGE_SIZE = int(os.environ.get("SHARES_PAGE_SIZE", "50"))
+    ACTIVITY_PAGE_SIZE = int(os.environ.get("ACTIVITY_PAGE_SIZE", "10"))
+    MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "200"))
+    # /api/me/dashboard: concurrent upstream queries per request and how long
+    # to wait for each before reporting that section as failed
+    DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", "8"))
+    DASHBOARD_TIMEOUT = float(os.environ.get("DASHBOARD_TIMEOUT", "15"))
 
     # CORS settings
     CORS_ORIGINS = _cors_origins_from_env(
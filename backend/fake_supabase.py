@@ -0,0 +1,643 @@
+import json
+import base64
+import time
+import uuid
+import random
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+try:
+    import jwt  # type: ignore  # PyJWT, installed with supabase/gotrue
+except ImportError:  # pragma: no cover - tokens need PyJWT
+    jwt = None  # type: ignore
+
+from analytics import summarize_shares
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, body: Dict[str, Any]):
+        super().__init__(body.get("message"))
+        self.status = status
+        self.body = body
+
+
+def _pg_error(status: int, code: str, message: str) -> _HTTPError:
+    return _HTTPError(status, {"code": code, "message": message, "details": None, "hint": None})
+
+
+def _unquote_value(raw: str) -> str:
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        return raw[1:-1].replace('\\"', '"')
+    return raw
+
+
+def _split_list(raw: str) -> List[str]:
+    """Split a PostgREST (a,"b,c",d) list, honouring double quotes."""
+    inner = raw[1:-1] if raw.startswith("(") and raw.endswith(")") else raw
+    items, current, quoted = [], "", False
+    for ch in inner:
+        if ch == '"':
+            quoted = not quoted
+        if ch == "," and not quoted:
+            items.append(_unquote_value(current))
+            current = ""
+        else:
+            current += ch
+    if current:
+        items.append(_unquote_value(current))
+    return items
+
+
+def _coerce(sample: Any, raw: Optional[str]) -> Any:
+    """Convert a query-string value to the type of the column value it is compared with."""
+    if raw is None or raw == "null":
+        return None
+    if isinstance(sample, bool):
+        return raw.lower() == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        return float(raw)
+    return raw
+
+
+def _split_terms(raw: str) -> List[str]:
+    """Split the inside of an or=(...)/and(...) group at top-level commas."""
+    terms, current, depth, quoted = [], "", 0, False
+    for ch in raw:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            terms.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        terms.append(current)
+    return terms
+
+
+def _matches_logic(row: Dict[str, Any], operator: str, raw: str) -> bool:
+    """Evaluate an or=(a.eq.1,and(b.lt.2,c.gt.3)) style group against a row."""
+    inner = raw[1:-1] if raw.startswith("(") and raw.endswith(")") else raw
+    results = []
+    for term in _split_terms(inner):
+        for nested in ("and", "or"):
+            if term.startswith(nested + "("):
+                results.append(_matches_logic(row, nested, term[len(nested):]))
+                break
+        else:
+            column, _, expr = term.partition(".")
+            results.append(_matches(row, column, expr))
+    return any(results) if operator == "or" else all(results)
+
+
+def _matches(row: Dict[str, Any], column: str, expr: str) -> bool:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[len("not."):]
+    op, _, raw = expr.partition(".")
+    value = row.get(column)
+    if op == "is":
+        result = value is None if raw == "null" else value is _coerce(True, raw)
+    elif op == "in":
+        result = value in [_coerce(value, item) for item in _split_list(raw)]
+    elif op in ("eq", "neq", "lt", "lte", "gt", "gte"):
+        other = _coerce(value, _unquote_value(raw))
+        if value is None or other is None:
+            result = op == "neq" and value is not other
+        else:
+            result = {
+                "eq": value == other,
+                "neq": value != other,
+                "lt": value < other,
+                "lte": value <= other,
+                "gt": value > other,
+                "gte": value >= other,
+            }[op]
+    else:
+        raise _pg_error(400, "PGRST100", f"unsupported operator {op!r} in fake Supabase")
+    return not result if negate else result
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once; the default backlog of 5 drops them
+    request_queue_size = 256
+
+
+class FakeSupabase:
+    """In-process stand-in for the Supabase REST, RPC, auth and storage APIs.
+
+    Serves enough of PostgREST (eq/neq/lt/gt/in/is filters, or/and groups,
+    select, order, limit, count=exact), the RPCs in database/full_schema.sql,
+    GoTrue's /user and /health endpoints and the storage object and TUS
+    resumable upload APIs for the real supabase-py client to run against it
+    unchanged. Every request sleeps for the configured latency first (per
+    API: rest, rpc, auth, storage) so benchmarks can model a remote project.
+    RPCs listed in `missing_rpcs` answer 404 like an undeployed function,
+    exercising the fallback paths.
+    """
+
+    KINDS = ("rest", "rpc", "auth", "storage")
+
+    def __init__(
+        self,
+        latency: Union[float, Dict[str, float]] = 0.0,
+        jitter: float = 0.0,
+        missing_rpcs: Iterable[str] = (),
+        jwt_secret: str = "fake-supabase-jwt-secret-for-local-benchmarks",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        if isinstance(latency, dict):
+            self.latency = {kind: float(latency.get(kind, 0.0)) for kind in self.KINDS}
+        else:
+            self.latency = {kind: float(latency) for kind in self.KINDS}
+        self.jitter = float(jitter)
+        self.missing_rpcs = set(missing_rpcs)
+        self.jwt_secret = jwt_secret
+        self.tables: Dict[str, List[Dict[str, Any]]] = {"shares": [], "activities": [], "storage_objects": []}
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.resumable: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {kind: 0 for kind in self.KINDS}
+        # (method, path, query params) of every request, for tests to inspect
+        self.requests: List[Tuple[str, str, List[Tuple[str, str]]]] = []
+        # Argument names PostgREST matches RPC calls against; change them to
+        # model a schema that declares a function differently
+        self.rpc_params: Dict[str, Tuple[str, ...]] = {"get_share_by_code": ("share_code",)}
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._rpcs: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "get_share_by_code": self._rpc_get_share_by_code,
+            "view_share": self._rpc_view_share,
+            "open_share": self._rpc_open_share,
+            "view_shares": self._rpc_view_shares,
+            "increment_share_views": self._rpc_increment_share_views,
+            "get_user_share_stats": self._rpc_get_user_share_stats,
+            "get_user_share_analytics": self._rpc_get_user_share_analytics,
+            "claim_storage_object": self._rpc_claim_storage_object,
+            "mark_storage_object_ready": self._rpc_mark_storage_object_ready,
+            "release_storage_object": self._rpc_release_storage_object,
+            "purge_expired_shares": self._rpc_purge_expired_shares,
+        }
+        self._server = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    # -- lifecycle -------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def service_key(self) -> str:
+        return self._encode({"role": "service_role", "iss": "supabase"})
+
+    def start(self) -> "FakeSupabase":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="fake-supabase", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def __enter__(self) -> "FakeSupabase":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # -- fixtures --------------------------------------------------------
+
+    def _encode(self, claims: Dict[str, Any]) -> str:
+        if jwt is None:  # pragma: no cover
+            raise RuntimeError("PyJWT is required for fake Supabase tokens")
+        return jwt.encode(claims, self.jwt_secret, algorithm="HS256")
+
+    def issue_token(self, user_id: str, email: Optional[str] = None, ttl: int = 3600) -> str:
+        """An HS256 access token for `user_id`, as GoTrue would sign it."""
+        return self._encode({
+            "sub": user_id,
+            "email": email or f"{user_id}@example.com",
+            "role": "authenticated",
+            "aud": "authenticated",
+            "exp": int(time.time()) + ttl,
+        })
+
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a row directly, applying the same defaults and constraints as the API."""
+        with self._lock:
+            rows = self.tables.setdefault(table, [])
+            row = dict(row)
+            if table == "shares":
+                row["code"] = str(row.get("code") or "").upper()
+                if any(existing["code"] == row["code"] for existing in rows):
+                    raise _pg_error(409, "23505", 'duplicate key value violates unique constraint "shares_code_key"')
+                for column, default in (("view_count", 0), ("is_active", True), ("is_protected", False), ("max_views", None), ("expires_at", None)):
+                    row.setdefault(column, default)
+            self._ids[table] = self._ids.get(table, 0) + 1
+            row.setdefault("id", self._ids[table])
+            row.setdefault("created_at", _now())
+            rows.append(row)
+            return row
+
+    def put_object(self, bucket: str, path: str, data: bytes) -> None:
+        with self._lock:
+            self.objects[(bucket, path)] = data
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.calls = {kind: 0 for kind in self.KINDS}
+            self.requests = []
+
+    # -- PostgREST -------------------------------------------------------
+
+    def _select(self, table: str, params: List[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], int]:
+        rows = list(self.tables.get(table, []))
+        columns, order, limit, offset = None, None, None, 0
+        for key, value in params:
+            if key == "select":
+                columns = None if value.strip() == "*" else [c.strip() for c in value.split(",") if c.strip()]
+            elif key == "order":
+                order = value
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key in ("or", "and"):
+                rows = [row for row in rows if _matches_logic(row, key, value)]
+            else:
+                rows = [row for row in rows if _matches(row, key, value)]
+        if order:
+            for term in reversed(order.split(",")):
+                column, _, direction = term.partition(".")
+                desc = direction.startswith("desc")
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        total = len(rows)
+        rows = rows[offset:offset + limit if limit is not None else None]
+        if columns is not None:
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        return rows, total
+
+    def _rest(self, method: str, table: str, params: List[Tuple[str, str]], body: Any, prefer: str) -> Tuple[int, Any, Dict[str, str]]:
+        headers: Dict[str, str] = {}
+        with self._lock:
+            if method in ("GET", "HEAD"):
+                rows, total = self._select(table, params)
+                if "count=exact" in prefer:
+                    headers["Content-Range"] = f"0-{max(len(rows) - 1, 0)}/{total}"
+                return 200, rows, headers
+            if method == "POST":
+                payload = body if isinstance(body, list) else [body]
+                before = list(self.tables.get(table, []))
+                try:
+                    inserted = [self.insert(table, row) for row in payload]
+                except _HTTPError:
+                    # One statement: a bulk insert that fails leaves no rows behind
+                    self.tables[table] = before
+                    raise
+                return 201, inserted, headers
+            filters = [(k, v) for k, v in params if k not in ("select", "order", "limit", "offset")]
+            matched, _ = self._select(table, filters)
+            ids = {id(row) for row in matched}
+            if method == "PATCH":
+                for row in matched:
+                    row.update(body or {})
+                return 200, matched, headers
+            if method == "DELETE":
+                self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in ids]
+                return 200, matched, headers
+        raise _pg_error(405, "PGRST105", f"{method} not supported")
+
+    # -- RPCs ------------------------------------------------------------
+
+    def _share(self, code: Any) -> Optional[Dict[str, Any]]:
+        code = str(code or "").upper()
+        return next((row for row in self.tables["shares"] if row["code"] == code), None)
+
+    @staticmethod
+    def _servable(row: Dict[str, Any]) -> bool:
+        if not row.get("is_active", True):
+            return False
+        if row.get("expires_at") and row["expires_at"] <= _now():
+            return False
+        max_views = row.get("max_views")
+        return max_views is None or int(row.get("view_count") or 0) < int(max_views)
+
+    def _rpc_get_share_by_code(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        code = params.get("share_code") or params.get("_code") or params.get("code")
+        row = self._share(code)
+        return [dict(row)] if row and self._servable(row) else []
+
+    def _rpc_view_share(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        row = self._share(params.get("share_code"))
+        if row is None or not self._servable(row):
+            return []
+        row["view_count"] = int(row.get("view_count") or 0) + 1
+        self.insert("activities", {"share_id": row["id"], "user_id": row.get("user_id"), "activity_type": "VIEW"})
+        return [dict(row)]
+
+    def _rpc_view_shares(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        codes = {str(code).upper() for code in params.get("share_codes") or []}
+        viewed = []
+        for code in sorted(codes):
+            viewed.extend(self._rpc_view_share({"share_code": code}))
+        return viewed
+
+    def _rpc_open_share(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        row = self._share(params.get("share_code"))
+        if row is not None and row.get("is_protected"):
+            return [dict(row)] if self._servable(row) else []
+        return self._rpc_view_share(params)
+
+    def _rpc_increment_share_views(self, params: Dict[str, Any]) -> int:
+        updated = 0
+        for code, delta in zip(params.get("share_codes") or [], params.get("deltas") or []):
+            row = self._share(code)
+            if row is not None:
+                row["view_count"] = int(row.get("view_count") or 0) + int(delta)
+                updated += 1
+        return updated
+
+    def _user_shares(self, user_id: Any) -> List[Dict[str, Any]]:
+        return [row for row in self.tables["shares"] if row.get("user_id") == user_id]
+
+    def _rpc_get_user_share_stats(self, params: Dict[str, Any]) -> Dict[str, int]:
+        rows = self._user_shares(params.get("p_user_id"))
+        return {"total_shares": len(rows), "total_views": sum(int(row.get("view_count") or 0) for row in rows)}
+
+    def _rpc_get_user_share_analytics(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return summarize_shares(
+            self._user_shares(params.get("p_user_id")),
+            int(params.get("p_top_n") or 5),
+            int(params.get("p_recent_days") or 7),
+            int(params.get("p_history_days") or 30),
+        )
+
+    def _rpc_claim_storage_object(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        objects = self.tables["storage_objects"]
+        existing = next((row for row in objects if row["digest"] == params.get("p_digest")), None)
+        if existing is not None:
+            existing["ref_count"] += 1
+            return {"bucket": existing["bucket"], "path": existing["path"], "created": False, "ready": existing["ready"]}
+        self.insert("storage_objects", {
+            "digest": params.get("p_digest"),
+            "bucket": params.get("p_bucket"),
+            "path": params.get("p_path"),
+            "size": params.get("p_size"),
+            "ref_count": 1,
+            "ready": False,
+        })
+        return {"bucket": params.get("p_bucket"), "path": params.get("p_path"), "created": True, "ready": False}
+
+    def _rpc_mark_storage_object_ready(self, params: Dict[str, Any]) -> None:
+        for row in self.tables["storage_objects"]:
+            if row["digest"] == params.get("p_digest"):
+                row["ready"] = True
+        return None
+
+    def _rpc_release_storage_object(self, params: Dict[str, Any]) -> Optional[int]:
+        objects = self.tables["storage_objects"]
+        existing = next((row for row in objects if row["digest"] == params.get("p_digest")), None)
+        if existing is None:
+            return None
+        existing["ref_count"] -= 1
+        if existing["ref_count"] <= 0:
+            objects.remove(existing)
+            return 0
+        return existing["ref_count"]
+
+    def _rpc_purge_expired_shares(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        now = _now()
+        doomed = [
+            row for row in sorted(self.tables["shares"], key=lambda row: row["id"])
+            if (row.get("expires_at") and row["expires_at"] <= now)
+            or (row.get("max_views") is not None and int(row.get("view_count") or 0) >= int(row["max_views"]))
+            or (params.get("p_include_inactive") and row.get("is_active") is False)
+        ][:int(params.get("p_limit") or 500)]
+        ids = {row["id"] for row in doomed}
+        if params.get("p_archive"):
+            self.tables.setdefault("shares_archive", []).extend(dict(row, archived_at=now) for row in doomed)
+        for activity in self.tables["activities"]:
+            if activity.get("share_id") in ids:
+                activity["share_id"] = None
+        self.tables["shares"] = [row for row in self.tables["shares"] if row["id"] not in ids]
+        return [{"code": row["code"], "file_url": row.get("file_url"), "content_digest": row.get("content_digest")} for row in doomed]
+
+    def _rpc(self, name: str, params: Dict[str, Any]) -> Any:
+        fn = self._rpcs.get(name)
+        expected = self.rpc_params.get(name)
+        if fn is None or name in self.missing_rpcs or (expected is not None and set(params or {}) != set(expected)):
+            raise _pg_error(404, "PGRST202", f"Could not find the function public.{name} in the schema cache")
+        with self._lock:
+            return fn(params or {})
+
+    # -- auth ------------------------------------------------------------
+
+    def _auth(self, method: str, path: str, headers: Any) -> Any:
+        if path == "/auth/v1/health":
+            return {"name": "GoTrue", "version": "fake"}
+        if path == "/auth/v1/.well-known/jwks.json":
+            return {"keys": []}
+        if path == "/auth/v1/user" and method == "GET":
+            token = (headers.get("Authorization") or "").partition(" ")[2]
+            try:
+                claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience="authenticated")
+            except Exception:
+                raise _HTTPError(401, {"code": 401, "msg": "invalid JWT"})
+            return {"id": claims["sub"], "email": claims.get("email"), "role": claims.get("role"), "aud": "authenticated"}
+        raise _HTTPError(404, {"code": 404, "msg": f"{path} not supported by the fake Supabase"})
+
+    # -- storage ---------------------------------------------------------
+
+    @staticmethod
+    def _multipart_file(content_type: str, body: bytes) -> bytes:
+        boundary = content_type.partition("boundary=")[2].strip('"')
+        if not boundary:
+            return body
+        for part in body.split(b"--" + boundary.encode("latin-1")):
+            head, sep, content = part.partition(b"\r\n\r\n")
+            if sep and b'name="file"' in head:
+                return content[:-2] if content.endswith(b"\r\n") else content
+        return body
+
+    def _storage(self, method: str, path: str, headers: Any, body: bytes) -> Tuple[int, Any]:
+        rest = path[len("/storage/v1/"):]
+        if rest.rstrip("/") == "bucket" and method == "GET":
+            buckets = sorted({bucket for bucket, _ in self.objects} | {"shared-files"})
+            return 200, [
+                {"id": b, "name": b, "owner": "", "public": False, "created_at": _now(), "updated_at": _now(),
+                 "file_size_limit": None, "allowed_mime_types": None}
+                for b in buckets
+            ]
+        if not rest.startswith("object/"):
+            raise _HTTPError(404, {"statusCode": "404", "error": "not_found", "message": "Not supported"})
+        rest = rest[len("object/"):]
+
+        if method == "DELETE":
+            bucket = rest.strip("/")
+            removed = []
+            with self._lock:
+                for name in (json.loads(body or b"{}").get("prefixes") or []):
+                    if self.objects.pop((bucket, name), None) is not None:
+                        removed.append({"name": name, "bucket_id": bucket})
+            return 200, removed
+
+        sign = rest.startswith("sign/")
+        for prefix in ("sign/", "public/", "authenticated/"):
+            if rest.startswith(prefix):
+                rest = rest[len(prefix):]
+                break
+        bucket, _, name = rest.partition("/")
+        name = unquote(name)
+        key = (bucket, name)
+
+        if method in ("POST", "PUT") and sign:
+            if key not in self.objects:
+                raise _HTTPError(400, {"statusCode": "404", "error": "not_found", "message": "Object not found"})
+            return 200, {"signedURL": f"/object/sign/{bucket}/{name}?token={uuid.uuid4().hex}"}
+        if method in ("POST", "PUT"):
+            with self._lock:
+                if key in self.objects and method == "POST" and (headers.get("x-upsert") or "").lower() != "true":
+                    raise _HTTPError(400, {"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"})
+                self.objects[key] = self._multipart_file(headers.get("Content-Type") or "", body)
+            return 200, {"Key": f"{bucket}/{name}"}
+        if method in ("GET", "HEAD"):
+            data = self.objects.get(key)
+            if data is None:
+                raise _HTTPError(400, {"statusCode": "404", "error": "not_found", "message": "Object not found"})
+            return 200, data
+        raise _HTTPError(405, {"statusCode": "405", "error": "method_not_allowed", "message": method})
+
+    def _resumable(self, method: str, path: str, headers: Any, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        """The TUS endpoint (/storage/v1/upload/resumable): create, PATCH chunks, HEAD offset."""
+        tus = {"Tus-Resumable": "1.0.0"}
+        upload_id = path[len("/storage/v1/upload/resumable"):].strip("/")
+        if method == "POST" and not upload_id:
+            metadata = {}
+            for pair in (headers.get("Upload-Metadata") or "").split(","):
+                name, _, value = pair.strip().partition(" ")
+                if name:
+                    metadata[name] = base64.b64decode(value).decode("utf-8")
+            key = (metadata.get("bucketName"), metadata.get("objectName"))
+            with self._lock:
+                if key in self.objects and (headers.get("x-upsert") or "").lower() != "true":
+                    raise _HTTPError(409, {"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"})
+                upload_id = uuid.uuid4().hex
+                self.resumable[upload_id] = {"key": key, "size": int(headers.get("Upload-Length") or 0), "data": bytearray()}
+            return 201, b"", dict(tus, Location=f"/storage/v1/upload/resumable/{upload_id}")
+        upload = self.resumable.get(upload_id)
+        if upload is None:
+            raise _HTTPError(404, {"statusCode": "404", "error": "not_found", "message": "Upload not found"})
+        if method == "HEAD":
+            return 200, b"", dict(tus, **{"Upload-Offset": str(len(upload["data"])), "Upload-Length": str(upload["size"])})
+        if method == "PATCH":
+            with self._lock:
+                if int(headers.get("Upload-Offset") or -1) != len(upload["data"]):
+                    raise _HTTPError(409, {"message": "Upload-Offset mismatch"})
+                upload["data"].extend(body)
+                if len(upload["data"]) >= upload["size"]:
+                    self.objects[upload["key"]] = bytes(upload["data"])
+                    del self.resumable[upload_id]
+            return 204, b"", dict(tus, **{"Upload-Offset": str(len(upload["data"]))})
+        raise _HTTPError(405, {"statusCode": "405", "error": "method_not_allowed", "message": method})
+
+    # -- HTTP plumbing ---------------------------------------------------
+
+    def _kind(self, path: str) -> str:
+        if path.startswith("/rest/v1/rpc/"):
+            return "rpc"
+        if path.startswith("/auth/"):
+            return "auth"
+        if path.startswith("/storage/"):
+            return "storage"
+        return "rest"
+
+    def _delay(self, kind: str) -> None:
+        delay = self.latency.get(kind, 0.0)
+        if delay and self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def handle(self, method: str, raw_path: str, headers: Any, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        parts = urlsplit(raw_path)
+        path, params = parts.path, parse_qsl(parts.query, keep_blank_values=True)
+        kind = self._kind(path)
+        with self._lock:
+            self.calls[kind] += 1
+            self.requests.append((method, path, params))
+        self._delay(kind)
+        try:
+            if kind == "auth":
+                return 200, self._auth(method, path, headers), {}
+            if path.startswith("/storage/v1/upload/resumable"):
+                return self._resumable(method, path, headers, body)
+            if kind == "storage":
+                status, payload = self._storage(method, path, headers, body)
+                return status, payload, {}
+            payload = json.loads(body) if body else None
+            if kind == "rpc":
+                return 200, self._rpc(path[len("/rest/v1/rpc/"):], payload or {}), {}
+            table = path[len("/rest/v1/"):].strip("/")
+            return self._rest(method, table, params, payload, headers.get("Prefer") or "")
+        except _HTTPError as e:
+            return e.status, e.body, {}
+
+    def _handler_class(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def _dispatch(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload, extra = fake.handle(self.command, self.path, self.headers, body)
+                if isinstance(payload, bytes):
+                    data, content_type = payload, "application/octet-stream"
+                else:
+                    data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_HEAD = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,88 @@
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterator
+
+from flask import Response
+
+from metrics import PROXY_BYTES, observe_upstream
+
+# Request headers forwarded upstream so Range/conditional requests work end to end
+FORWARDED_REQUEST_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+
+# Upstream response headers relayed to the client
+RELAYED_RESPONSE_HEADERS = (
+    "Content-Length",
+    "Content-Range",
+    "Accept-Ranges",
+    "Content-Disposition",
+    "ETag",
+    "Last-Modified",
+    "Cache-Control",
+)
+
+# Statuses that urllib reports as HTTPError but which are valid proxy answers
+PASSTHROUGH_ERROR_STATUSES = {304, 412, 416}
+
+
+def open_upstream(url: str, request_headers: Any, timeout: float = 10.0) -> Any:
+    """Open `url`, forwarding Range and conditional headers from the client request.
+
+    Returns the urllib response object (not yet read). 304/412/416 answers are
+    returned as the HTTPError itself, which exposes the same status/headers API.
+    """
+    headers = {"User-Agent": "api-app/file-fetch"}
+    for name in FORWARDED_REQUEST_HEADERS:
+        value = request_headers.get(name)
+        if value:
+            headers[name] = value
+    req = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        resp = urllib.request.urlopen(req, timeout=timeout)
+    except urllib.error.HTTPError as he:
+        observe_upstream("fetch_file_urlopen", start, he.code)
+        if he.code in PASSTHROUGH_ERROR_STATUSES:
+            return he
+        raise
+    except Exception:
+        observe_upstream("fetch_file_urlopen", start)
+        raise
+    observe_upstream("fetch_file_urlopen", start, resp.getcode())
+    return resp
+
+
+def _iter_chunks(resp: Any, chunk_size: int) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = resp.read(chunk_size)
+            if not chunk:
+                break
+            PROXY_BYTES.inc(len(chunk))
+            yield chunk
+    finally:
+        resp.close()
+
+
+def stream_response(resp: Any, chunk_size: int = 64 * 1024) -> Response:
+    """Relay an upstream response as a streaming Flask response.
+
+    At most `chunk_size` bytes are held in memory per request; the body is read
+    from the upstream socket only as fast as the client consumes it.
+    """
+    status = resp.getcode() if hasattr(resp, "getcode") else getattr(resp, "code", 200)
+    upstream_headers = resp.headers
+    headers: Dict[str, str] = {}
+    for name in RELAYED_RESPONSE_HEADERS:
+        value = upstream_headers.get(name)
+        if value:
+            headers[name] = value
+    headers.setdefault("Accept-Ranges", "bytes")
+    content_type = upstream_headers.get("Content-Type", "application/octet-stream")
+
+    if status in PASSTHROUGH_ERROR_STATUSES:
+        resp.close()
+        headers.pop("Content-Length", None)
+        return Response(b"", headers=headers, content_type=content_type, status=status)
+
+    return Response(_iter_chunks(resp, chunk_size), headers=headers, content_type=content_type, status=status, direct_passthrough=True)
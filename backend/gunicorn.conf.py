@@ -0,0 +1,18 @@
+# Loaded automatically by gunicorn from the working directory.
+# SERVER_MODE=sync|async picks the worker model at startup (see serving.worker_settings).
+import os
+
+from config import Config
+from serving import worker_settings
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+globals().update(
+    worker_settings(
+        Config.SERVER_MODE,
+        workers=Config.SERVER_WORKERS,
+        threads=Config.SERVER_THREADS,
+        worker_connections=Config.ASYNC_WORKER_CONNECTIONS,
+        timeout=Config.SERVER_TIMEOUT,
+    )
+)
@@ -0,0 +1,87 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Run an expensive health probe on a background thread and cache the result.
+
+    `probe()` returns a report dict with a "status" of "ok" or "degraded".
+    Requests read the last snapshot instead of probing upstream themselves; only
+    the very first read in a process probes inline. The snapshot is reported
+    as stale after `stale_after` seconds without a refresh.
+    """
+
+    def __init__(self, probe: Callable[[], Dict[str, Any]], interval: float = 30.0, stale_after: Optional[float] = None):
+        self._probe = probe
+        self.interval = float(interval)
+        self.stale_after = float(stale_after) if stale_after else max(3 * self.interval, 1.0)
+        self._lock = threading.Lock()
+        self._report: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._probe_ms: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self.probes = 0
+        self.failures = 0
+
+    def refresh(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            report = dict(self._probe())
+        except Exception as e:
+            logger.warning(f"Health probe failed: {e}")
+            report = {"status": "degraded", "error": str(e)}
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        with self._lock:
+            self.probes += 1
+            if report.get("status") != "ok":
+                self.failures += 1
+            self._report = report
+            self._checked_at = time.time()
+            self._probe_ms = elapsed
+        return report
+
+    def snapshot(self) -> Tuple[Dict[str, Any], float]:
+        """Return (report, age_seconds), probing inline only if nothing was cached yet."""
+        with self._lock:
+            report, checked_at = self._report, self._checked_at
+        if report is None or checked_at is None:
+            report = self.refresh()
+            checked_at = self._checked_at or time.time()
+        report = dict(report)
+        report["checked_at"] = checked_at
+        report["probe_ms"] = self._probe_ms
+        return report, round(time.time() - checked_at, 3)
+
+    def ready(self) -> Tuple[bool, Dict[str, Any]]:
+        """Readiness from local state only: the process serves and the probe runs.
+
+        Upstream health is reported under "upstream" but never fails readiness,
+        so a Supabase blip does not take every instance out of service at once.
+        """
+        probing = self.interval <= 0 or (self._thread is not None and self._thread.is_alive())
+        with self._lock:
+            report, checked_at = self._report, self._checked_at
+        if report is None or checked_at is None:
+            upstream, age = "starting", None
+        else:
+            age = round(time.time() - checked_at, 3)
+            upstream = report.get("status") if age <= self.stale_after else "stale"
+        return probing, {"status": "ready" if probing else "probe stopped", "upstream": upstream, "age_seconds": age}
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"interval": self.interval, "stale_after": self.stale_after, "probes": self.probes, "failures": self.failures}
@@ -0,0 +1,184 @@
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from supabase_client import rpc_release_storage_object
+
+logger = logging.getLogger(__name__)
+
+PURGE_COLUMNS = "id, code, file_url, content_digest"
+
+
+def storage_location(file_url: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(bucket, path) for a share's file_url, or None when it is not in our storage.
+
+    Understands proxy:bucket/path and Supabase public/signed object URLs.
+    """
+    if not file_url:
+        return None
+    if file_url.startswith("proxy:"):
+        bucket, _, path = file_url[len("proxy:"):].partition("/")
+        return (bucket, path) if bucket and path else None
+    parts = urlparse(file_url).path.split("/")
+    try:
+        idx = parts.index("object")
+    except ValueError:
+        return None
+    # /storage/v1/object/{public|sign|authenticated}/<bucket>/<path...>
+    rest = parts[idx + 2:]
+    if len(rest) < 2:
+        return None
+    return rest[0], unquote("/".join(rest[1:]))
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ShareJanitor:
+    """Delete expired or exhausted shares and the storage objects they own.
+
+    Each run claims up to `batch_size` rows per round trip with the
+    purge_expired_shares RPC (which archives them first when `archive` is
+    set, and also takes deactivated shares when `include_inactive` is) for
+    at most `max_batches` batches, then removes the files in
+    `storage_batch`-sized remove() calls. Content-addressed objects are only
+    removed once their last reference is released. Runs every `interval`
+    seconds on a daemon thread once start() is called.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Tuple[Any, Optional[str]]],
+        batch_size: int = 500,
+        max_batches: int = 10,
+        storage_batch: int = 100,
+        interval: float = 900.0,
+        archive: bool = False,
+        include_inactive: bool = False,
+        on_purged: Optional[Callable[[List[str]], None]] = None,
+    ):
+        self._get_client = get_client
+        self.batch_size = max(1, int(batch_size))
+        self.max_batches = max(1, int(max_batches))
+        self.storage_batch = max(1, int(storage_batch))
+        self.interval = float(interval)
+        self.archive = bool(archive)
+        self.include_inactive = bool(include_inactive)
+        self._on_purged = on_purged
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.rows_purged = 0
+        self.objects_removed = 0
+        self.failures = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _claim_batch(self, client: Any) -> List[Dict[str, Any]]:
+        try:
+            params = {"p_limit": self.batch_size, "p_archive": self.archive, "p_include_inactive": self.include_inactive}
+            resp = client.rpc("purge_expired_shares", params).execute()
+            return list(getattr(resp, "data", None) or [])
+        except Exception as rpc_err:
+            logger.debug(f"purge_expired_shares unavailable, purging expired rows directly: {rpc_err}")
+
+        # Without the RPC only time-expired rows can be found (max_views needs a
+        # column comparison PostgREST cannot express); archiving is skipped.
+        now = datetime.now(timezone.utc).isoformat()
+        resp = client.table("shares").select(PURGE_COLUMNS).lt("expires_at", now).limit(self.batch_size).execute()
+        rows = list(getattr(resp, "data", None) or [])
+        ids = [row["id"] for row in rows]
+        if ids:
+            client.table("activities").update({"share_id": None}).in_("share_id", ids).execute()
+            client.table("shares").delete().in_("id", ids).execute()
+        return rows
+
+    def _remove_objects(self, client: Any, rows: List[Dict[str, Any]]) -> int:
+        by_bucket: Dict[str, List[str]] = {}
+        for row in rows:
+            location = storage_location(row.get("file_url"))
+            if location is None:
+                continue
+            digest = row.get("content_digest")
+            if digest:
+                remaining, err = rpc_release_storage_object(client, digest)
+                if err or remaining != 0:
+                    # Still referenced by another share, or not a known object: keep it
+                    continue
+            bucket, path = location
+            by_bucket.setdefault(bucket, []).append(path)
+
+        removed = 0
+        for bucket, paths in by_bucket.items():
+            storage = client.storage.from_(bucket)
+            for chunk in _chunks(sorted(set(paths)), self.storage_batch):
+                try:
+                    storage.remove(chunk)
+                    removed += len(chunk)
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning(f"Failed to remove {len(chunk)} objects from {bucket}: {e}")
+        return removed
+
+    def run_once(self) -> Dict[str, int]:
+        """Run up to max_batches purge batches now; returns what was removed."""
+        with self._lock:
+            started = time.time()
+            purged = removed = 0
+            try:
+                client, err = self._get_client()
+                if err or client is None:
+                    raise RuntimeError(err or "Failed to create Supabase client")
+                for _ in range(self.max_batches):
+                    rows = self._claim_batch(client)
+                    if not rows:
+                        break
+                    purged += len(rows)
+                    removed += self._remove_objects(client, rows)
+                    if self._on_purged is not None:
+                        self._on_purged([row.get("code") for row in rows if row.get("code")])
+                    if len(rows) < self.batch_size:
+                        break
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning(f"Share janitor run failed: {e}")
+            self.runs += 1
+            self.rows_purged += purged
+            self.objects_removed += removed
+            self.last_run_at = started
+            self.last_run_seconds = round(time.time() - started, 3)
+            if purged:
+                logger.info(f"Share janitor purged {purged} shares and {removed} storage objects")
+            return {"rows": purged, "objects": removed}
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="share-janitor", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.run_once()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "rows_purged": self.rows_purged,
+            "objects_removed": self.objects_removed,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": self.last_error,
+        }
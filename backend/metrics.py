@@ -0,0 +1,265 @@
+import time
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers fast cache hits through slow storage uploads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def collect(self) -> Tuple[str, List[Sample]]:
+        with self._lock:
+            items = list(self._values.items())
+        return "counter", [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-1] += value
+
+    def time(self, **labels: Any) -> "_Timer":
+        return _Timer(self, labels)
+
+    def count(self, **labels: Any) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            row = self._values.get(key)
+            return int(sum(row[:-1])) if row else 0
+
+    def collect(self) -> Tuple[str, List[Sample]]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        samples: List[Sample] = []
+        for key, row in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative))
+            samples.append((f"{self.name}_count", labels, cumulative))
+            samples.append((f"{self.name}_sum", labels, row[-1]))
+        return "histogram", samples
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+
+class MetricsRegistry:
+    """Minimal Prometheus text-format registry (per process).
+
+    Collectors registered with add_collector() are called at scrape time and
+    return (name, type, help, [(labels, value), ...]) tuples, which is how
+    existing stats() dicts are exported without duplicating their counters.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: Any) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            kind, samples = metric.collect()
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter("http_requests_total", "HTTP requests handled, by endpoint, method and status.", ("endpoint", "method", "status"))
+REQUEST_LATENCY = registry.histogram("http_request_duration_seconds", "Time to produce the response, by endpoint.", ("endpoint", "method"))
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Supabase and storage calls, time until response headers, by call type.",
+    ("call", "status"),
+)
+UPSTREAM_ERRORS = registry.counter("upstream_errors_total", "Upstream calls that failed without a response.", ("call",))
+PROXY_BYTES = registry.counter("file_proxy_bytes_total", "Bytes relayed to clients by /api/files/fetch.")
+RATE_LIMITED = registry.counter("rate_limit_rejections_total", "Requests rejected with 429, by endpoint.", ("endpoint",))
+
+
+def classify_supabase_request(method: str, path: str) -> str:
+    """Name the upstream call type for a Supabase REST/auth/storage request path."""
+    method = method.upper()
+    if path.startswith("/rest/v1/rpc/"):
+        return "rpc"
+    if path.startswith("/rest/v1/"):
+        return {
+            "GET": "postgrest_select",
+            "HEAD": "postgrest_select",
+            "POST": "postgrest_insert",
+            "PATCH": "postgrest_update",
+            "DELETE": "postgrest_delete",
+        }.get(method, "postgrest_other")
+    if path.startswith("/auth/v1/"):
+        if path.rstrip("/") == "/auth/v1/user":
+            return "auth_get_user"
+        if path.startswith("/auth/v1/token"):
+            return "auth_token"
+        return "auth_other"
+    if path.startswith("/storage/v1/object/sign/"):
+        return "storage_create_signed_url"
+    if path.startswith("/storage/v1/object/list/"):
+        return "storage_list"
+    if path.startswith("/storage/v1/object/"):
+        return {
+            "POST": "storage_upload",
+            "PUT": "storage_upload",
+            "GET": "storage_download",
+            "DELETE": "storage_remove",
+        }.get(method, "storage_other")
+    if path.startswith("/storage/v1/"):
+        return "storage_other"
+    return "other"
+
+
+def instrument_http_client(http_client: Any, classify: Callable[[str, str], str] = classify_supabase_request) -> None:
+    """Attach httpx event hooks that time every request made by `http_client`."""
+    if getattr(http_client, "_metrics_instrumented", False):
+        return
+
+    def on_request(request: Any) -> None:
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    def on_response(response: Any) -> None:
+        request = response.request
+        start = request.extensions.get("metrics_start")
+        if start is None:
+            return
+        call = classify(request.method, request.url.path)
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, call=call, status=f"{response.status_code // 100}xx")
+
+    hooks = http_client.event_hooks
+    hooks.setdefault("request", []).append(on_request)
+    hooks.setdefault("response", []).append(on_response)
+    http_client.event_hooks = hooks
+    http_client._metrics_instrumented = True
+
+
+def stats_collector(name: str, documentation: str, sources: Callable[[], Dict[str, Dict[str, Any]]], fields: Iterable[str]) -> Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]:
+    """Export numeric fields of several stats() dicts as gauges labelled by source.
+
+    e.g. fields=("hits", "misses", "hit_ratio") yields cache_hits{cache="share"} ...
+    """
+    fields = tuple(fields)
+
+    def collect() -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+        stats = sources()
+        families = []
+        for field in fields:
+            samples = []
+            for source, values in stats.items():
+                value = values.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    samples.append(({name: source}, float(value)))
+            families.append((f"{name}_{field}", "gauge", f"{documentation} ({field})", samples))
+        return families
+
+    return collect
+
+
+def observe_upstream(call: str, start: float, status: Optional[int] = None) -> None:
+    """Record a non-httpx upstream call (e.g. urllib) that started at perf_counter() `start`."""
+    label = f"{status // 100}xx" if status else "error"
+    UPSTREAM_LATENCY.observe(time.perf_counter() - start, call=call, status=label)
+    if not status:
+        UPSTREAM_ERRORS.inc(call=call)
@@ -0,0 +1,249 @@
+import math
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Incremental syncs re-read this much history so rows committed slightly out of
+# created_at order are not skipped
+SYNC_OVERLAP = timedelta(seconds=10)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01):
+        capacity = max(1, int(capacity))
+        error_rate = min(max(float(error_rate), 1e-9), 0.5)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class NegativeLookupCache:
+    """Answer lookups of share codes that do not exist without a database trip.
+
+    Two layers, both per process:
+
+    * a short-TTL cache of codes the database just reported missing;
+    * optionally (`bloom_capacity` > 0) a Bloom filter of every code in
+      shares, rebuilt every `rebuild_interval` seconds and updated by add()
+      whenever this process creates a share.
+
+    Shares created by other workers only reach the filter through a sync, so
+    a filter negative is trusted only if the filter has caught up with rows
+    created up to `sync_interval` seconds ago; otherwise one incremental sync
+    (shared by all waiting requests) runs first. Until the first rebuild
+    finishes, or when a sync fails, lookups fall through to the database.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Tuple[Any, Optional[str]]],
+        ttl: float = 30.0,
+        maxsize: int = 10000,
+        bloom_capacity: int = 0,
+        bloom_error_rate: float = 0.01,
+        rebuild_interval: float = 3600.0,
+        sync_interval: float = 1.0,
+        page_size: int = 1000,
+    ):
+        self._get_client = get_client
+        self.ttl = float(ttl)
+        self._misses = TTLCache(maxsize=maxsize, ttl=self.ttl) if self.ttl > 0 else None
+        self.bloom_capacity = max(0, int(bloom_capacity))
+        self.bloom_error_rate = float(bloom_error_rate)
+        self.rebuild_interval = float(rebuild_interval)
+        self.sync_interval = float(sync_interval)
+        self.page_size = max(1, int(page_size))
+        self._bloom: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._rebuilding: Optional[List[str]] = None
+        self._synced_at = 0.0
+        self._watermark: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self.cache_hits = 0
+        self.bloom_rejections = 0
+        self.rebuilds = 0
+        self.syncs = 0
+        self.failures = 0
+
+    # -- lookups ---------------------------------------------------------
+
+    def known_missing(self, code: str) -> bool:
+        """True when `code` certainly has no share row (as of the last sync)."""
+        code = code.upper()
+        if self._misses is not None and self._misses.get(code):
+            self.cache_hits += 1
+            return True
+        bloom = self._bloom
+        if bloom is None or code in bloom:
+            return False
+        if time.monotonic() - self._synced_at > self.sync_interval:
+            if not self.sync():
+                return False
+            if code in self._bloom:
+                return False
+        self.bloom_rejections += 1
+        return True
+
+    def record_miss(self, code: str) -> None:
+        if self._misses is not None:
+            self._misses.set(code.upper(), True)
+
+    def add(self, code: str) -> None:
+        """Register a code this process just created."""
+        code = code.upper()
+        if self._misses is not None:
+            self._misses.pop(code)
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(code)
+            if self._rebuilding is not None:
+                self._rebuilding.append(code)
+
+    # -- maintenance -----------------------------------------------------
+
+    def _client(self) -> Any:
+        client, err = self._get_client()
+        if err or client is None:
+            raise RuntimeError(err or "Failed to create Supabase client")
+        return client
+
+    def rebuild(self) -> bool:
+        """Load every share code into a fresh filter and swap it in."""
+        if self.bloom_capacity <= 0:
+            return False
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            self._rebuilding = []
+        try:
+            client = self._client()
+            bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            last_id = None
+            while True:
+                query = client.table("shares").select("id, code")
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                rows = getattr(query.order("id").limit(self.page_size).execute(), "data", None) or []
+                for row in rows:
+                    if row.get("code"):
+                        bloom.add(str(row["code"]).upper())
+                if len(rows) < self.page_size:
+                    break
+                last_id = rows[-1]["id"]
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Failed to rebuild share code filter: {e}")
+            with self._lock:
+                self._rebuilding = None
+            return False
+
+        if bloom.count > self.bloom_capacity:
+            logger.warning(
+                f"Share code filter holds {bloom.count} codes, above its capacity of "
+                f"{self.bloom_capacity}; raise SHARE_CODE_BLOOM_CAPACITY to keep the error rate down"
+            )
+        with self._lock:
+            for code in self._rebuilding or []:
+                bloom.add(code)
+            self._rebuilding = None
+            self._bloom = bloom
+            self._watermark = (started - SYNC_OVERLAP).isoformat()
+            self._synced_at = time.monotonic()
+            self.rebuilds += 1
+        return True
+
+    def sync(self) -> bool:
+        """Add codes created since the last sync; one query however many callers wait."""
+        requested = time.monotonic()
+        with self._sync_lock:
+            if self._synced_at >= requested:
+                return True
+            if self._bloom is None or self._watermark is None:
+                return False
+            started = datetime.now(timezone.utc)
+            codes: List[str] = []
+            try:
+                # Page in (created_at, id) order until a short page, so a burst
+                # of new shares is read completely before the watermark moves
+                client = self._client()
+                last: Optional[Tuple[str, Any]] = None
+                while True:
+                    query = client.table("shares").select("id, code, created_at")
+                    if last is None:
+                        query = query.gte("created_at", self._watermark)
+                    else:
+                        query = query.or_(f'created_at.gt."{last[0]}",and(created_at.eq."{last[0]}",id.gt.{last[1]})')
+                    rows = getattr(query.order("created_at").order("id").limit(self.page_size).execute(), "data", None) or []
+                    codes.extend(str(row["code"]).upper() for row in rows if row.get("code"))
+                    if len(rows) < self.page_size:
+                        break
+                    last = (rows[-1]["created_at"], rows[-1]["id"])
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Failed to sync share code filter: {e}")
+                with self._lock:
+                    # Keep what was read; the watermark stays so the rest is retried
+                    for code in codes:
+                        self._bloom.add(code)
+                return False
+            with self._lock:
+                for code in codes:
+                    self._bloom.add(code)
+                self._watermark = (started - SYNC_OVERLAP).isoformat()
+                self._synced_at = time.monotonic()
+                self.syncs += 1
+            return True
+
+    def start(self) -> None:
+        if self.bloom_capacity <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="share-code-filter", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.rebuild()
+            time.sleep(max(self.rebuild_interval, 1.0))
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        return {
+            "miss_cache": self._misses.stats() if self._misses is not None else None,
+            "bloom": {
+                "capacity": bloom.capacity,
+                "codes": bloom.count,
+                "bits": bloom.size,
+                "hashes": bloom.hashes,
+            } if bloom is not None else None,
+            "cache_hits": self.cache_hits,
+            "bloom_rejections": self.bloom_rejections,
+            "rebuilds": self.rebuilds,
+            "syncs": self.syncs,
+            "failures": self.failures,
+        }
@@ -0,0 +1,67 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past `row` in (created_at DESC, id DESC) order."""
+    raw = json.dumps([row.get("created_at"), row.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed.
+
+    The cursor is client-supplied and ends up inside a PostgREST filter, so
+    created_at is parsed and re-serialized rather than passed through.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(created_at, str):
+            raise ValueError
+        # fromisoformat only accepts a trailing "Z" from Python 3.11 on
+        parsed = datetime.fromisoformat(created_at[:-1] + "+00:00" if created_at.endswith("Z") else created_at)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if isinstance(row_id, bool) or not isinstance(row_id, int) or row_id < 0:
+        raise ValueError("Invalid cursor")
+    return parsed.isoformat(), row_id
+
+
+def page_params(args: Mapping[str, Any], default_limit: int = 50, max_limit: int = 200) -> Tuple[int, Optional[Tuple[str, int]]]:
+    """Read ?limit= and ?cursor= from request args; raises ValueError when invalid."""
+    raw_limit = args.get("limit")
+    try:
+        limit = int(raw_limit) if raw_limit not in (None, "") else default_limit
+    except (TypeError, ValueError):
+        raise ValueError("Invalid limit")
+    if limit < 1:
+        raise ValueError("Invalid limit")
+    limit = min(limit, max_limit)
+    raw_cursor = args.get("cursor")
+    return limit, (decode_cursor(raw_cursor) if raw_cursor else None)
+
+
+def keyset_query(query: Any, cursor: Optional[Tuple[str, int]], limit: int) -> Any:
+    """Apply (created_at, id) keyset ordering to a PostgREST query.
+
+    One extra row is requested so the caller can tell whether another page
+    exists without a count query.
+    """
+    if cursor is not None:
+        created_at, row_id = cursor
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+        )
+    return query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
+
+
+def split_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row and return (page_rows, next_cursor)."""
+    rows = list(rows or [])
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
@@ -0,0 +1,59 @@
+import logging
+from typing import Any, Dict
+
+from limits.storage import RedisStorage
+from limits.strategies import STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRATEGY = "sliding-window-counter"
+
+
+def resolve_strategy(name: str) -> str:
+    """Return `name` if the installed limits package implements it.
+
+    sliding-window-counter needs limits >= 4.1; older installs fall back to
+    moving-window, which also smooths out bursts at window edges.
+    """
+    name = (name or DEFAULT_STRATEGY).lower()
+    if name in STRATEGIES:
+        return name
+    fallback = "moving-window"
+    logger.warning(f"Rate limit strategy {name!r} not available; using {fallback}")
+    return fallback
+
+
+class FakeRedisStorage(RedisStorage):
+    """limits storage for fakeredis://, backed by an in-process fakeredis server.
+
+    Runs the same Lua scripts as the real Redis storage, so tests and local
+    runs exercise the shared-counter code path without a Redis server. Every
+    instance in the process shares one server, like workers sharing Redis.
+    """
+
+    STORAGE_SCHEME = ["fakeredis"]
+    _server: Any = None
+
+    def __init__(self, uri: str, key_prefix: str = RedisStorage.PREFIX, wrap_exceptions: bool = False, **options: Any) -> None:
+        import fakeredis  # type: ignore
+        import redis  # type: ignore
+
+        if FakeRedisStorage._server is None:
+            FakeRedisStorage._server = fakeredis.FakeServer()
+        connection_class = getattr(fakeredis, "FakeRedisConnection", None) or fakeredis.FakeConnection
+        pool = redis.ConnectionPool(connection_class=connection_class, server=FakeRedisStorage._server)
+        super().__init__("redis://localhost", connection_pool=pool, key_prefix=key_prefix, wrap_exceptions=wrap_exceptions, **options)
+
+
+def limiter_options(config: Any) -> Dict[str, Any]:
+    """Keyword arguments for flask_limiter.Limiter built from Config."""
+    uri = config.RATELIMIT_STORAGE_URI or "memory://"
+    options: Dict[str, Any] = {
+        "storage_uri": uri,
+        "strategy": resolve_strategy(config.RATELIMIT_STRATEGY),
+        "key_prefix": config.RATELIMIT_KEY_PREFIX,
+    }
+    if not uri.startswith("memory://"):
+        # Keep limiting per worker if the shared store is unreachable
+        options["in_memory_fallback_enabled"] = config.RATELIMIT_IN_MEMORY_FALLBACK
+    return options
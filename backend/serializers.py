@@ -0,0 +1,42 @@
+import json
+import hashlib
+from typing import Any, Dict, Iterable, Optional
+
+# Field whitelists per endpoint. Anything not listed (password_hash, user_id,
+# content_digest, raw metadata, ...) never leaves the API.
+SHARE_CREATED_FIELDS = (
+    "code", "content_type", "text_content", "file_url", "file_name", "file_size",
+    "is_protected", "language", "metadata", "expires_at",
+)
+SHARE_DETAIL_FIELDS = (
+    "code", "content_type", "text_content", "file_name", "file_size", "file_url",
+    "language", "is_protected", "created_at", "expires_at", "max_views", "view_count",
+    "locked", "access_token",
+)
+# Detail without the text body, for previews and cards
+SHARE_SUMMARY_FIELDS = tuple(f for f in SHARE_DETAIL_FIELDS if f != "text_content") + ("content_length",)
+SHARE_CONTENT_FIELDS = ("code", "content_type", "text_content", "language", "access_token")
+# Fields that change on every read and so are left out of share_version
+VOLATILE_FIELDS = ("view_count", "access_token")
+SHARE_LIST_FIELDS = ("code", "content_type", "file_name", "file_size", "file_url", "created_at", "view_count")
+
+
+def serialize(row: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Copy only whitelisted fields that are present on `row`."""
+    return {field: row[field] for field in fields if field in row}
+
+
+def share_summary(row: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Metadata-only view of a share; the body is fetched from /content."""
+    data = dict(row)
+    data["content_length"] = len(row.get("text_content") or "")
+    if extra:
+        data.update(extra)
+    return serialize(data, SHARE_SUMMARY_FIELDS)
+
+
+def share_version(data: Dict[str, Any]) -> str:
+    """Validator for a serialized share that ignores per-read fields like view_count."""
+    stable = {k: v for k, v in data.items() if k not in VOLATILE_FIELDS}
+    raw = json.dumps(stable, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
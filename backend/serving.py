@@ -0,0 +1,46 @@
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+SERVER_MODES = ("sync", "async")
+
+
+def _gevent_available() -> bool:
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def worker_settings(
+    mode: str = "sync",
+    workers: int = 3,
+    threads: int = 20,
+    worker_connections: int = 500,
+    timeout: int = 60,
+) -> Dict[str, Any]:
+    """Gunicorn settings for the sync or async serving mode.
+
+    sync keeps one blocking request per worker thread. async runs gevent
+    workers: the socket module is patched, so httpx (Supabase REST, GoTrue,
+    storage) and urllib (file proxy) yield while waiting on the network and
+    each process multiplexes up to `worker_connections` in-flight requests
+    through the same Flask routes. Without gevent installed, async degrades
+    to a threaded worker sized to the same concurrency.
+    """
+    mode = (mode or "sync").lower()
+    if mode not in SERVER_MODES:
+        raise ValueError(f"SERVER_MODE must be one of {', '.join(SERVER_MODES)}, got {mode!r}")
+
+    settings: Dict[str, Any] = {"workers": max(1, int(workers)), "timeout": int(timeout)}
+    if mode == "sync":
+        settings.update({"worker_class": "gthread", "threads": max(1, int(threads))})
+    elif _gevent_available():
+        # Workers must import the app after gevent has patched the stdlib
+        settings.update({"worker_class": "gevent", "worker_connections": max(1, int(worker_connections)), "preload_app": False})
+    else:
+        logger.warning("SERVER_MODE=async but gevent is not installed; using threaded workers")
+        settings.update({"worker_class": "gthread", "threads": max(1, int(worker_connections))})
+    return settings
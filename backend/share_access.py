@@ -0,0 +1,80 @@
+import hashlib
+from functools import lru_cache
+from typing import Optional
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import generate_password_hash
+
+
+def hash_share_password(password: str, method: Optional[str] = None) -> str:
+    """Hash a share password with the configured werkzeug method (None = werkzeug default)."""
+    if method:
+        return generate_password_hash(password, method=method)
+    return generate_password_hash(password)
+
+
+@lru_cache(maxsize=8)
+def hash_method_prefix(method: str) -> str:
+    """The method prefix werkzeug writes for `method`, with its defaults filled in.
+
+    Shorthands expand ("scrypt" -> "scrypt:32768:8:1", "pbkdf2" ->
+    "pbkdf2:sha256:<iterations>"), so the configured string cannot be compared
+    to stored hashes directly; hashing once shows the canonical form.
+    """
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def needs_rehash(stored_hash: str, method: Optional[str]) -> bool:
+    """True when `stored_hash` was produced with a different method or cost than `method`."""
+    if not method or not stored_hash:
+        return False
+    return stored_hash.split("$", 1)[0] != hash_method_prefix(method)
+
+
+def cookie_name(code: str) -> str:
+    return f"share_access_{code.upper()}"
+
+
+def _fingerprint(password_hash: str) -> str:
+    # Tokens die with the password: changing it changes the stored hash
+    return hashlib.sha256(password_hash.encode("utf-8")).hexdigest()[:16]
+
+
+class ShareAccessTokens:
+    """Short-lived signed tokens proving a share's password was already checked.
+
+    A token is an HMAC-signed (code, password-hash fingerprint) pair, so
+    verifying it costs one HMAC instead of a deliberately slow password hash.
+    A ttl of 0 disables tokens: none are issued and none are accepted.
+    """
+
+    def __init__(self, secret_key: str, ttl: int = 3600):
+        self.ttl = int(ttl)
+        self._serializer = URLSafeTimedSerializer(secret_key, salt="share-access")
+        self.issued = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def issue(self, code: str, password_hash: str) -> Optional[str]:
+        if self.ttl <= 0:
+            return None
+        self.issued += 1
+        return self._serializer.dumps({"c": code.upper(), "h": _fingerprint(password_hash)})
+
+    def verify(self, token: Optional[str], code: str, password_hash: Optional[str]) -> bool:
+        if not token or not password_hash or self.ttl <= 0:
+            return False
+        try:
+            data = self._serializer.loads(token, max_age=self.ttl)
+        except BadSignature:
+            self.rejected += 1
+            return False
+        ok = isinstance(data, dict) and data.get("c") == code.upper() and data.get("h") == _fingerprint(password_hash)
+        if ok:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        return ok
+
+    def stats(self):
+        return {"ttl": self.ttl, "issued": self.issued, "accepted": self.accepted, "rejected": self.rejected}
@@ -0,0 +1,288 @@
+import json
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from caching import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def seconds_until_expiry(row: Dict[str, Any]) -> Optional[float]:
+    """Seconds until `expires_at` (negative once expired), or None when it never expires."""
+    expires_at = _parse_timestamp(row.get("expires_at"))
+    if expires_at is None:
+        return None
+    return (expires_at - datetime.now(timezone.utc)).total_seconds()
+
+
+def is_servable(row: Dict[str, Any], pending_views: int = 0) -> bool:
+    """Mirror the get_share_by_code rules: active, not expired and under max_views."""
+    if row.get("is_active") is False:
+        return False
+    remaining = seconds_until_expiry(row)
+    if remaining is not None and remaining <= 0:
+        return False
+    max_views = row.get("max_views")
+    if max_views is not None:
+        try:
+            if int(row.get("view_count") or 0) + pending_views >= int(max_views):
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+class MemoryShareBackend:
+    """Per-process LRU+TTL backend."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 30.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        row = self._cache.get(code)
+        return dict(row) if row is not None else None
+
+    def set(self, code: str, row: Dict[str, Any], ttl: float) -> None:
+        self._cache.set(code, dict(row), ttl=ttl)
+
+    def delete(self, code: str) -> None:
+        self._cache.pop(code)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+class RedisShareBackend:
+    """Backend shared across workers via any redis-py compatible client.
+
+    Works with redis.Redis or an in-process stand-in such as fakeredis; only
+    get/set(ex=)/delete are used. LRU behaviour comes from the server's
+    maxmemory policy.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_client: Any, prefix: str = "share:"):
+        self._redis = redis_client
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self._redis.get(self._prefix + code)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Share cache read failed: {e}")
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, code: str, row: Dict[str, Any], ttl: float) -> None:
+        try:
+            self._redis.set(self._prefix + code, json.dumps(row, default=str), ex=max(1, int(ttl)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Share cache write failed: {e}")
+
+    def delete(self, code: str) -> None:
+        try:
+            self._redis.delete(self._prefix + code)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Share cache delete failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "errors": self.errors,
+        }
+
+
+def backend_from_url(url: Optional[str], maxsize: int = 2048, ttl: float = 30.0) -> Any:
+    """Build a cache backend from a URL: memory:// (default) or redis://..."""
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis  # type: ignore
+
+            return RedisShareBackend(redis.Redis.from_url(url))
+        except Exception as e:
+            logger.warning(f"Redis share cache unavailable ({e}); using in-memory cache")
+    return MemoryShareBackend(maxsize=maxsize, ttl=ttl)
+
+
+class ShareCache:
+    """Read-through cache for share rows keyed by upper-cased code."""
+
+    def __init__(self, backend: Any = None, ttl: float = 30.0):
+        self.backend = backend or MemoryShareBackend(ttl=ttl)
+        self.ttl = float(ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, code: str, pending_views: int = 0) -> Optional[Dict[str, Any]]:
+        """Return a cached row that can still be served, evicting stale ones."""
+        if not self.enabled:
+            return None
+        code = code.upper()
+        row = self.backend.get(code)
+        if row is None:
+            return None
+        if not is_servable(row, pending_views):
+            # Let the database make the final call on expiry/limits
+            self.backend.delete(code)
+            return None
+        return row
+
+    def put(self, row: Dict[str, Any]) -> None:
+        if not self.enabled or not row.get("code"):
+            return
+        if not is_servable(row):
+            return
+        ttl = self.ttl
+        remaining = seconds_until_expiry(row)
+        if remaining is not None:
+            ttl = min(ttl, remaining)
+        if ttl > 0:
+            self.backend.set(str(row["code"]).upper(), row, ttl)
+
+    def add_views(self, code: str, delta: int) -> None:
+        """Fold flushed view increments into the cached row."""
+        code = code.upper()
+        row = self.backend.get(code)
+        if row is None:
+            return
+        row["view_count"] = int(row.get("view_count") or 0) + delta
+        self.put(row)
+
+    def invalidate(self, code: str) -> None:
+        self.backend.delete(code.upper())
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"backend": getattr(self.backend, "name", "custom"), "ttl": self.ttl}
+        stats.update(self.backend.stats())
+        return stats
+
+
+class ViewCounter:
+    """Buffer per-code view increments and flush them in batches.
+
+    `flush_fn(deltas)` receives {code: increment} and must raise on failure, in
+    which case the increments are put back and retried on the next flush. A
+    daemon thread flushes every `interval` seconds; reaching `batch_size`
+    pending views triggers an early flush. With interval <= 0 every view is
+    flushed immediately.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[Dict[str, int]], None],
+        interval: float = 5.0,
+        batch_size: int = 200,
+        on_flushed: Optional[Callable[[Dict[str, int]], None]] = None,
+    ):
+        self._flush_fn = flush_fn
+        self._on_flushed = on_flushed
+        self.interval = float(interval)
+        self.batch_size = max(1, int(batch_size))
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.flushed_views = 0
+        self.failures = 0
+
+    def pending(self, code: str) -> int:
+        with self._lock:
+            return self._pending.get(code.upper(), 0)
+
+    def record(self, code: str, count: int = 1) -> None:
+        code = code.upper()
+        with self._lock:
+            self._pending[code] = self._pending.get(code, 0) + count
+            total = sum(self._pending.values())
+        if self.interval <= 0:
+            self.flush()
+            return
+        self._ensure_thread()
+        if total >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> Dict[str, int]:
+        """Flush pending increments now; returns what was written."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._pending = self._pending, {}
+            if not deltas:
+                return {}
+            try:
+                self._flush_fn(deltas)
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Failed to flush {sum(deltas.values())} share views: {e}")
+                with self._lock:
+                    for code, delta in deltas.items():
+                        self._pending[code] = self._pending.get(code, 0) + delta
+                return {}
+            self.flushes += 1
+            self.flushed_views += sum(deltas.values())
+            if self._on_flushed is not None:
+                self._on_flushed(deltas)
+            return deltas
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is None:
+                atexit.register(self.flush)
+            self._thread = threading.Thread(target=self._run, name="share-view-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(self._pending.values())
+        return {
+            "pending": pending,
+            "flushes": self.flushes,
+            "flushed_views": self.flushed_views,
+            "failures": self.failures,
+            "interval": self.interval,
+        }
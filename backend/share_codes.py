@@ -0,0 +1,112 @@
+import string
+import logging
+import secrets
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Codes are looked up upper-cased, so only upper-case letters and digits are used
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def generate_code(length: int = 6, alphabet: str = CODE_ALPHABET) -> str:
+    """Return a random share code drawn from the OS CSPRNG."""
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def is_code_conflict(error: Any) -> bool:
+    """True when an insert failed on the shares.code UNIQUE constraint."""
+    msg = str(error).lower()
+    return "23505" in msg or "duplicate key" in msg or "shares_code_key" in msg
+
+
+class CodeAllocator:
+    """Hand out share codes, optionally from a pre-checked reserve.
+
+    With `pool_size` > 0 a block of codes is generated and checked against the
+    database in a single `taken_fn(codes) -> set_of_taken` query, and only the
+    free ones are kept. allocate() pops from that reserve and tops it up on a
+    background thread once it drops below half, so create_share normally gets
+    a code that is already known to be unused. Reserved codes can still be
+    taken by a concurrent writer, which the insert retry covers.
+    """
+
+    def __init__(
+        self,
+        length: int = 6,
+        pool_size: int = 0,
+        taken_fn: Optional[Callable[[Iterable[str]], Set[str]]] = None,
+        alphabet: str = CODE_ALPHABET,
+    ):
+        self.length = int(length)
+        self.pool_size = max(0, int(pool_size))
+        self.alphabet = alphabet
+        self._taken_fn = taken_fn
+        self._pool: deque = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self.allocated = 0
+        self.from_pool = 0
+        self.refills = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def allocate(self) -> str:
+        with self._lock:
+            self.allocated += 1
+            code = self._pool.popleft() if self._pool else None
+            if code is not None:
+                self.from_pool += 1
+            low = self.pool_size > 0 and self._taken_fn is not None and len(self._pool) < self.pool_size // 2
+        if low:
+            self._start_refill()
+        return code or generate_code(self.length, self.alphabet)
+
+    def refill(self) -> int:
+        """Top the reserve up to pool_size; returns how many codes were added."""
+        with self._lock:
+            wanted = self.pool_size - len(self._pool)
+        if wanted <= 0 or self._taken_fn is None:
+            return 0
+        candidates = {generate_code(self.length, self.alphabet) for _ in range(wanted)}
+        try:
+            taken = set(self._taken_fn(sorted(candidates)))
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Failed to reserve share codes: {e}")
+            return 0
+        free = [code for code in candidates if code not in taken]
+        with self._lock:
+            self.refills += 1
+            self.rejected += len(candidates) - len(free)
+            self._pool.extend(free)
+        return len(free)
+
+    def _start_refill(self) -> None:
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill_once, name="share-code-refill", daemon=True).start()
+
+    def _refill_once(self) -> None:
+        try:
+            self.refill()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "length": self.length,
+                "pool_size": self.pool_size,
+                "reserved": len(self._pool),
+                "allocated": self.allocated,
+                "from_pool": self.from_pool,
+                "refills": self.refills,
+                "rejected": self.rejected,
+                "failures": self.failures,
+            }
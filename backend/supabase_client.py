@@ -1,8 +1,13 @@
 import os
 import time
 import socket
+import threading
 from urllib.parse import urlparse
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import instrument_http_client
+
+from caching import TTLCache
 
 
 def _get_env() -> Dict[str, Optional[str]]:
@@ -40,9 +45,19 @@ def _get_env() -> Dict[str, Optional[str]]:
     return {"url": url, "key": key, "key_type": key_type}
 
 
-def create_client() -> Tuple[Optional[Any], Optional[str]]:
+def create_client(
+    timeout: Optional[float] = None,
+    storage_timeout: Optional[float] = None,
+    max_connections: Optional[int] = None,
+    max_keepalive: Optional[int] = None,
+) -> Tuple[Optional[Any], Optional[str]]:
     """Create a Supabase client using environment variables.
 
+    Every call builds a brand-new client with its own HTTP connection pools.
+    Request handlers should prefer get_client(), which reuses clients across
+    requests; a fresh client is only needed when the caller mutates auth
+    session state (sign in, sign up, sign out).
+
     Returns:
         (client, error) where only one is non-None.
     """
@@ -56,12 +71,231 @@ def create_client() -> Tuple[Optional[Any], Optional[str]]:
         # Import lazily so the app can run even if package isn't installed in some contexts
         from supabase import create_client as _create_client  # type: ignore
 
-        client = _create_client(url, key)
+        options = None
+        if timeout is not None or storage_timeout is not None:
+            from supabase.lib.client_options import ClientOptions  # type: ignore
+
+            options = ClientOptions()
+            if timeout is not None:
+                options.postgrest_client_timeout = timeout
+            if storage_timeout is not None:
+                options.storage_client_timeout = storage_timeout
+
+        client = _create_client(url, key, options) if options is not None else _create_client(url, key)
+        if max_connections or max_keepalive:
+            _apply_pool_limits(client, max_connections, max_keepalive)
+        _instrument_client(client)
         return client, None
     except Exception as e:  # pragma: no cover - defensive
         return None, f"Failed to create Supabase client: {e}"
 
 
+def _apply_pool_limits(client: Any, max_connections: Optional[int], max_keepalive: Optional[int]) -> None:
+    """Rebuild the PostgREST HTTP session with explicit keep-alive pool limits.
+
+    supabase-py does not expose httpx limits through ClientOptions, so we swap the
+    session on the (lazily created) PostgREST client for an equivalent one with the
+    requested limits. Failures are ignored and the SDK defaults are kept.
+    """
+    try:
+        import httpx  # type: ignore
+
+        postgrest = client.postgrest
+        old = postgrest.session
+        limits = httpx.Limits(
+            max_connections=max_connections or None,
+            max_keepalive_connections=max_keepalive or None,
+        )
+        postgrest.session = type(old)(
+            base_url=old.base_url,
+            headers=old.headers,
+            timeout=old.timeout,
+            follow_redirects=True,
+            http2=True,
+            limits=limits,
+        )
+        old.close()
+    except Exception:  # pragma: no cover - depends on SDK internals
+        pass
+
+
+def _instrument_client(client: Any) -> None:
+    """Time every PostgREST, GoTrue and storage request made through `client`."""
+    try:
+        sessions = [
+            client.postgrest.session,
+            getattr(client.storage, "session", None),
+            getattr(client.storage, "_client", None),
+            getattr(client.auth, "_http_client", None),
+        ]
+    except Exception:  # pragma: no cover - depends on SDK internals
+        return
+    for session in sessions:
+        if session is not None and hasattr(session, "event_hooks"):
+            instrument_http_client(session)
+
+
+def _is_transport_error(exc: BaseException) -> bool:
+    """Return True for errors that indicate a broken connection rather than a bad request."""
+    if isinstance(exc, (socket.error, ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx  # type: ignore
+
+        return isinstance(exc, (httpx.TransportError, httpx.PoolTimeout))
+    except Exception:  # pragma: no cover - httpx ships with supabase
+        return False
+
+
+class ClientRegistry:
+    """Process-wide registry of long-lived Supabase clients.
+
+    Each thread is bound to one client so its keep-alive connections are reused
+    across requests. A sync gunicorn worker therefore holds exactly one client;
+    threaded workers get up to `pool_size` clients, after which threads share the
+    existing ones round-robin (httpx clients are safe to share between threads).
+    Clients are rebuilt after a fork and whenever discard() reports a failure.
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Tuple[Optional[Any], Optional[str]]]] = None, pool_size: int = 4):
+        self._factory = factory or create_client
+        self.pool_size = max(1, int(pool_size))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._entries: List[Dict[str, Any]] = []
+        self._next = 0
+        self._pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.errors = 0
+
+    def configure(self, factory: Optional[Callable[[], Tuple[Optional[Any], Optional[str]]]] = None, pool_size: Optional[int] = None) -> None:
+        """Change the factory or pool size; existing clients are dropped."""
+        with self._lock:
+            if factory is not None:
+                self._factory = factory
+            if pool_size is not None:
+                self.pool_size = max(1, int(pool_size))
+            self._reset_locked()
+
+    def _reset_locked(self) -> None:
+        for entry in self._entries:
+            entry["alive"] = False
+        self._entries = []
+        self._next = 0
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def get(self) -> Tuple[Optional[Any], Optional[str]]:
+        """Return (client, error) for the calling thread, building one if needed."""
+        if self._pid != os.getpid():
+            # Forked (e.g. gunicorn --preload): never share sockets with the parent
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset_locked()
+
+        entry = getattr(self._local, "entry", None)
+        if entry is not None and entry["alive"]:
+            with self._lock:
+                self.hits += 1
+            return entry["client"], None
+
+        with self._lock:
+            if len(self._entries) >= self.pool_size:
+                entry = self._entries[self._next % len(self._entries)]
+                self._next += 1
+                self.hits += 1
+                self._local.entry = entry
+                return entry["client"], None
+            self.misses += 1
+
+        client, err = self._factory()
+        if err or client is None:
+            with self._lock:
+                self.errors += 1
+            return None, err or "Failed to create Supabase client"
+
+        entry = {"client": client, "alive": True, "created_at": time.time()}
+        with self._lock:
+            self._entries.append(entry)
+        self._local.entry = entry
+        return client, None
+
+    def discard(self, client: Any, error: Optional[BaseException] = None) -> bool:
+        """Drop a pooled client so the next get() rebuilds it.
+
+        When `error` is given the client is only dropped for transport-level failures;
+        ordinary API errors (bad request, RLS, not found) leave the connection usable.
+        Returns True when a client was discarded.
+        """
+        if client is None or (error is not None and not _is_transport_error(error)):
+            return False
+        with self._lock:
+            for entry in self._entries:
+                if entry["client"] is client:
+                    entry["alive"] = False
+                    self._entries.remove(entry)
+                    self.rebuilds += 1
+                    return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /supabase/health report."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "pool_size": self.pool_size,
+                "clients": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "rebuilds": self.rebuilds,
+                "errors": self.errors,
+            }
+
+
+_registry = ClientRegistry()
+
+
+def configure_client_pool(
+    pool_size: int = 4,
+    timeout: Optional[float] = None,
+    storage_timeout: Optional[float] = None,
+    max_connections: Optional[int] = None,
+    max_keepalive: Optional[int] = None,
+) -> None:
+    """Configure the shared client registry (typically once, from Config, at startup)."""
+    def _factory() -> Tuple[Optional[Any], Optional[str]]:
+        return create_client(
+            timeout=timeout,
+            storage_timeout=storage_timeout,
+            max_connections=max_connections,
+            max_keepalive=max_keepalive,
+        )
+
+    _registry.configure(factory=_factory, pool_size=pool_size)
+
+
+def get_client() -> Tuple[Optional[Any], Optional[str]]:
+    """Return a pooled Supabase client for the current thread.
+
+    Returns:
+        (client, error) where only one is non-None.
+    """
+    return _registry.get()
+
+
+def discard_client(client: Any, error: Optional[BaseException] = None) -> bool:
+    """Report a failed client so the registry rebuilds it on next use."""
+    return _registry.discard(client, error)
+
+
+def client_pool_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the shared client registry."""
+    return _registry.stats()
+
+
 def auth_health(url: Optional[str], timeout: float = 3.0) -> Dict[str, Any]:
     """Call the GoTrue health endpoint on Supabase.
 
@@ -140,7 +374,7 @@ def connection_report() -> Dict[str, Any]:
     """Produce a structured connection report for diagnostics and health endpoint."""
     env = _get_env()
     url, key, key_type = env["url"], env["key"], env["key_type"]
-    client, client_error = create_client() if (url and key) else (None, None)
+    client, client_error = get_client() if (url and key) else (None, None)
 
     auth = auth_health(url)
 
@@ -160,6 +394,7 @@ def connection_report() -> Dict[str, Any]:
         "client_error": client_error,
         "auth": auth,
         "storage_buckets": buckets_info,
+        "client_pool": client_pool_stats(),
     }
 
 
@@ -217,32 +452,330 @@ def list_bucket_objects(client: Any, bucket: str, path: str = "", limit: Optiona
         return None, str(e)
 
 
+def is_missing_function(error: Any) -> bool:
+    """True when PostgREST reports that no function matches the name/arguments."""
+    msg = str(error)
+    return "PGRST202" in msg or "could not find the function" in msg.lower()
+
+
+class RpcSignature:
+    """Find out once which parameter name an RPC accepts, instead of per call.
+
+    resolve() calls `function` with each candidate parameter name and a
+    harmless `probe_value` until PostgREST accepts one; "missing function"
+    errors move on to the next candidate, any other error leaves the
+    signature unknown. The answer (a parameter name, or None when no
+    signature exists) is cached; an unknown or missing result is re-checked
+    after `retry_after` seconds and invalidate() forces a fresh resolve,
+    e.g. when a cached signature stops working after a schema change.
+    """
+
+    def __init__(self, function: str, candidates: Tuple[str, ...], probe_value: Any = "", retry_after: float = 300.0):
+        self.function = function
+        self.candidates = tuple(candidates)
+        self.probe_value = probe_value
+        self.retry_after = float(retry_after)
+        self._lock = threading.Lock()
+        self._resolved = False
+        self._param: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.probes = 0
+        self.resolutions = 0
+
+    def resolve(self, client: Any) -> Optional[str]:
+        with self._lock:
+            param: Optional[str] = None
+            resolved = True
+            error: Optional[str] = None
+            for name in self.candidates:
+                self.probes += 1
+                try:
+                    client.rpc(self.function, {name: self.probe_value}).execute()
+                    param = name
+                    break
+                except Exception as e:
+                    error = str(e)
+                    if not is_missing_function(e):
+                        resolved = False
+                        break
+            self._resolved = resolved
+            self._param = param if resolved else None
+            self._checked_at = time.monotonic()
+            self.last_error = None if param else error
+            self.resolutions += 1
+            return self._param
+
+    def param(self, client: Any) -> Optional[str]:
+        """The working parameter name, resolving first when unknown or due a re-check."""
+        if self._checked_at is None:
+            return self.resolve(client)
+        if self._param is None:
+            # A transient failure is retried sooner than a confirmed missing function
+            wait = self.retry_after if self._resolved else min(self.retry_after, 30.0)
+            if time.monotonic() - self._checked_at >= wait:
+                return self.resolve(client)
+        return self._param
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._resolved = False
+            self._param = None
+            self._checked_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        if self._param:
+            path = f"rpc:{self.function}({self._param})"
+        elif self._resolved:
+            path = "select"
+        else:
+            path = "unresolved" if self._checked_at is None else "select (rpc status unknown)"
+        return {
+            "function": self.function,
+            "param": self._param,
+            "path": path,
+            "probes": self.probes,
+            "resolutions": self.resolutions,
+            "last_error": self.last_error,
+        }
+
+
+# full_schema.sql uses share_code; older deployments used _code or code
+share_lookup_rpc = RpcSignature("get_share_by_code", ("share_code", "_code", "code"))
+
+
 def rpc_get_share_by_code(client: Any, code: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-    """Call the RPC function get_share_by_code to retrieve a share row.
+    """Look up a servable share with the get_share_by_code RPC in one round trip.
+
+    The RPC's parameter name is resolved once (see share_lookup_rpc).
+    Returns (row, None) when found, (None, None) when the RPC ran and the share
+    is missing or cannot be served, and (None, error) when the RPC is not
+    available, in which case callers should query the table directly.
+    """
+    if client is None:
+        return None, "Client is None"
+    param = share_lookup_rpc.param(client)
+    if param is None:
+        return None, share_lookup_rpc.last_error or "get_share_by_code is not deployed"
+    try:
+        resp = client.rpc("get_share_by_code", {param: code.upper()}).execute()
+    except Exception as e:
+        if is_missing_function(e):
+            # Schema changed since discovery; look the signature up again next time
+            share_lookup_rpc.invalidate()
+        return None, str(e)
+    # Depending on RPC, data may be a single object or list
+    data = getattr(resp, "data", None)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    # Some RPCs return a typed record with all fields set to null when not found
+    if isinstance(data, dict) and data and all(v is None for v in data.values()):
+        data = None
+    return (data or None), None
+
+
+def rpc_view_share(client: Any, code: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Count one view atomically via the view_share RPC and return the updated row.
+
+    Returns (row, None) on success, (None, None) when the share cannot be
+    served (missing, inactive, expired or out of views), and (None, error)
+    when the RPC failed or is not deployed.
+    """
+    if client is None:
+        return None, "Client is None"
+    try:
+        resp = client.rpc("view_share", {"share_code": code.upper()}).execute()
+    except Exception as e:
+        return None, str(e)
+    data = getattr(resp, "data", None)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return (data if isinstance(data, dict) and data else None), None
+
+
+def rpc_view_shares(client: Any, codes: List[str]) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Count one view for each servable code via the view_shares RPC.
+
+    Returns (rows, None) with only the rows that were counted; codes missing
+    from the result cannot be served. (None, error) when the RPC failed or is
+    not deployed.
+    """
+    if client is None:
+        return None, "Client is None"
+    try:
+        resp = client.rpc("view_shares", {"share_codes": [code.upper() for code in codes]}).execute()
+    except Exception as e:
+        return None, str(e)
+    data = getattr(resp, "data", None) or []
+    return [row for row in data if isinstance(row, dict)], None
+
+
+# Probed with an empty code, which matches no share and so counts nothing
+share_open_rpc = RpcSignature("open_share", ("share_code",))
+
+
+def rpc_open_share(client: Any, code: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Read a share for viewing with the open_share RPC in one round trip.
+
+    Unprotected shares come back with this view already counted; protected
+    ones come back uncounted. Returns (row, None), (None, None) when the
+    share cannot be served, and (None, error) when the RPC is not available.
+    """
+    if client is None:
+        return None, "Client is None"
+    if share_open_rpc.param(client) is None:
+        return None, share_open_rpc.last_error or "open_share is not deployed"
+    try:
+        resp = client.rpc("open_share", {"share_code": code.upper()}).execute()
+    except Exception as e:
+        if is_missing_function(e):
+            share_open_rpc.invalidate()
+        return None, str(e)
+    data = getattr(resp, "data", None)
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return (data if isinstance(data, dict) and data else None), None
+
 
-    Returns (row, error).
+def rpc_increment_share_views(client: Any, deltas: Dict[str, int]) -> Tuple[Optional[int], Optional[str]]:
+    """Apply batched view increments {code: delta} in one round trip.
+
+    Uses the increment_share_views RPC (see database/full_schema.sql). When the
+    function is not deployed, falls back to a read-then-update per code, which
+    can lose concurrent increments; deploy the RPC for exact counts.
+    Returns (rows_updated, error).
     """
     if client is None:
         return None, "Client is None"
+    if not deltas:
+        return 0, None
+    codes = [c.upper() for c in deltas]
+    counts = [int(deltas[c]) for c in deltas]
     try:
-        # First attempt: parameter named `_code`
-        for param_name in ("_code", "code"):
-            try:
-                resp = client.rpc("get_share_by_code", {param_name: code.upper()}).execute()
-            except Exception as inner:
-                # Try next param name on failure
-                last_err = str(inner)
+        resp = client.rpc("increment_share_views", {"share_codes": codes, "deltas": counts}).execute()
+        data = getattr(resp, "data", None)
+        return (data if isinstance(data, int) else len(codes)), None
+    except Exception as rpc_err:
+        last_err: Optional[str] = str(rpc_err)
+
+    updated = 0
+    for code, delta in zip(codes, counts):
+        try:
+            resp = client.table("shares").select("view_count").eq("code", code).limit(1).execute()
+            rows = getattr(resp, "data", None) or []
+            if not rows:
                 continue
-            # Depending on RPC, data may be a single object or list
-            data = getattr(resp, "data", None)
-            if isinstance(data, list):
-                data = data[0] if data else None
-            # Some RPCs return a typed record with all fields set to null when not found
-            if isinstance(data, dict) and data and all(v is None for v in data.values()):
-                data = None
-            if data:
-                return data, None
-        # If we reach here, no data via RPC
-        return None, None
+            current = int(rows[0].get("view_count") or 0)
+            client.table("shares").update({"view_count": current + delta}).eq("code", code).execute()
+            updated += 1
+            last_err = None
+        except Exception as e:
+            last_err = str(e)
+    if updated == 0 and last_err:
+        return None, last_err
+    return updated, None
+
+
+def signed_url_from_response(signed: Any) -> Optional[str]:
+    """Extract the URL from create_signed_url() across SDK response shapes."""
+    if isinstance(signed, dict):
+        sdata = signed.get("data") or signed
+    else:
+        sdata = getattr(signed, "data", None) or {}
+    if not isinstance(sdata, dict):
+        return None
+    return sdata.get("signedUrl") or sdata.get("signed_url") or sdata.get("signedURL")
+
+
+class SignedUrlCache:
+    """Cache signed storage URLs per (bucket, path).
+
+    Entries are dropped `refresh_margin` seconds before the URL itself expires,
+    so a URL handed out always has at least that long left and is re-signed
+    ahead of its expiry rather than after a failed download.
+    """
+
+    def __init__(self, expires_in: int = 3600, refresh_margin: int = 300, maxsize: int = 4096):
+        self.expires_in = int(expires_in)
+        self.refresh_margin = min(int(refresh_margin), self.expires_in // 2)
+        self._cache = TTLCache(maxsize=maxsize, ttl=self.expires_in - self.refresh_margin)
+        self.signed = 0
+
+    def get(self, client: Any, bucket: str, path: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (signed_url, error), signing a new URL only when needed."""
+        key = (bucket, path)
+        url = self._cache.get(key)
+        if url:
+            return url, None
+        if client is None:
+            return None, "Client is None"
+        try:
+            signed = client.storage.from_(bucket).create_signed_url(path, self.expires_in)
+        except Exception as e:
+            return None, str(e)
+        url = signed_url_from_response(signed)
+        if not url:
+            return None, "Storage returned no signed URL"
+        self.signed += 1
+        self._cache.set(key, url)
+        return url, None
+
+    def invalidate(self, bucket: str, path: str) -> None:
+        self._cache.pop((bucket, path))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats["signed"] = self.signed
+        return stats
+
+
+def rpc_claim_storage_object(client: Any, digest: str, bucket: str, path: str, size: Optional[int]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Register a reference to a content-addressed object (claim_storage_object RPC).
+
+    Returns ({bucket, path, created, ready}, error). `created` is True when this
+    caller registered the object and must upload it; `ready` False on an
+    existing object means its first uploader has not finished, so the caller
+    must upload it as well. Otherwise an identical file is already stored.
+    """
+    if client is None:
+        return None, "Client is None"
+    try:
+        resp = client.rpc(
+            "claim_storage_object",
+            {"p_digest": digest, "p_bucket": bucket, "p_path": path, "p_size": size},
+        ).execute()
+        data = getattr(resp, "data", None)
+        if isinstance(data, list):
+            data = data[0] if data else None
+        if not data:
+            return None, "claim_storage_object returned no row"
+        return data, None
+    except Exception as e:
+        return None, str(e)
+
+
+def rpc_mark_storage_object_ready(client: Any, digest: str) -> Tuple[bool, Optional[str]]:
+    """Record that a claimed object's file is now in storage; returns (ok, error)."""
+    if client is None:
+        return False, "Client is None"
+    try:
+        client.rpc("mark_storage_object_ready", {"p_digest": digest}).execute()
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def rpc_release_storage_object(client: Any, digest: str) -> Tuple[Optional[int], Optional[str]]:
+    """Drop a reference to a content-addressed object; returns (remaining_refs, error).
+
+    remaining_refs is 0 only when the last reference went away; None means the
+    digest was unknown and the file must be left alone.
+    """
+    if client is None:
+        return None, "Client is None"
+    try:
+        resp = client.rpc("release_storage_object", {"p_digest": digest}).execute()
+        data = getattr(resp, "data", None)
+        return (int(data) if data is not None else None), None
     except Exception as e:
         return None, str(e)
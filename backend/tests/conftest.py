@@ -7,3 +7,44 @@ def client():
     app.testing = True
     with app.test_client() as client:
         yield client
+
+
+@pytest.fixture()
+def fake_supabase(monkeypatch):
+    """A running FakeSupabase with the SUPABASE_* environment pointing at it."""
+    pytest.importorskip('supabase')
+    pytest.importorskip('jwt')
+    from fake_supabase import FakeSupabase
+
+    with FakeSupabase() as fake:
+        monkeypatch.setenv('SUPABASE_URL', fake.url)
+        monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', fake.service_key)
+        yield fake
+
+
+@pytest.fixture()
+def supabase(fake_supabase):
+    """A real supabase-py client talking to fake_supabase."""
+    from supabase_client import create_client
+
+    client, err = create_client()
+    assert err is None, err
+    return client
+
+
+@pytest.fixture()
+def app_supabase(fake_supabase, monkeypatch):
+    """The application routed at fake_supabase, with empty share caches.
+
+    Yields the application module; use the `client` fixture for requests and
+    fake_supabase.issue_token() for Authorization headers.
+    """
+    import application
+    from benchmark import use_fake_supabase
+    from negative_cache import NegativeLookupCache
+    from share_cache import MemoryShareBackend, ShareCache
+
+    monkeypatch.setattr(application, 'share_cache', ShareCache(MemoryShareBackend(), ttl=30))
+    monkeypatch.setattr(application, 'missing_codes', NegativeLookupCache(application.get_client, ttl=30))
+    with use_fake_supabase(fake_supabase) as module:
+        yield module
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+from analytics import ANALYTICS_COLUMNS, fetch_user_analytics, fetch_user_stats, summarize_shares
+
+
+def _selects(fake):
+    return [dict(params).get('select') for method, path, params in fake.requests if path == '/rest/v1/shares']
+
+
+def _rows():
+    now = datetime.now(timezone.utc)
+    return [
+        {'code': 'A', 'content_type': 'text', 'file_name': None, 'view_count': 5, 'created_at': now.isoformat()},
+        {'code': 'B', 'content_type': 'file', 'file_name': 'b.pdf', 'view_count': 9,
+         'created_at': (now - timedelta(days=10)).isoformat()},
+        {'code': 'C', 'content_type': 'file', 'file_name': 'c.zip', 'view_count': 0, 'created_at': now.isoformat()},
+    ]
+
+
+def test_summarize_shares_matches_rpc_shape():
+    data = summarize_shares(_rows(), top_n=2)
+    assert data['total_shares'] == 3
+    assert data['total_views'] == 14
+    assert data['recent_shares'] == 2
+    assert data['content_types'] == {'text': 1, 'file': 2}
+    assert [s['code'] for s in data['top_shares']] == ['B', 'A']
+    assert data['top_shares'][1]['name'] == 'Text Share'
+    assert len(data['views_by_date']) == 30
+
+
+def _insert(fake, user_id='user-1'):
+    for row in _rows():
+        fake.insert('shares', dict(row, user_id=user_id))
+    fake.insert('shares', {'code': 'OTHER', 'user_id': 'user-2', 'view_count': 100})
+
+
+def test_analytics_uses_rpc_in_one_round_trip(supabase, fake_supabase):
+    _insert(fake_supabase)
+
+    data, err = fetch_user_analytics(supabase, 'user-1')
+
+    assert err is None
+    assert data['total_views'] == 14
+    assert data['avg_views'] == round(14 / 3, 2)
+    assert len(data['views_by_date']) == 30
+    assert _selects(fake_supabase) == []
+    assert fake_supabase.stats()['rpc'] == 1
+
+
+def test_analytics_fallback_never_selects_text_content(supabase, fake_supabase):
+    _insert(fake_supabase)
+    fake_supabase.missing_rpcs.add('get_user_share_analytics')
+
+    data, err = fetch_user_analytics(supabase, 'user-1')
+
+    assert err is None
+    assert data['total_views'] == 14
+    assert _selects(fake_supabase) == [ANALYTICS_COLUMNS]
+    assert 'text_content' not in ANALYTICS_COLUMNS
+
+
+def test_stats_prefers_rpc_and_falls_back_to_exact_count(supabase, fake_supabase):
+    _insert(fake_supabase, user_id='u')
+    assert fetch_user_stats(supabase, 'u') == ({'total_shares': 3, 'total_views': 14}, None)
+    assert _selects(fake_supabase) == []
+
+    fake_supabase.missing_rpcs.add('get_user_share_stats')
+    assert fetch_user_stats(supabase, 'u') == ({'total_shares': 3, 'total_views': 14}, None)
+    assert len(_selects(fake_supabase)) == 1
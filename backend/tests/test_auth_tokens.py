@@ -0,0 +1,90 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+
+from auth_tokens import TokenVerifier
+
+SECRET = 'test-jwt-secret-with-at-least-32-bytes'
+
+
+def _token(secret=SECRET, **overrides):
+    claims = {
+        'sub': 'user-1',
+        'email': 'a@example.com',
+        'role': 'authenticated',
+        'aud': 'authenticated',
+        'exp': int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+class _FakeAuth:
+    def __init__(self, user_id='remote-user'):
+        self.calls = 0
+        self.user_id = user_id
+
+    def get_user(self, token):
+        self.calls += 1
+        if not self.user_id:
+            raise RuntimeError('invalid JWT')
+        return SimpleNamespace(user=SimpleNamespace(id=self.user_id, email='r@example.com', role='authenticated'))
+
+
+def _client(user_id='remote-user'):
+    return SimpleNamespace(auth=_FakeAuth(user_id))
+
+
+def test_verifies_with_secret_without_remote_call():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+    client = _client()
+
+    user = verifier.verify(client, _token())
+
+    assert user == {'id': 'user-1', 'email': 'a@example.com', 'role': 'authenticated'}
+    assert client.auth.calls == 0
+
+
+def test_rejects_expired_token():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+    client = _client()
+
+    assert verifier.verify(client, _token(exp=int(time.time()) - 10)) is None
+    assert client.auth.calls == 0
+
+
+def test_falls_back_to_remote_and_caches():
+    verifier = TokenVerifier()
+    client = _client()
+    token = _token()
+
+    assert verifier.verify(client, token)['id'] == 'remote-user'
+    assert verifier.verify(client, token)['id'] == 'remote-user'
+    assert client.auth.calls == 1
+    assert verifier.stats()['remote_verified'] == 1
+
+
+def test_wrong_secret_defers_to_remote():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+    client = _client(user_id=None)
+
+    assert verifier.verify(client, _token(secret='another-jwt-secret-with-at-least-32-bytes')) is None
+    assert client.auth.calls == 1
+
+
+def test_jwks_key_decides_the_algorithm():
+    verifier = TokenVerifier()
+    key = jwt.PyJWK({'kty': 'oct', 'k': 'a2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2tra2traw', 'kid': 'k1', 'alg': 'HS512'})
+    verifier._jwks = {'k1': key}
+    verifier._jwks_fetched_at = time.monotonic()
+    client = _client(user_id=None)
+    claims = {'sub': 'user-1', 'aud': 'authenticated', 'exp': int(time.time()) + 3600}
+
+    good = jwt.encode(claims, key.key, algorithm='HS512', headers={'kid': 'k1'})
+    assert verifier.verify(client, good)['id'] == 'user-1'
+
+    # Same key material, but the header picks a different algorithm
+    forged = jwt.encode(claims, key.key, algorithm='HS384', headers={'kid': 'k1'})
+    assert verifier.verify(client, forged) is None
+    assert client.auth.calls == 0
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip('supabase')
+pytest.importorskip('jwt')
+
+from benchmark import compare, percentile, run_benchmarks  # noqa: E402
+from fake_supabase import FakeSupabase  # noqa: E402
+from supabase_client import create_client  # noqa: E402
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+def test_fake_supabase_speaks_to_the_real_client(monkeypatch):
+    with FakeSupabase(missing_rpcs={'get_user_share_stats'}) as fake:
+        monkeypatch.setenv('SUPABASE_URL', fake.url)
+        monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', fake.service_key)
+        client, err = create_client()
+        assert err is None
+
+        client.table('shares').insert({'code': 'abc123', 'text_content': 'hi', 'user_id': 'u1'}).execute()
+        rows = client.table('shares').select('code, view_count').eq('code', 'ABC123').execute().data
+        assert rows == [{'code': 'ABC123', 'view_count': 0}]
+
+        viewed = client.rpc('view_share', {'share_code': 'ABC123'}).execute().data
+        assert viewed[0]['view_count'] == 1
+        with pytest.raises(Exception):
+            client.rpc('get_user_share_stats', {'p_user_id': 'u1'}).execute()
+
+        counted = client.table('shares').select('view_count', count='exact').eq('user_id', 'u1').execute()
+        assert counted.count == 1
+
+        client.storage.from_('shared-files').upload('a/b.txt', b'payload')
+        assert fake.objects[('shared-files', 'a/b.txt')] == b'payload'
+        assert fake.stats()['storage'] == 1
+
+
+def test_run_benchmarks_reports_every_combination():
+    report = run_benchmarks(
+        ['create_share_text', 'get_share', 'fetch_file', 'me_stats'],
+        concurrency=[1, 2],
+        sizes=[128],
+        requests=4,
+        latency={'rest': 0.0, 'rpc': 0.0, 'auth': 0.0, 'storage': 0.0},
+        warmup=0,
+    )
+    results = report['results']
+    assert len(results) == 8
+    assert all(r['errors'] == 0 and r['requests'] == 4 for r in results)
+    assert {'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_kb'} <= set(results[0])
+
+    slower = {'results': [dict(r, p95_ms=r['p95_ms'] * 10 + 100) for r in results]}
+    assert compare(report, slower, tolerance=0.2)
+    assert compare(report, report) == []
@@ -0,0 +1,74 @@
+import io
+import json
+import threading
+
+import application
+
+
+def _share_requests(fake, method):
+    return [params for m, path, params in fake.requests if m == method and path == '/rest/v1/shares']
+
+
+def test_bulk_multipart_uploads_in_parallel_and_inserts_once(client, monkeypatch, app_supabase, fake_supabase):
+    threads = set()
+    upload_share_file = application._upload_share_file
+
+    def upload(*args):
+        threads.add(threading.current_thread().name)
+        return upload_share_file(*args)
+
+    monkeypatch.setattr(application, '_upload_share_file', upload)
+    data = {
+        'files': [(io.BytesIO(b'a' * 10), 'a.txt'), (io.BytesIO(b'b' * 20), 'b.md'), (io.BytesIO(b'x'), 'evil.exe')],
+        'texts': ['hello', 'world'],
+        'password': 'pw',
+    }
+    res = client.post('/api/shares/bulk', data=data, content_type='multipart/form-data')
+    assert res.status_code == 201
+    body = res.get_json()
+    assert body['created'] == 4 and body['failed'] == 1
+    statuses = {r.get('name', r['index']): r['status'] for r in body['results']}
+    assert statuses['evil.exe'] == 400
+    assert len(_share_requests(fake_supabase, 'POST')) == 1
+    rows = fake_supabase.tables['shares']
+    assert len(rows) == 4
+    assert all(row['is_protected'] and row['password_hash'] for row in rows)
+    assert sorted(fake_supabase.objects.values()) == [b'a' * 10, b'b' * 20]
+    assert all('password_hash' not in r.get('share', {}) for r in body['results'])
+    assert all(name.startswith('bulk-upload') for name in threads)
+
+
+def test_bulk_json_manifest_reports_taken_codes(client, app_supabase, fake_supabase):
+    fake_supabase.insert('shares', {'code': 'TAKEN1', 'text_content': 'first'})
+    fake_supabase.reset_stats()
+    res = client.post('/api/shares/bulk', json={'items': [
+        {'text': 'one', 'code': 'taken1'},
+        {'text': 'two', 'code': 'mine01'},
+        {'text': 'dup', 'code': 'MINE01'},
+        {'code': 'empty1'},
+    ]})
+    assert res.status_code == 201
+    results = res.get_json()['results']
+    assert [r['status'] for r in results] == [409, 201, 409, 400]
+    assert results[1]['share']['code'] == 'MINE01'
+    assert [dict(params)['code'] for params in _share_requests(fake_supabase, 'GET')] == ['in.(TAKEN1,MINE01)']
+    assert [row['code'] for row in fake_supabase.tables['shares']] == ['TAKEN1', 'MINE01']
+
+
+def test_bulk_rejects_bad_requests(client, app_supabase, fake_supabase):
+    assert client.post('/api/shares/bulk', json={'items': []}).status_code == 400
+    too_many = [{'text': str(i)} for i in range(application.Config.SHARE_BULK_MAX_ITEMS + 1)]
+    assert client.post('/api/shares/bulk', json={'items': too_many}).status_code == 400
+    assert fake_supabase.tables['shares'] == []
+
+
+def test_bulk_manifest_rejects_reused_files(client, app_supabase, fake_supabase):
+    for refs in (['a.txt', 'a.txt'], ['upload', 'a.txt']):
+        data = {
+            'upload': (io.BytesIO(b'a' * 10), 'a.txt'),
+            'manifest': json.dumps([{'file': ref} for ref in refs]),
+        }
+        res = client.post('/api/shares/bulk', data=data, content_type='multipart/form-data')
+        assert res.status_code == 400
+        assert 'more than once' in res.get_json()['error']
+    assert fake_supabase.tables['shares'] == [] and fake_supabase.objects == {}
@@ -0,0 +1,54 @@
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def big_share(monkeypatch):
+    import application
+
+    application.share_cache.put({'code': 'BIGTXT', 'content_type': 'text', 'text_content': 'print(1)\n' * 500,
+                                 'view_count': 0, 'is_protected': False})
+    monkeypatch.setattr(application.view_counter, 'interval', 3600)
+    yield application
+    application.share_cache.invalidate('BIGTXT')
+    application.view_counter._pending.clear()
+
+
+def test_large_json_is_gzipped_when_accepted(client, big_share):
+    res = client.get('/api/shares/BIGTXT/content', headers={'Accept-Encoding': 'gzip'})
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in res.headers['Vary']
+    assert b'print(1)' in gzip.decompress(res.data)
+
+    plain = client.get('/api/shares/BIGTXT/content')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_json()['text_content'].startswith('print(1)')
+
+
+def test_small_responses_are_not_compressed(client, big_share):
+    big_share.share_cache.put({'code': 'TINY01', 'content_type': 'text', 'text_content': 'x',
+                               'view_count': 0, 'is_protected': False})
+    res = client.get('/api/shares/TINY01/content', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in res.headers
+    assert res.get_json()['text_content'] == 'x'
+    big_share.share_cache.invalidate('TINY01')
+
+
+def test_if_none_match_returns_304(client, big_share):
+    first = client.get('/api/shares/BIGTXT/content', headers={'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag']
+    assert etag.endswith('-gzip"')
+
+    again = client.get('/api/shares/BIGTXT/content', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+def test_share_view_etag_ignores_view_count(client, big_share):
+    first = client.get('/api/shares/BIGTXT')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+
+    again = client.get('/api/shares/BIGTXT', headers={'If-None-Match': etag})
+    assert again.status_code == 304
@@ -0,0 +1,120 @@
+import threading
+
+import application
+
+
+def _setup(monkeypatch, fake, n):
+    for i in range(n):
+        fake.insert('shares', {
+            'user_id': 'u1', 'code': f'C{i:05d}', 'content_type': 'text', 'text_content': 'x',
+            'created_at': f'2024-01-01T00:00:{i:02d}+00:00', 'view_count': i,
+        })
+    fake.insert('shares', {'user_id': 'u2', 'code': 'OTHER1'})
+    threads = set()
+    dashboard_rows = application._dashboard_rows
+
+    def rows(client, user_id, limit):
+        threads.add(threading.current_thread().name)
+        return dashboard_rows(client, user_id, limit)
+
+    monkeypatch.setattr(application, '_dashboard_rows', rows)
+    fake.reset_stats()
+    return {'Authorization': f"Bearer {fake.issue_token('u1')}"}, threads
+
+
+def _calls(fake):
+    return [path.rsplit('/', 1)[-1] for method, path, params in fake.requests if path.startswith('/rest/v1/')]
+
+
+def test_dashboard_returns_every_section_from_one_row_query(client, monkeypatch, app_supabase, fake_supabase):
+    headers, threads = _setup(monkeypatch, fake_supabase, 60)
+
+    res = client.get('/api/me/dashboard', headers=headers)
+
+    assert res.status_code == 200
+    body = res.get_json()
+    assert set(body) == {'stats', 'shares', 'analytics', 'activity'}
+    assert body['stats'] == {'total_shares': 60, 'total_views': sum(range(60))}
+    assert len(body['shares']['shares']) == application.Config.SHARES_PAGE_SIZE
+    assert body['shares']['next_cursor']
+    assert len({a['code'] for a in body['activity']['activities']}) == application.Config.ACTIVITY_PAGE_SIZE
+    assert body['activity']['next_cursor']
+    assert body['shares']['shares'][0]['code'] == 'C00059'
+    # Stats come from the analytics totals and both lists share one query
+    assert sorted(_calls(fake_supabase)) == ['get_user_share_analytics', 'shares']
+    assert [dict(params)['select'] for method, path, params in fake_supabase.requests if path == '/rest/v1/shares'] == [application.MY_SHARES_COLUMNS]
+    assert threads and all(name.startswith('dashboard') for name in threads)
+
+
+def test_dashboard_sections_are_selectable(client, monkeypatch, app_supabase, fake_supabase):
+    headers, _ = _setup(monkeypatch, fake_supabase, 3)
+
+    res = client.get('/api/me/dashboard?sections=stats,activity', headers=headers)
+
+    assert res.status_code == 200
+    body = res.get_json()
+    assert set(body) == {'stats', 'activity'}
+    assert sorted(_calls(fake_supabase)) == ['get_user_share_stats', 'shares']
+    assert body['activity']['next_cursor'] is None
+
+    res = client.get('/api/me/dashboard?sections=stats,bogus', headers=headers)
+    assert res.status_code == 400
+
+
+def test_dashboard_reports_failed_sections(client, monkeypatch, app_supabase, fake_supabase):
+    headers, _ = _setup(monkeypatch, fake_supabase, 3)
+    monkeypatch.setattr(application, 'fetch_user_analytics', lambda c, user_id: (None, 'rpc down'))
+    dashboard_rows = application._dashboard_rows
+    failing = [True]
+
+    def rows(client, user_id, limit):
+        if failing[0]:
+            raise RuntimeError('boom')
+        return dashboard_rows(client, user_id, limit)
+
+    monkeypatch.setattr(application, '_dashboard_rows', rows)
+
+    res = client.get('/api/me/dashboard?sections=analytics,shares', headers=headers)
+    assert res.status_code == 500
+    assert set(res.get_json()['errors']) == {'analytics', 'shares'}
+
+    failing[0] = False
+    res = client.get('/api/me/dashboard?sections=analytics,shares', headers=headers)
+    assert res.status_code == 200
+    body = res.get_json()
+    assert 'analytics' in body['errors'] and 'shares' in body
+
+
+def test_dashboard_requires_auth(client, monkeypatch, app_supabase, fake_supabase):
+    _setup(monkeypatch, fake_supabase, 1)
+    assert client.get('/api/me/dashboard').status_code == 401
+    assert client.get('/api/me/dashboard', headers={'Authorization': 'Bearer bad'}).status_code == 401
+
+
+def test_dashboard_timeout_keeps_the_shared_client(client, monkeypatch, app_supabase, fake_supabase):
+    headers, _ = _setup(monkeypatch, fake_supabase, 1)
+    discarded = []
+    monkeypatch.setattr(application, 'discard_client', lambda c, error=None: discarded.append(error))
+    monkeypatch.setattr(application.Config, 'DASHBOARD_TIMEOUT', 0.05)
+    release = threading.Event()
+
+    def slow_rows(client, user_id, limit):
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(application, '_dashboard_rows', slow_rows)
+    try:
+        res = client.get('/api/me/dashboard?sections=shares', headers=headers)
+    finally:
+        release.set()
+    assert res.status_code == 500
+    assert 'shares' in res.get_json()['errors']
+    assert discarded == []
+
+    def broken_rows(client, user_id, limit):
+        raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(application, '_dashboard_rows', broken_rows)
+    res = client.get('/api/me/dashboard?sections=shares', headers=headers)
+    assert res.status_code == 500
+    assert [type(e) for e in discarded] == [ConnectionError]
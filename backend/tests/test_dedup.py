@@ -0,0 +1,58 @@
+import hashlib
+import io
+
+
+def _uploads(fake):
+    return [
+        path for method, path, params in fake.requests
+        if method == 'POST' and path.startswith('/storage/v1/object/') and not path.startswith('/storage/v1/object/sign/')
+    ]
+
+
+def test_duplicate_content_is_uploaded_once(monkeypatch, supabase, fake_supabase):
+    import application
+
+    monkeypatch.setattr(application.Config, 'UPLOAD_DEDUP', True)
+
+    first = application._upload_share_file(supabase, 'AAA111', 'setup.zip', io.BytesIO(b'same bytes'), 10)
+    second = application._upload_share_file(supabase, 'BBB222', 'copy.zip', io.BytesIO(b'same bytes'), 10)
+
+    assert len(_uploads(fake_supabase)) == 1
+    assert first['digest'] == second['digest']
+    assert first['url'].split('?')[0] == second['url'].split('?')[0]
+    assert second['name'] == 'copy.zip'
+    assert first['path'] == f"sha256/{first['digest']}.zip"
+    [ref] = fake_supabase.tables['storage_objects']
+    assert ref['ref_count'] == 2 and ref['ready'] is True
+
+
+def test_duplicate_of_an_unfinished_upload_writes_the_object_itself(monkeypatch, supabase, fake_supabase):
+    import application
+
+    monkeypatch.setattr(application.Config, 'UPLOAD_DEDUP', True)
+    digest = hashlib.sha256(b'same bytes').hexdigest()
+    path = f'sha256/{digest}.zip'
+    # Another uploader claimed the digest and left a partial object behind
+    fake_supabase.insert('storage_objects', {'digest': digest, 'bucket': 'shared-files', 'path': path, 'size': 10, 'ref_count': 1, 'ready': False})
+    fake_supabase.put_object('shared-files', path, b'same')
+
+    first = application._upload_share_file(supabase, 'AAA111', 'setup.zip', io.BytesIO(b'same bytes'), 10)
+    second = application._upload_share_file(supabase, 'BBB222', 'copy.zip', io.BytesIO(b'same bytes'), 10)
+
+    assert first['path'] == second['path'] == path
+    assert len(_uploads(fake_supabase)) == 1
+    assert fake_supabase.objects[('shared-files', path)] == b'same bytes'
+    assert fake_supabase.tables['storage_objects'][0]['ready'] is True
+
+
+def test_falls_back_when_dedup_schema_missing(monkeypatch, supabase, fake_supabase):
+    import application
+
+    monkeypatch.setattr(application.Config, 'UPLOAD_DEDUP', True)
+    fake_supabase.missing_rpcs.add('claim_storage_object')
+
+    info = application._upload_share_file(supabase, 'CCC333', 'a.txt', io.BytesIO(b'abc'), 3)
+
+    assert info['digest'] is None
+    assert info['path'].startswith('CCC333-')
+    assert fake_supabase.objects == {('shared-files', info['path']): b'abc'}
@@ -16,6 +16,7 @@ def test_supabase_health_shape(client):
     data = res.get_json()
     for key in [
         'configured', 'url_present', 'key_present', 'key_type',
-        'client_created', 'client_error', 'auth', 'storage_buckets', 'status'
+        'client_created', 'client_error', 'auth', 'storage_buckets', 'status',
+        'client_pool'
     ]:
         assert key in data
@@ -0,0 +1,101 @@
+import io
+import urllib.error
+from email.message import Message
+
+
+class _Upstream(io.BytesIO):
+    def __init__(self, body, status=200, headers=None):
+        super().__init__(body)
+        self.status = status
+        self.headers = Message()
+        for k, v in (headers or {}).items():
+            self.headers[k] = v
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+    def getcode(self):
+        return self.status
+
+
+def _configure(monkeypatch, upstream, seen):
+    import application
+    import file_proxy
+
+    def fake_urlopen(req, timeout=None):
+        seen.append(dict(req.header_items()))
+        if isinstance(upstream, Exception):
+            raise upstream
+        return upstream
+
+    monkeypatch.setitem(application.application.config, 'SUPABASE_URL', 'https://proj.supabase.co')
+    monkeypatch.setattr(application.Config, 'FILE_PROXY_CHUNK_SIZE', 4)
+    monkeypatch.setattr(file_proxy.urllib.request, 'urlopen', fake_urlopen)
+
+
+def test_fetch_streams_in_chunks_and_relays_headers(client, monkeypatch):
+    seen = []
+    upstream = _Upstream(b'0123456789', headers={
+        'Content-Type': 'video/mp4', 'Content-Length': '10', 'ETag': '"abc"',
+        'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT',
+    })
+    _configure(monkeypatch, upstream, seen)
+
+    res = client.get('/api/files/fetch?url=https://proj.supabase.co/storage/v1/object/public/f/a.mp4')
+
+    assert res.status_code == 200
+    assert res.data == b'0123456789'
+    assert res.headers['ETag'] == '"abc"'
+    assert res.headers['Content-Length'] == '10'
+    assert res.headers['Accept-Ranges'] == 'bytes'
+    assert set(upstream.reads) == {4}
+
+
+def test_fetch_forwards_range_requests(client, monkeypatch):
+    seen = []
+    upstream = _Upstream(b'2345', status=206, headers={
+        'Content-Type': 'video/mp4', 'Content-Length': '4', 'Content-Range': 'bytes 2-5/10',
+    })
+    _configure(monkeypatch, upstream, seen)
+
+    res = client.get(
+        '/api/files/fetch?url=https://proj.supabase.co/storage/v1/object/public/f/a.mp4',
+        headers={'Range': 'bytes=2-5'},
+    )
+
+    assert res.status_code == 206
+    assert res.data == b'2345'
+    assert res.headers['Content-Range'] == 'bytes 2-5/10'
+    assert seen[0].get('Range') == 'bytes=2-5'
+
+
+def test_fetch_passes_through_not_modified(client, monkeypatch):
+    seen = []
+    not_modified = urllib.error.HTTPError('https://proj.supabase.co/x', 304, 'Not Modified', Message(), io.BytesIO(b''))
+    _configure(monkeypatch, not_modified, seen)
+
+    res = client.get(
+        '/api/files/fetch?url=https://proj.supabase.co/storage/v1/object/public/f/a.mp4',
+        headers={'If-None-Match': '"abc"'},
+    )
+
+    assert res.status_code == 304
+    assert seen[0].get('If-none-match') == '"abc"'
+
+
+def test_fetch_redirects_to_cached_signed_url(client, monkeypatch):
+    import application
+
+    class _Signer:
+        def get(self, client, bucket, path):
+            return f'https://proj.supabase.co/storage/v1/object/sign/{bucket}/{path}?token=t', None
+
+    monkeypatch.setattr(application, 'get_client', lambda: (object(), None))
+    monkeypatch.setattr(application, 'signed_urls', _Signer())
+
+    res = client.get('/api/files/fetch?url=proxy:shared-files/a.pdf&redirect=1')
+
+    assert res.status_code == 302
+    assert res.headers['Location'].endswith('/sign/shared-files/a.pdf?token=t')
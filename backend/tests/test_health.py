@@ -0,0 +1,60 @@
+import time
+
+import application
+from health import HealthProber
+
+
+def test_snapshot_probes_once_then_serves_cache():
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return {'status': 'ok'}
+
+    prober = HealthProber(probe, interval=30)
+    report, age = prober.snapshot()
+    assert report['status'] == 'ok' and age >= 0
+    prober.snapshot()
+    assert len(calls) == 1
+    assert prober.stats()['probes'] == 1
+
+
+def test_probe_exception_reports_degraded():
+    def probe():
+        raise RuntimeError('boom')
+
+    prober = HealthProber(probe, interval=30)
+    report = prober.refresh()
+    assert report['status'] == 'degraded' and 'boom' in report['error']
+    assert prober.stats()['failures'] == 1
+
+
+def test_ready_depends_on_the_probe_thread_not_upstream():
+    prober = HealthProber(lambda: {'status': 'degraded'}, interval=30, stale_after=60)
+    ready, detail = prober.ready()
+    assert ready is False and detail['status'] == 'probe stopped'
+
+    prober.start()
+    deadline = time.time() + 5
+    while prober.stats()['probes'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    ready, detail = prober.ready()
+    assert ready is True and detail['upstream'] == 'degraded'
+    prober._checked_at = time.time() - 120
+    assert prober.ready()[1]['upstream'] == 'stale'
+
+
+def test_liveness_and_readiness_endpoints(client, monkeypatch):
+    assert client.get('/health/live').status_code == 200
+
+    prober = HealthProber(lambda: {'status': 'degraded'}, interval=0)
+    monkeypatch.setattr(application, 'health_prober', prober)
+    prober.refresh()
+    res = client.get('/health/ready')
+    assert res.status_code == 200 and res.get_json()['upstream'] == 'degraded'
+    prober._probe = lambda: {'status': 'ok'}
+    prober.refresh()
+    assert client.get('/health/ready').get_json()['upstream'] == 'ok'
+
+    body = client.get('/supabase/health').get_json()
+    assert body['status'] == 'ok' and 'age_seconds' in body and 'prober' in body
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from janitor import ShareJanitor, storage_location
+
+
+def test_storage_location_parses_proxy_and_supabase_urls():
+    assert storage_location('proxy:shared-files/a/b.txt') == ('shared-files', 'a/b.txt')
+    assert storage_location(
+        'https://p.supabase.co/storage/v1/object/public/shared-files/sha256/ab%20c.zip'
+    ) == ('shared-files', 'sha256/ab c.zip')
+    assert storage_location('https://p.supabase.co/storage/v1/object/sign/shared-files/x.pdf?token=t') == ('shared-files', 'x.pdf')
+    assert storage_location('https://example.com/file.txt') is None
+    assert storage_location(None) is None
+
+
+PAST = '2020-01-01T00:00:00+00:00'
+
+
+def test_run_once_removes_unreferenced_objects_in_batches(supabase, fake_supabase):
+    for path in ('one.txt', 'sha256/d1.zip', 'sha256/d2.zip', 'sha256/d3.zip', 'kept.txt'):
+        fake_supabase.put_object('shared-files', path, b'x')
+    fake_supabase.insert('storage_objects', {'digest': 'd1', 'bucket': 'shared-files', 'path': 'sha256/d1.zip', 'ref_count': 1, 'ready': True})
+    fake_supabase.insert('storage_objects', {'digest': 'd2', 'bucket': 'shared-files', 'path': 'sha256/d2.zip', 'ref_count': 2, 'ready': True})
+    fake_supabase.insert('shares', {'code': 'AAA111', 'file_url': 'proxy:shared-files/one.txt', 'expires_at': PAST})
+    fake_supabase.insert('shares', {'code': 'BBB222', 'file_url': 'proxy:shared-files/sha256/d1.zip', 'content_digest': 'd1', 'expires_at': PAST})
+    fake_supabase.insert('shares', {'code': 'CCC333', 'file_url': 'proxy:shared-files/sha256/d2.zip', 'content_digest': 'd2', 'expires_at': PAST})
+    fake_supabase.insert('shares', {'code': 'DDD444', 'max_views': 1, 'view_count': 1})
+    # Unknown digest (release returns NULL): the file may still be shared
+    fake_supabase.insert('shares', {'code': 'EEE555', 'file_url': 'proxy:shared-files/sha256/d3.zip', 'content_digest': 'd3', 'expires_at': PAST})
+    # Deactivated shares are kept unless the janitor is told otherwise
+    fake_supabase.insert('shares', {'code': 'FFF666', 'file_url': 'proxy:shared-files/kept.txt', 'is_active': False})
+    fake_supabase.insert('shares', {'code': 'GGG777'})
+    purged = []
+    janitor = ShareJanitor(lambda: (supabase, None), batch_size=2, storage_batch=1, interval=0, on_purged=purged.extend)
+
+    assert janitor.run_once() == {'rows': 5, 'objects': 2}
+    assert sorted(path for _, path in fake_supabase.objects) == ['kept.txt', 'sha256/d2.zip', 'sha256/d3.zip']
+    assert purged == ['AAA111', 'BBB222', 'CCC333', 'DDD444', 'EEE555']
+    assert [row['code'] for row in fake_supabase.tables['shares']] == ['FFF666', 'GGG777']
+    assert [row['ref_count'] for row in fake_supabase.tables['storage_objects']] == [1]
+    stats = janitor.stats()
+    assert stats['rows_purged'] == 5 and stats['failures'] == 0
+
+    janitor = ShareJanitor(lambda: (supabase, None), interval=0, include_inactive=True)
+    assert janitor.run_once() == {'rows': 1, 'objects': 1}
+    assert [row['code'] for row in fake_supabase.tables['shares']] == ['GGG777']
+
+
+def test_falls_back_to_deleting_time_expired_rows(supabase, fake_supabase):
+    fake_supabase.missing_rpcs.add('purge_expired_shares')
+    old = fake_supabase.insert('shares', {'code': 'OLD999', 'expires_at': PAST})
+    fake_supabase.insert('shares', {'code': 'NEW000'})
+    fake_supabase.insert('activities', {'share_id': old['id'], 'activity_type': 'VIEW'})
+    janitor = ShareJanitor(lambda: (supabase, None), batch_size=5, interval=0)
+
+    assert janitor.run_once()['rows'] == 1
+    assert [row['code'] for row in fake_supabase.tables['shares']] == ['NEW000']
+    assert fake_supabase.tables['activities'][0]['share_id'] is None
+
+
+def test_create_share_sets_capped_expiry(client, app_supabase, fake_supabase):
+    res = client.post('/api/shares', json={'text': 'hi', 'expires_in_hours': 10000})
+    assert res.status_code == 201
+    [row] = fake_supabase.tables['shares']
+    expires_at = datetime.fromisoformat(row['expires_at'])
+    limit = datetime.now(timezone.utc) + timedelta(hours=app_supabase.Config.MAX_EXPIRY_HOURS)
+    assert abs((expires_at - limit).total_seconds()) < 60
+    assert res.get_json()['expires_at'] == row['expires_at']
+
+    assert client.post('/api/shares', json={'text': 'hi', 'expires_in_hours': 'soon'}).status_code == 400
@@ -0,0 +1,55 @@
+import httpx
+
+from metrics import MetricsRegistry, UPSTREAM_LATENCY, classify_supabase_request, instrument_http_client
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    hist = registry.histogram('op_seconds', 'Op latency.', ('op',), buckets=(0.1, 1.0))
+    hist.observe(0.05, op='a')
+    hist.observe(0.5, op='a')
+    hist.observe(5, op='a')
+
+    text = registry.render()
+    assert 'op_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="a",le="1"} 2' in text
+    assert 'op_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 'op_seconds_count{op="a"} 3' in text
+
+
+def test_classify_supabase_paths():
+    assert classify_supabase_request('GET', '/rest/v1/shares') == 'postgrest_select'
+    assert classify_supabase_request('POST', '/rest/v1/rpc/view_share') == 'rpc'
+    assert classify_supabase_request('GET', '/auth/v1/user') == 'auth_get_user'
+    assert classify_supabase_request('POST', '/storage/v1/object/sign/shared-files/a.txt') == 'storage_create_signed_url'
+    assert classify_supabase_request('POST', '/storage/v1/object/shared-files/a.txt') == 'storage_upload'
+
+
+def test_instrumented_httpx_client_records_upstream_latency():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+    client = httpx.Client(base_url='https://proj.supabase.co', transport=transport)
+    instrument_http_client(client)
+    instrument_http_client(client)
+    before = UPSTREAM_LATENCY.count(call='postgrest_select', status='2xx')
+
+    client.get('/rest/v1/shares?select=code')
+
+    assert UPSTREAM_LATENCY.count(call='postgrest_select', status='2xx') == before + 1
+
+
+def test_metrics_endpoint_reports_routes_and_caches(client, monkeypatch):
+    import application
+
+    client.get('/supabase/health')
+    assert client.get('/metrics').status_code == 404
+
+    monkeypatch.setattr(application.Config, 'METRICS_TOKEN', 'scrape-me')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    res = client.get('/metrics', headers={'Authorization': 'Bearer scrape-me'})
+
+    assert res.status_code == 200
+    body = res.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="supabase_health",method="GET",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="supabase_health",method="GET",le="+Inf"}' in body
+    assert 'cache_hits{cache="share"}' in body
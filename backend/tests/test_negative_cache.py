@@ -0,0 +1,93 @@
+import pytest
+
+import application
+from negative_cache import BloomFilter, NegativeLookupCache
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    codes = [f'C{i:05d}' for i in range(1000)]
+    for code in codes:
+        bloom.add(code)
+    assert all(code in bloom for code in codes)
+    false_positives = sum(f'Z{i:05d}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_miss_cache_is_cleared_when_code_is_created():
+    cache = NegativeLookupCache(lambda: (None, 'no client'), ttl=30)
+    assert cache.known_missing('abc123') is False
+    cache.record_miss('abc123')
+    assert cache.known_missing('ABC123') is True
+    cache.add('abc123')
+    assert cache.known_missing('ABC123') is False
+    assert cache.stats()['cache_hits'] == 1
+
+
+def test_bloom_rebuild_and_sync_against_fake_supabase(monkeypatch):
+    pytest.importorskip('supabase')
+    pytest.importorskip('jwt')
+    from fake_supabase import FakeSupabase
+    from supabase_client import create_client
+
+    with FakeSupabase() as fake:
+        monkeypatch.setenv('SUPABASE_URL', fake.url)
+        monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', fake.service_key)
+        client, _ = create_client()
+        for i in range(25):
+            fake.insert('shares', {'code': f'OLD{i:03d}'})
+
+        cache = NegativeLookupCache(lambda: (client, None), ttl=0, bloom_capacity=1000, sync_interval=0, page_size=10)
+        assert cache.known_missing('NOPE00') is False  # filter not built yet
+        assert cache.rebuild() is True
+        assert cache.stats()['bloom']['codes'] == 25
+        assert cache.known_missing('OLD007') is False
+
+        # Created by another worker after the rebuild: picked up by the sync
+        fake.insert('shares', {'code': 'NEW001'})
+        assert cache.known_missing('NEW001') is False
+        syncs = cache.stats()['syncs']
+        assert cache.known_missing('NOPE00') is True
+        assert cache.stats()['syncs'] == syncs + 1
+        assert cache.stats()['bloom_rejections'] == 1
+
+        # A burst larger than one page is read page by page
+        for i in range(25):
+            fake.insert('shares', {'code': f'BURST{i:03d}'})
+        assert cache.sync() is True
+        assert all(cache.known_missing(f'BURST{i:03d}') is False for i in range(25))
+
+
+class _EmptyResult:
+    data = []
+
+    def execute(self):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self
+
+
+class _EmptyClient:
+    def __init__(self):
+        self.lookups = 0
+
+    def rpc(self, *a, **kw):
+        self.lookups += 1
+        return _EmptyResult()
+
+    def table(self, name):
+        self.lookups += 1
+        return _EmptyResult()
+
+
+def test_repeated_unknown_code_is_answered_from_memory(client, monkeypatch):
+    fake = _EmptyClient()
+    monkeypatch.setattr(application, 'get_client', lambda: (fake, None))
+    monkeypatch.setattr(application, 'missing_codes', NegativeLookupCache(lambda: (fake, None), ttl=30))
+
+    assert client.get('/api/shares/ZZZZ99').status_code == 404
+    lookups = fake.lookups
+    assert lookups > 0
+    assert client.get('/api/shares/zzzz99').status_code == 404
+    assert fake.lookups == lookups
@@ -0,0 +1,73 @@
+import pytest
+
+from pagination import decode_cursor, encode_cursor, keyset_query, page_params, split_page
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = encode_cursor({'created_at': '2026-01-02T03:04:05+00:00', 'id': 42})
+    assert decode_cursor(cursor) == ('2026-01-02T03:04:05+00:00', 42)
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_cursor_cannot_inject_filter_syntax():
+    for created_at, row_id in [
+        ('2026-01-01",user_id.neq.x,created_at.lt."2030-01-01', 1),
+        ('2026-01-01T00:00:00', '1),or(id.gt.0'),
+        ('2026-01-01T00:00:00', True),
+        ('2026-01-01T00:00:00', -1),
+    ]:
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor({'created_at': created_at, 'id': row_id}))
+    assert decode_cursor(encode_cursor({'created_at': '2026-01-02T03:04:05.123456Z', 'id': 7})) == \
+        ('2026-01-02T03:04:05.123456+00:00', 7)
+
+
+def test_page_params_clamps_limit():
+    assert page_params({}, 50, 200) == (50, None)
+    assert page_params({'limit': '1000'}, 50, 200)[0] == 200
+    with pytest.raises(ValueError):
+        page_params({'limit': '0'})
+
+
+def test_keyset_query_filters_after_cursor(supabase, fake_supabase):
+    # Two rows share a timestamp, so the id tie-breaker decides the page boundary
+    for i, created_at in enumerate(['2026-01-01', '2026-01-02', '2026-01-02', '2026-01-03'], start=1):
+        fake_supabase.insert('shares', {'id': i, 'code': f'C{i}', 'created_at': created_at})
+
+    rows = keyset_query(supabase.table('shares').select('id, created_at'), ('2026-01-02', 3), 10).execute().data
+    assert [row['id'] for row in rows] == [2, 1]
+
+    rows = keyset_query(supabase.table('shares').select('id, created_at'), None, 2).execute().data
+    assert [row['id'] for row in rows] == [4, 3, 2]
+
+
+def test_split_page_emits_cursor_only_when_more_rows():
+    rows = [{'id': i, 'created_at': f'2026-01-0{9 - i}'} for i in range(3)]
+    assert split_page(rows, 3) == (rows, None)
+    page, cursor = split_page(rows, 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == ('2026-01-08T00:00:00', 1)
+
+
+def test_my_shares_endpoint_pages_with_projection(client, app_supabase, fake_supabase):
+    for i, code in enumerate(['A', 'B', 'C'], start=1):
+        fake_supabase.insert('shares', {'code': code, 'user_id': 'user-1', 'created_at': f'2026-01-0{i}T00:00:00+00:00', 'text_content': 'secret'})
+    fake_supabase.insert('shares', {'code': 'OTHER', 'user_id': 'user-2', 'created_at': '2026-01-09T00:00:00+00:00'})
+    headers = {'Authorization': f"Bearer {fake_supabase.issue_token('user-1')}"}
+
+    res = client.get('/api/me/shares?limit=2', headers=headers)
+    body = res.get_json()
+    assert res.status_code == 200
+    assert [s['code'] for s in body['shares']] == ['C', 'B']
+    assert 'id' not in body['shares'][0] and 'text_content' not in body['shares'][0]
+    assert decode_cursor(body['next_cursor']) == ('2026-01-02T00:00:00+00:00', 2)
+    selects = [dict(params).get('select') for method, path, params in fake_supabase.requests if path == '/rest/v1/shares']
+    assert selects == [app_supabase.MY_SHARES_COLUMNS]
+
+    res = client.get(f"/api/me/shares?limit=2&cursor={body['next_cursor']}", headers=headers)
+    assert [s['code'] for s in res.get_json()['shares']] == ['A']
+    assert res.get_json()['next_cursor'] is None
+
+    res = client.get('/api/me/shares?cursor=bogus', headers=headers)
+    assert res.status_code == 400
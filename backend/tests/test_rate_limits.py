@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+from rate_limits import limiter_options, resolve_strategy
+
+
+def _settings(**overrides):
+    settings = dict(
+        RATELIMIT_STORAGE_URI='memory://',
+        RATELIMIT_STRATEGY='sliding-window-counter',
+        RATELIMIT_KEY_PREFIX='test',
+        RATELIMIT_IN_MEMORY_FALLBACK=True,
+    )
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+def test_unknown_strategy_falls_back_to_moving_window():
+    assert resolve_strategy('fixed-window') == 'fixed-window'
+    assert resolve_strategy('token-bucket') == 'moving-window'
+
+
+def test_memory_storage_has_no_fallback():
+    options = limiter_options(_settings())
+    assert options['storage_uri'] == 'memory://'
+    assert 'in_memory_fallback_enabled' not in options
+    assert limiter_options(_settings(RATELIMIT_STORAGE_URI='redis://cache:6379/0'))['in_memory_fallback_enabled'] is True
+
+
+def _worker(options):
+    app = Flask(__name__)
+    limiter = Limiter(get_remote_address, app=app, **options)
+
+    @app.route('/limited')
+    @limiter.limit('3 per minute')
+    def limited():
+        return 'ok'
+
+    return app.test_client()
+
+
+def test_workers_share_counters_through_fakeredis():
+    pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    options = limiter_options(_settings(RATELIMIT_STORAGE_URI='fakeredis://', RATELIMIT_KEY_PREFIX='shared-test'))
+    first, second = _worker(options), _worker(options)
+
+    statuses = [first.get('/limited').status_code, second.get('/limited').status_code,
+                first.get('/limited').status_code, second.get('/limited').status_code]
+    assert statuses == [200, 200, 200, 429]
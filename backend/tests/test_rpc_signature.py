@@ -0,0 +1,65 @@
+import pytest
+
+from supabase_client import RpcSignature, is_missing_function, rpc_get_share_by_code, share_lookup_rpc
+
+
+@pytest.fixture(autouse=True)
+def _fresh_signature():
+    share_lookup_rpc.invalidate()
+    yield
+    share_lookup_rpc.invalidate()
+
+
+def _rpc_calls(fake):
+    return [path for method, path, params in fake.requests if path == '/rest/v1/rpc/get_share_by_code']
+
+
+def test_is_missing_function():
+    assert is_missing_function("{'code': 'PGRST202'}")
+    assert is_missing_function('Could not find the function public.x(code) in the schema cache')
+    assert not is_missing_function('connection refused')
+
+
+def test_signature_is_resolved_once_then_one_call_per_lookup(supabase, fake_supabase):
+    fake_supabase.insert('shares', {'code': 'ABC123', 'text_content': 'hi'})
+    row, err = rpc_get_share_by_code(supabase, 'abc123')
+    assert err is None and row['code'] == 'ABC123'
+    fake_supabase.reset_stats()
+
+    row, err = rpc_get_share_by_code(supabase, 'abc123')
+    assert row['code'] == 'ABC123'
+    assert len(_rpc_calls(fake_supabase)) == 1
+    assert share_lookup_rpc.stats()['path'] == 'rpc:get_share_by_code(share_code)'
+
+
+def test_missing_function_routes_to_select_without_rpc_calls(supabase, fake_supabase):
+    fake_supabase.missing_rpcs.add('get_share_by_code')
+    row, err = rpc_get_share_by_code(supabase, 'abc123')
+    assert row is None and err
+    fake_supabase.reset_stats()
+
+    assert rpc_get_share_by_code(supabase, 'abc123')[1]
+    assert _rpc_calls(fake_supabase) == []
+    assert share_lookup_rpc.stats()['path'] == 'select'
+
+
+def test_transient_errors_leave_signature_unresolved(supabase, fake_supabase):
+    fake_supabase.stop()
+    signature = RpcSignature('get_share_by_code', ('share_code', 'code'))
+    assert signature.resolve(supabase) is None
+    assert signature.stats()['path'] == 'select (rpc status unknown)'
+    assert signature.stats()['probes'] == 1
+
+
+def test_schema_change_invalidates_cached_signature(supabase, fake_supabase):
+    fake_supabase.insert('shares', {'code': 'ABC123'})
+    fake_supabase.rpc_params['get_share_by_code'] = ('_code',)
+    rpc_get_share_by_code(supabase, 'abc123')
+    assert share_lookup_rpc.stats()['param'] == '_code'
+
+    fake_supabase.rpc_params['get_share_by_code'] = ('share_code',)
+    row, err = rpc_get_share_by_code(supabase, 'abc123')
+    assert err and share_lookup_rpc.stats()['path'] == 'unresolved'
+    row, err = rpc_get_share_by_code(supabase, 'abc123')
+    assert err is None and row['code'] == 'ABC123'
+    assert share_lookup_rpc.stats()['param'] == 'share_code'
@@ -0,0 +1,43 @@
+from serializers import SHARE_CREATED_FIELDS, serialize, share_summary
+
+ROW = {
+    'id': 7, 'code': 'PUBLIC', 'content_type': 'text', 'text_content': 'hello world',
+    'password_hash': 'pbkdf2:sha256:1$x$y', 'user_id': 'user-1', 'metadata': {'a': 1},
+    'content_digest': None, 'view_count': 2, 'is_protected': False,
+}
+
+
+def test_serialize_drops_fields_outside_the_whitelist():
+    data = serialize(ROW, SHARE_CREATED_FIELDS)
+    assert 'password_hash' not in data
+    assert 'user_id' not in data
+    assert data['text_content'] == 'hello world'
+
+
+def test_summary_replaces_body_with_length():
+    data = share_summary(ROW)
+    assert 'text_content' not in data
+    assert data['content_length'] == 11
+
+
+def test_share_endpoints_use_whitelists(client, monkeypatch):
+    import application
+
+    application.share_cache.put(dict(ROW))
+    monkeypatch.setattr(application.view_counter, 'interval', 3600)
+
+    full = client.get('/api/shares/PUBLIC').get_json()
+    assert full['text_content'] == 'hello world'
+    assert not {'password_hash', 'user_id', 'metadata', 'id'} & set(full)
+
+    summary = client.get('/api/shares/PUBLIC?content=0').get_json()
+    assert 'text_content' not in summary
+    assert summary['content_length'] == 11
+    assert application.view_counter.pending('PUBLIC') == 1
+
+    content = client.get('/api/shares/PUBLIC/content').get_json()
+    assert content == {'code': 'PUBLIC', 'content_type': 'text', 'text_content': 'hello world'}
+    assert application.view_counter.pending('PUBLIC') == 2
+
+    application.share_cache.invalidate('PUBLIC')
+    application.view_counter._pending.clear()
@@ -0,0 +1,29 @@
+import pytest
+
+import serving
+
+
+def test_sync_mode_uses_threaded_workers():
+    settings = serving.worker_settings('sync', workers=3, threads=8)
+    assert settings['worker_class'] == 'gthread'
+    assert settings['workers'] == 3
+    assert settings['threads'] == 8
+
+
+def test_async_mode_uses_gevent_when_installed(monkeypatch):
+    monkeypatch.setattr(serving, '_gevent_available', lambda: True)
+    settings = serving.worker_settings('ASYNC', worker_connections=800)
+    assert settings['worker_class'] == 'gevent'
+    assert settings['worker_connections'] == 800
+    assert settings['preload_app'] is False
+
+
+def test_async_mode_falls_back_without_gevent(monkeypatch):
+    monkeypatch.setattr(serving, '_gevent_available', lambda: False)
+    settings = serving.worker_settings('async', worker_connections=300)
+    assert settings == {'workers': 3, 'timeout': 60, 'worker_class': 'gthread', 'threads': 300}
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        serving.worker_settings('uvloop')
@@ -0,0 +1,96 @@
+from werkzeug.security import generate_password_hash
+
+from share_access import ShareAccessTokens, cookie_name, hash_share_password, needs_rehash
+
+SECRET = 'test-secret-key-that-is-long-enough'
+
+
+def test_token_is_bound_to_code_and_password_hash():
+    tokens = ShareAccessTokens(SECRET, ttl=60)
+    stored = generate_password_hash('hunter2')
+    token = tokens.issue('abc123', stored)
+
+    assert tokens.verify(token, 'ABC123', stored)
+    assert not tokens.verify(token, 'OTHER1', stored)
+    assert not tokens.verify(token, 'ABC123', generate_password_hash('changed'))
+    assert not tokens.verify('garbage', 'ABC123', stored)
+    assert tokens.stats()['accepted'] == 1
+
+
+def test_zero_ttl_neither_issues_nor_accepts_tokens():
+    stored = generate_password_hash('hunter2')
+    token = ShareAccessTokens(SECRET, ttl=60).issue('abc123', stored)
+    disabled = ShareAccessTokens(SECRET, ttl=0)
+
+    assert disabled.issue('abc123', stored) is None
+    assert not disabled.verify(token, 'ABC123', stored)
+
+
+def test_default_secret_key_disables_share_tokens():
+    import application
+
+    # The test environment does not set SECRET_KEY
+    assert application.Config.SECRET_KEY == application.DEFAULT_SECRET_KEY
+    assert application.share_tokens.ttl == 0
+
+
+def test_needs_rehash_compares_method_and_cost():
+    stored = hash_share_password('pw', 'pbkdf2:sha256:1000')
+    assert not needs_rehash(stored, 'pbkdf2:sha256:1000')
+    assert needs_rehash(stored, 'pbkdf2:sha256:2000')
+    assert not needs_rehash(stored, '')
+
+
+def test_needs_rehash_understands_method_shorthands():
+    # werkzeug expands these to e.g. scrypt:32768:8:1 and pbkdf2:sha256:<iterations>
+    for method in ('scrypt', 'pbkdf2', 'pbkdf2:sha256'):
+        assert not needs_rehash(hash_share_password('pw', method), method)
+    assert needs_rehash(hash_share_password('pw', 'pbkdf2'), 'scrypt')
+
+
+def test_protected_share_issues_token_that_skips_the_hash(client, monkeypatch):
+    import application
+
+    stored = generate_password_hash('hunter2')
+    row = {'code': 'LOCKED', 'content_type': 'text', 'text_content': 'x', 'view_count': 0,
+           'is_protected': True, 'password_hash': stored}
+    application.share_cache.put(row)
+    monkeypatch.setattr(application.view_counter, 'interval', 3600)
+    monkeypatch.setattr(application.Config, 'PASSWORD_HASH_METHOD', '')
+    monkeypatch.setattr(application, 'share_tokens', ShareAccessTokens(SECRET, ttl=60))
+
+    assert client.get('/api/shares/LOCKED').status_code == 403
+    res = client.get('/api/shares/LOCKED?password=hunter2')
+    assert res.status_code == 200
+    token = res.get_json()['access_token']
+    assert cookie_name('LOCKED') in res.headers.get('Set-Cookie', '')
+
+    def no_hashing(*args):
+        raise AssertionError('token reads must not re-check the password')
+
+    monkeypatch.setattr(application, 'check_password_hash', no_hashing)
+    res = client.get('/api/shares/LOCKED', headers={'X-Share-Token': token})
+    assert res.status_code == 200
+    assert 'access_token' not in res.get_json()
+
+    application.share_cache.invalidate('LOCKED')
+    application.view_counter._pending.clear()
+
+
+def test_outdated_hash_is_upgraded_on_verify(client, monkeypatch):
+    import application
+
+    old = generate_password_hash('pw', method='pbkdf2:sha256:1000')
+    application.share_cache.put({'code': 'OLDHSH', 'content_type': 'text', 'view_count': 0,
+                                 'is_protected': True, 'password_hash': old})
+    monkeypatch.setattr(application.view_counter, 'interval', 3600)
+    monkeypatch.setattr(application.Config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    updates = []
+    monkeypatch.setattr(application, '_upgrade_password_hash',
+                        lambda client, code, password: updates.append(code) or hash_share_password(password, 'pbkdf2:sha256:2000'))
+
+    assert client.get('/api/shares/OLDHSH?password=pw').status_code == 200
+    assert updates == ['OLDHSH']
+
+    application.share_cache.invalidate('OLDHSH')
+    application.view_counter._pending.clear()
@@ -0,0 +1,91 @@
+import application
+from share_access import ShareAccessTokens, hash_share_password
+
+
+def _setup(monkeypatch, fake, rows):
+    for row in rows:
+        fake.insert('shares', row)
+    monkeypatch.setattr(application.Config, 'SHARE_VIEW_MODE', 'batched')
+    monkeypatch.setattr(application, 'share_tokens', ShareAccessTokens('test-secret-key-that-is-long-enough', ttl=60))
+    recorded = []
+    monkeypatch.setattr(application.view_counter, 'record', lambda code, count=1: recorded.append(code))
+    monkeypatch.setattr(application.view_counter, 'pending', lambda code: 0)
+    return recorded
+
+
+def _share_queries(fake):
+    return [params for method, path, params in fake.requests if path == '/rest/v1/shares']
+
+
+def test_batch_resolves_codes_with_one_query(client, monkeypatch, app_supabase, fake_supabase):
+    rows = [
+        {'code': 'AAA111', 'text_content': 'one', 'view_count': 1, 'password_hash': 'x'},
+        {'code': 'BBB222', 'text_content': 'two', 'view_count': 0, 'is_protected': True,
+         'password_hash': hash_share_password('pw', 'pbkdf2:sha256:1000')},
+        {'code': 'CCC333', 'text_content': 'three', 'is_protected': True,
+         'password_hash': hash_share_password('pw', 'pbkdf2:sha256:1000')},
+        {'code': 'DDD444', 'text_content': 'gone', 'is_active': False},
+    ]
+    recorded = _setup(monkeypatch, fake_supabase, rows)
+
+    res = client.post('/api/shares/batch', json={
+        'codes': ['aaa111', 'BBB222', {'code': 'ccc333'}, 'DDD444', 'ZZZ999', 'AAA111'],
+        'passwords': {'bbb222': 'pw'},
+    })
+    assert res.status_code == 200
+    results = res.get_json()['results']
+    assert [r['code'] for r in results] == ['AAA111', 'BBB222', 'CCC333', 'DDD444', 'ZZZ999']
+    assert [r['status'] for r in results] == ['ok', 'ok', 'locked', 'not_found', 'not_found']
+    assert results[0]['share']['text_content'] == 'one'
+    assert 'password_hash' not in results[0]['share']
+    assert results[1]['share']['access_token']
+    assert len(_share_queries(fake_supabase)) == 1
+    assert dict(_share_queries(fake_supabase)[0])['code'].startswith('in.')
+    assert recorded == ['AAA111', 'BBB222']
+
+    # Cached and known-missing codes do not go back to the database
+    res = client.post('/api/shares/batch', json={'codes': ['AAA111', 'ZZZ999'], 'content': False})
+    assert [r['status'] for r in res.get_json()['results']] == ['ok', 'not_found']
+    assert 'text_content' not in res.get_json()['results'][0]['share']
+    assert len(_share_queries(fake_supabase)) == 1
+    assert recorded == ['AAA111', 'BBB222']
+
+
+def test_batch_validates_input(client, monkeypatch, app_supabase, fake_supabase):
+    _setup(monkeypatch, fake_supabase, [])
+    assert client.post('/api/shares/batch', json={}).status_code == 400
+    assert client.post('/api/shares/batch', json={'codes': [123]}).status_code == 400
+    too_many = [f'C{i:05d}' for i in range(application.Config.SHARE_BATCH_MAX_CODES + 1)]
+    assert client.post('/api/shares/batch', json={'codes': too_many}).status_code == 400
+
+
+def test_batch_codes_count_against_the_single_lookup_limit(client, monkeypatch, app_supabase, fake_supabase):
+    _setup(monkeypatch, fake_supabase, [])
+    monkeypatch.setattr(application.limiter, 'enabled', True)
+    application.limiter.reset()
+    try:
+        codes = [f'C{i:05d}' for i in range(48)]
+        assert client.post('/api/shares/batch', json={'codes': codes}).status_code == 200
+        assert client.get('/api/shares/ZZZ001').status_code == 404
+        assert client.get('/api/shares/ZZZ002').status_code == 404
+        assert client.get('/api/shares/ZZZ003').status_code == 429
+        assert client.post('/api/shares/batch', json={'codes': ['ZZZ004']}).status_code == 429
+    finally:
+        application.limiter.reset()
+
+
+def test_atomic_batch_counts_only_views_the_database_allows(client, app_supabase, fake_supabase):
+    fake_supabase.insert('shares', {'code': 'OPEN01', 'text_content': 'one'})
+    last = fake_supabase.insert('shares', {'code': 'LAST01', 'text_content': 'two', 'max_views': 1})
+    # Another reader spent the last view after this worker cached the row
+    app_supabase.share_cache.put(dict(last))
+    last['view_count'] = 1
+    fake_supabase.reset_stats()
+
+    res = client.post('/api/shares/batch', json={'codes': ['OPEN01', 'LAST01']})
+    results = res.get_json()['results']
+    assert [r['status'] for r in results] == ['ok', 'not_found']
+    assert results[0]['share']['view_count'] == 1
+    assert [path for method, path, params in fake_supabase.requests if '/rpc/' in path] == ['/rest/v1/rpc/view_shares']
+    assert [row['view_count'] for row in fake_supabase.tables['shares']] == [1, 1]
+    assert app_supabase.share_cache.get('LAST01') is None
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+from share_cache import RedisShareBackend, ShareCache, ViewCounter, is_servable
+
+
+class _DictRedis:
+    """Minimal redis stand-in: get/set(ex=)/delete."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def _iso(delta):
+    return (datetime.now(timezone.utc) + delta).isoformat()
+
+
+def test_is_servable_respects_expiry_active_and_max_views():
+    assert is_servable({'code': 'ABC123'})
+    assert not is_servable({'code': 'ABC123', 'is_active': False})
+    assert not is_servable({'code': 'ABC123', 'expires_at': _iso(timedelta(seconds=-1))})
+    assert is_servable({'code': 'ABC123', 'max_views': 3, 'view_count': 2})
+    assert not is_servable({'code': 'ABC123', 'max_views': 3, 'view_count': 2}, pending_views=1)
+
+
+def test_cache_evicts_rows_that_hit_max_views():
+    cache = ShareCache(ttl=60)
+    cache.put({'code': 'abc123', 'view_count': 1, 'max_views': 2})
+
+    assert cache.get('ABC123')['view_count'] == 1
+    assert cache.get('ABC123', pending_views=1) is None
+    assert cache.get('ABC123') is None
+
+
+def test_redis_backend_round_trip():
+    cache = ShareCache(backend=RedisShareBackend(_DictRedis()), ttl=60)
+    cache.put({'code': 'XYZ789', 'view_count': 4, 'text_content': 'hi'})
+    cache.add_views('xyz789', 2)
+
+    assert cache.get('XYZ789')['view_count'] == 6
+
+
+def test_view_counter_batches_and_retries():
+    written = []
+    fail = {'next': True}
+
+    def flush(deltas):
+        if fail['next']:
+            fail['next'] = False
+            raise RuntimeError('supabase down')
+        written.append(dict(deltas))
+
+    counter = ViewCounter(flush, interval=3600, batch_size=1000)
+    counter.record('abc123')
+    counter.record('ABC123')
+    counter.record('zzz999')
+
+    assert counter.flush() == {}
+    assert counter.pending('abc123') == 2
+    assert counter.flush() == {'ABC123': 2, 'ZZZ999': 1}
+    assert written == [{'ABC123': 2, 'ZZZ999': 1}]
+    assert counter.pending('abc123') == 0
+
+
+def test_get_share_served_from_cache(client, monkeypatch):
+    import application
+
+    calls = []
+
+    def fake_get_client():
+        calls.append(1)
+        raise AssertionError('cache hit must not reach Supabase')
+
+    application.share_cache.put({'code': 'CACHED', 'content_type': 'text', 'text_content': 'x', 'view_count': 5})
+    monkeypatch.setattr(application, 'get_client', fake_get_client)
+    monkeypatch.setattr(application.view_counter, 'interval', 3600)
+    # Only batched view counting lets a cache hit skip the database
+    monkeypatch.setattr(application.Config, 'SHARE_VIEW_MODE', 'batched')
+
+    res = client.get('/api/shares/cached')
+
+    assert res.status_code == 200
+    assert res.get_json()['view_count'] == 6
+    assert not calls
+    application.share_cache.invalidate('CACHED')
+    application.view_counter._pending.clear()
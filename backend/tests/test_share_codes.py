@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from share_codes import CODE_ALPHABET, CodeAllocator, generate_code, is_code_conflict
+
+
+def test_generate_code_uses_length_and_alphabet():
+    code = generate_code(8)
+    assert len(code) == 8
+    assert set(code) <= set(CODE_ALPHABET)
+
+
+def test_refill_keeps_only_free_codes():
+    seen = []
+
+    def taken(codes):
+        seen.append(list(codes))
+        return set(list(codes)[:2])
+
+    allocator = CodeAllocator(length=6, pool_size=10, taken_fn=taken)
+    added = allocator.refill()
+
+    assert len(seen) == 1
+    assert added == len(seen[0]) - 2
+    reserved = allocator.stats()['reserved']
+    assert reserved == added
+    code = allocator.allocate()
+    assert code in seen[0][2:]
+    assert allocator.stats()['from_pool'] == 1
+
+
+def test_allocate_without_pool_generates_fresh_codes():
+    allocator = CodeAllocator(length=4)
+    assert len(allocator.allocate()) == 4
+    assert allocator.stats()['from_pool'] == 0
+
+
+class _Table:
+    def __init__(self, taken):
+        self.taken = taken
+        self.inserted = []
+        self.payload = None
+
+    def insert(self, payload):
+        self.payload = dict(payload)
+        return self
+
+    def execute(self):
+        if self.payload['code'] in self.taken:
+            raise RuntimeError('duplicate key value violates unique constraint "shares_code_key" (23505)')
+        self.inserted.append(self.payload)
+        return SimpleNamespace(data=[self.payload])
+
+
+def test_insert_retries_generated_code_on_conflict(monkeypatch):
+    import application
+
+    codes = iter(['NEW001'])
+    monkeypatch.setattr(application, '_generate_code', lambda: next(codes))
+    table = _Table({'TAKEN1'})
+    client = SimpleNamespace(table=lambda name: table)
+    payload = {'code': 'TAKEN1'}
+
+    assert application._insert_share(client, payload, generated_code=True) is None
+    assert payload['code'] == 'NEW001'
+    assert table.inserted == [{'code': 'NEW001'}]
+
+
+def test_insert_reports_conflict_for_requested_code(client):
+    import application
+
+    table = _Table({'MINE01'})
+    fake = SimpleNamespace(table=lambda name: table)
+    with application.application.app_context():
+        resp, status = application._insert_share(fake, {'code': 'MINE01'})
+    assert status == 409
+    assert is_code_conflict('duplicate key value violates unique constraint')
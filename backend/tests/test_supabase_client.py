@@ -0,0 +1,107 @@
+import threading
+
+import httpx
+
+from supabase_client import ClientRegistry
+
+
+def _counting_factory():
+    built = []
+
+    def factory():
+        client = object()
+        built.append(client)
+        return client, None
+
+    return factory, built
+
+
+def test_registry_reuses_client_per_thread():
+    factory, built = _counting_factory()
+    registry = ClientRegistry(factory=factory, pool_size=2)
+
+    first, err = registry.get()
+    second, _ = registry.get()
+
+    assert err is None
+    assert first is second
+    assert len(built) == 1
+    stats = registry.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+
+def test_registry_is_bounded_across_threads():
+    factory, built = _counting_factory()
+    registry = ClientRegistry(factory=factory, pool_size=2)
+    seen = []
+
+    def worker():
+        seen.append(registry.get()[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(built) == 2
+    assert set(map(id, seen)) == set(map(id, built))
+
+
+def test_registry_rebuilds_after_transport_failure():
+    factory, built = _counting_factory()
+    registry = ClientRegistry(factory=factory, pool_size=1)
+    client, _ = registry.get()
+
+    assert registry.discard(client, ValueError('bad request')) is False
+    assert registry.get()[0] is client
+
+    assert registry.discard(client, httpx.ConnectError('reset')) is True
+    rebuilt, _ = registry.get()
+    assert rebuilt is not client
+    assert registry.stats()['rebuilds'] == 1
+
+
+def test_registry_reports_factory_errors():
+    registry = ClientRegistry(factory=lambda: (None, 'Missing SUPABASE_URL'), pool_size=1)
+    client, err = registry.get()
+    assert client is None
+    assert err == 'Missing SUPABASE_URL'
+    assert registry.stats()['errors'] == 1
+
+
+class _FakeBucket:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def create_signed_url(self, path, expires_in):
+        self.calls.append((path, expires_in))
+        return {'signedURL': f'https://proj.supabase.co/sign/{path}?n={len(self.calls)}'}
+
+
+class _FakeStorageClient:
+    def __init__(self):
+        self.calls = []
+        self.storage = self
+
+    def from_(self, bucket):
+        return _FakeBucket(self.calls)
+
+
+def test_signed_url_cache_signs_once_per_path():
+    from supabase_client import SignedUrlCache
+
+    cache = SignedUrlCache(expires_in=3600, refresh_margin=300)
+    client = _FakeStorageClient()
+
+    first, err = cache.get(client, 'shared-files', 'a.pdf')
+    second, _ = cache.get(client, 'shared-files', 'a.pdf')
+    cache.get(client, 'shared-files', 'b.pdf')
+
+    assert err is None
+    assert first == second
+    assert client.calls == [('a.pdf', 3600), ('b.pdf', 3600)]
+
+    cache.invalidate('shared-files', 'a.pdf')
+    assert cache.get(client, 'shared-files', 'a.pdf')[0] != first
@@ -0,0 +1,142 @@
+import io
+
+import pytest
+from werkzeug.security import check_password_hash
+
+from uploads import UploadError, UploadSpool
+
+
+def test_chunks_append_in_order_and_resume(tmp_path):
+    spool = UploadSpool(directory=str(tmp_path), max_size=100)
+    session = spool.create('notes.txt', 10)
+    upload_id = session['upload_id']
+
+    assert spool.append(upload_id, 0, io.BytesIO(b'01234')) == 5
+    with pytest.raises(UploadError) as exc:
+        spool.append(upload_id, 0, io.BytesIO(b'01234'))
+    assert exc.value.status == 409
+    assert exc.value.offset == 5
+
+    assert spool.append(upload_id, 5, io.BytesIO(b'56789')) == 10
+    assert spool.load(upload_id)['offset'] == 10
+    with open(spool.data_path(upload_id), 'rb') as fh:
+        assert fh.read() == b'0123456789'
+
+
+def test_rejects_oversized_uploads_and_chunks(tmp_path):
+    spool = UploadSpool(directory=str(tmp_path), max_size=8)
+    with pytest.raises(UploadError):
+        spool.create('big.bin', 9)
+
+    upload_id = spool.create('small.txt', 4)['upload_id']
+    with pytest.raises(UploadError) as exc:
+        spool.append(upload_id, 0, io.BytesIO(b'too long'))
+    assert exc.value.status == 413
+    assert spool.load(upload_id)['offset'] == 0
+
+
+def test_spool_quota_and_per_client_cap(tmp_path):
+    spool = UploadSpool(directory=str(tmp_path), max_size=100, max_total=150, max_per_client=2)
+    first = spool.create('a.txt', 60, client='ip:1')
+    spool.create('b.txt', 60, client='ip:1')
+    with pytest.raises(UploadError) as exc:
+        spool.create('c.txt', 10, client='ip:1')
+    assert exc.value.status == 429
+    with pytest.raises(UploadError) as exc:
+        spool.create('d.txt', 40, client='ip:2')
+    assert exc.value.status == 507
+
+    # Finished sessions free their share of the budget
+    spool.discard(first['upload_id'])
+    assert spool.create('d.txt', 40, client='ip:2')['size'] == 40
+
+
+def test_claim_hands_a_session_to_one_caller(tmp_path):
+    spool = UploadSpool(directory=str(tmp_path), max_size=100)
+    upload_id = spool.create('notes.txt', 3)['upload_id']
+    spool.append(upload_id, 0, io.BytesIO(b'abc'))
+
+    assert spool.claim(upload_id)['offset'] == 3
+    assert spool.claim(upload_id) is None
+    with pytest.raises(UploadError) as exc:
+        spool.append(upload_id, 3, io.BytesIO(b''))
+    assert exc.value.status == 404
+
+    spool.release(upload_id)
+    assert spool.load(upload_id)['offset'] == 3
+    assert spool.claim(upload_id) is not None
+    spool.discard(upload_id)
+    assert spool.claim(upload_id) is None and spool.load(upload_id) is None
+
+
+def test_upload_endpoints_round_trip(client, monkeypatch, tmp_path):
+    import application
+
+    monkeypatch.setattr(application, 'upload_spool', UploadSpool(directory=str(tmp_path)))
+    uploaded = {}
+
+    def fake_upload(client, code, filename, source, size):
+        uploaded['body'] = source.read()
+        return {'url': f'proxy:shared-files/{code}.txt', 'name': filename, 'size': size, 'path': None, 'bucket': None}
+
+    monkeypatch.setattr(application, 'get_client', lambda: (object(), None))
+    monkeypatch.setattr(application, '_upload_share_file', fake_upload)
+    inserted = []
+    monkeypatch.setattr(application, '_insert_share', lambda client, payload, **kw: inserted.append(payload))
+
+    res = client.post('/api/uploads', json={'filename': 'notes.txt', 'size': 6})
+    assert res.status_code == 201
+    upload_id = res.get_json()['upload_id']
+
+    res = client.put(f'/api/uploads/{upload_id}', data=b'abc', headers={'Upload-Offset': '0'})
+    assert res.get_json()['offset'] == 3
+    res = client.post(f'/api/uploads/{upload_id}/complete', json={})
+    assert res.status_code == 409
+
+    res = client.put(f'/api/uploads/{upload_id}', data=b'def', headers={'Upload-Offset': '3'})
+    assert res.get_json()['complete'] is True
+    res = client.post(f'/api/uploads/{upload_id}/complete', json={
+        'code': 'UPL123', 'password': 'pw', 'metadata': {'language': 'text'},
+    })
+    assert res.status_code == 201
+    assert res.get_json()['code'] == 'UPL123'
+    [payload] = inserted
+    assert payload['content_type'] == 'file' and payload['file_name'] == 'notes.txt'
+    assert payload['is_protected'] and check_password_hash(payload['password_hash'], 'pw')
+    assert payload['language'] == 'text'
+    assert uploaded['body'] == b'abcdef'
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+
+def test_tus_upload_sends_chunks_and_resumes_after_a_lost_response():
+    from fake_supabase import FakeSupabase
+    from uploads import tus_upload
+
+    data = bytes(range(256)) * 40
+    with FakeSupabase() as fake:
+        endpoint = f'{fake.url}/storage/v1/upload/resumable'
+        handle = fake.handle
+        patches = []
+
+        def lossy(method, path, headers, body):
+            result = handle(method, path, headers, body)
+            if method == 'PATCH':
+                patches.append(headers.get('Upload-Offset'))
+                if len(patches) == 2:
+                    # The chunk was stored but the client never hears back
+                    raise ConnectionResetError('connection reset')
+            return result
+
+        fake.handle = lossy
+        fake._server.handle_error = lambda request, address: None
+        tus_upload(endpoint, fake.service_key, 'shared-files', 'big.txt', io.BytesIO(data), len(data), chunk_size=4096)
+        assert fake.objects[('shared-files', 'big.txt')] == data
+        # After the lost response the upload resumed from the server's offset
+        assert patches == ['0', '4096', '8192']
+
+        fake.handle = handle
+        with pytest.raises(UploadError) as exc:
+            tus_upload(endpoint, fake.service_key, 'shared-files', 'big.txt', io.BytesIO(data), len(data), chunk_size=4096)
+        assert exc.value.status == 409
+        tus_upload(endpoint, fake.service_key, 'shared-files', 'big.txt', io.BytesIO(b'new'), 3, upsert=True)
+        assert fake.objects[('shared-files', 'big.txt')] == b'new'
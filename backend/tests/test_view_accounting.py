@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+
+import pytest
+
+from supabase_client import rpc_view_share
+
+
+class _Client:
+    def __init__(self, rows, fail=False):
+        self.rows = rows
+        self.fail = fail
+        self.calls = []
+
+    def rpc(self, fn, params):
+        self.calls.append((fn, params))
+        if self.fail:
+            raise RuntimeError('function view_share does not exist')
+        code = params['share_code']
+        row = self.rows.get(code)
+        if row is not None:
+            row['view_count'] += 1
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=[dict(row)] if row else []))
+
+
+def test_rpc_view_share_distinguishes_gone_from_errors():
+    client = _Client({'ABC123': {'code': 'ABC123', 'view_count': 4}})
+    assert rpc_view_share(client, 'abc123') == ({'code': 'ABC123', 'view_count': 5}, None)
+    assert rpc_view_share(client, 'NOPE00') == (None, None)
+    assert rpc_view_share(_Client({}, fail=True), 'ABC123')[1]
+
+
+@pytest.fixture
+def atomic(monkeypatch):
+    import application
+
+    monkeypatch.setattr(application.Config, 'SHARE_VIEW_MODE', 'atomic')
+    monkeypatch.setattr(application.view_counter, 'interval', 3600)
+    yield application
+    application.share_cache.invalidate('ATOM01')
+    application.view_counter._pending.clear()
+
+
+def test_atomic_mode_counts_each_view_in_the_database(client, atomic, monkeypatch):
+    fake = _Client({'ATOM01': {'code': 'ATOM01', 'content_type': 'text', 'text_content': 'x', 'view_count': 0}})
+    monkeypatch.setattr(atomic, 'get_client', lambda: (fake, None))
+    atomic.share_cache.put({'code': 'ATOM01', 'content_type': 'text', 'text_content': 'x', 'view_count': 0})
+
+    assert client.get('/api/shares/ATOM01').get_json()['view_count'] == 1
+    assert client.get('/api/shares/ATOM01').get_json()['view_count'] == 2
+    assert [c[0] for c in fake.calls] == ['view_share', 'view_share']
+    assert atomic.view_counter.pending('ATOM01') == 0
+
+
+def test_atomic_mode_returns_404_when_views_are_used_up(client, atomic, monkeypatch):
+    monkeypatch.setattr(atomic, 'get_client', lambda: (_Client({}), None))
+    atomic.share_cache.put({'code': 'ATOM01', 'content_type': 'text', 'view_count': 0})
+
+    assert client.get('/api/shares/ATOM01').status_code == 404
+    assert atomic.share_cache.get('ATOM01') is None
+
+
+def test_atomic_mode_buffers_when_rpc_is_missing(client, atomic, monkeypatch):
+    monkeypatch.setattr(atomic, 'get_client', lambda: (_Client({}, fail=True), None))
+    atomic.share_cache.put({'code': 'ATOM01', 'content_type': 'text', 'view_count': 3})
+
+    assert client.get('/api/shares/ATOM01').get_json()['view_count'] == 4
+    assert atomic.view_counter.pending('ATOM01') == 1
+
+
+def _batched(monkeypatch, application):
+    from negative_cache import NegativeLookupCache
+    from share_cache import MemoryShareBackend, ShareCache
+
+    pending = {}
+    monkeypatch.setattr(application.Config, 'SHARE_VIEW_MODE', 'batched')
+    monkeypatch.setattr(application, 'share_cache', ShareCache(MemoryShareBackend(), ttl=30))
+    monkeypatch.setattr(application, 'missing_codes', NegativeLookupCache(lambda: (None, 'unused'), ttl=30))
+    monkeypatch.setattr(application.view_counter, 'record', lambda code, count=1: pending.update({code: pending.get(code, 0) + count}))
+    monkeypatch.setattr(application.view_counter, 'pending', lambda code: pending.get(code, 0))
+    monkeypatch.setattr(application, 'get_client', lambda: (object(), None))
+
+
+def test_batched_mode_enforces_max_views_with_unflushed_views(client, monkeypatch):
+    import application
+
+    _batched(monkeypatch, application)
+    row = {'code': 'LIMIT1', 'content_type': 'text', 'text_content': 'x', 'view_count': 0, 'max_views': 1}
+    # get_share_by_code does not count views, so the database still reports 0
+    monkeypatch.setattr(application, 'rpc_get_share_by_code', lambda c, code: (dict(row), None))
+
+    statuses = [client.get('/api/shares/LIMIT1').status_code for _ in range(5)]
+    assert statuses == [200, 404, 404, 404, 404]
+
+
+def test_select_fallback_applies_serving_rules(client, monkeypatch):
+    import application
+
+    _batched(monkeypatch, application)
+    rows = {'GONE01': {'code': 'GONE01', 'content_type': 'text', 'view_count': 0, 'is_active': False},
+            'OLD001': {'code': 'OLD001', 'content_type': 'text', 'view_count': 0, 'expires_at': '2000-01-01T00:00:00+00:00'}}
+
+    class _Select:
+        def __init__(self):
+            self.code = None
+
+        def __getattr__(self, name):
+            return lambda *a, **kw: self
+
+        def eq(self, column, value):
+            self.code = value
+            return self
+
+        def execute(self):
+            return SimpleNamespace(data=[dict(rows[self.code])] if self.code in rows else [])
+
+    monkeypatch.setattr(application, 'get_client', lambda: (SimpleNamespace(table=lambda name: _Select()), None))
+    monkeypatch.setattr(application, 'rpc_get_share_by_code', lambda c, code: (None, 'get_share_by_code unavailable'))
+
+    assert client.get('/api/shares/GONE01').status_code == 404
+    assert client.get('/api/shares/OLD001').status_code == 404
+
+
+def _rpc_calls(fake):
+    return [path.rsplit('/', 1)[-1] for method, path, params in fake.requests if path.startswith('/rest/v1/rpc/')]
+
+
+def test_uncached_view_is_read_and_counted_in_one_round_trip(client, app_supabase, fake_supabase):
+    fake_supabase.insert('shares', {'code': 'ONCE01', 'content_type': 'text', 'text_content': 'x', 'max_views': 1})
+    # The first lookup also probes the open_share signature
+    client.get('/api/shares/NOPE00')
+    fake_supabase.reset_stats()
+
+    res = client.get('/api/shares/ONCE01')
+    assert res.status_code == 200 and res.get_json()['view_count'] == 1
+    assert _rpc_calls(fake_supabase) == ['open_share']
+    assert client.get('/api/shares/ONCE01').status_code == 404
+    assert fake_supabase.tables['shares'][0]['view_count'] == 1
+
+
+def test_protected_share_is_counted_only_after_the_password_check(client, app_supabase, fake_supabase):
+    from share_access import hash_share_password
+
+    fake_supabase.insert('shares', {'code': 'LOCK01', 'content_type': 'text', 'text_content': 'x', 'is_protected': True,
+                                    'password_hash': hash_share_password('pw', 'pbkdf2:sha256:1000')})
+
+    assert client.get('/api/shares/LOCK01').status_code == 403
+    assert fake_supabase.tables['shares'][0]['view_count'] == 0
+    assert client.get('/api/shares/LOCK01?password=pw').get_json()['view_count'] == 1
+    assert fake_supabase.tables['shares'][0]['view_count'] == 1
+
+
+def test_batched_mode_counts_limited_shares_in_the_database(client, monkeypatch, app_supabase, fake_supabase):
+    monkeypatch.setattr(app_supabase.Config, 'SHARE_VIEW_MODE', 'batched')
+    fake_supabase.insert('shares', {'code': 'LIMIT2', 'content_type': 'text', 'text_content': 'x', 'max_views': 2})
+
+    assert [client.get('/api/shares/LIMIT2').status_code for _ in range(3)] == [200, 200, 404]
+    assert fake_supabase.tables['shares'][0]['view_count'] == 2
+    assert app_supabase.view_counter.pending('LIMIT2') == 0
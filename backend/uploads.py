@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import secrets
+import tempfile
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore
+
+
+def sha256_stream(stream: Any, read_size: int = 64 * 1024) -> str:
+    """Hash a seekable binary stream chunk by chunk and rewind it."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    while True:
+        chunk = stream.read(read_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class UploadError(Exception):
+    """Rejected upload operation; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+# Supabase storage only accepts 6MB PATCH chunks (the last one may be shorter)
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+def _tus_request(url: str, method: str, headers: Dict[str, str], body: Optional[bytes], timeout: float) -> Any:
+    req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp
+    except urllib.error.HTTPError as he:
+        detail = he.read().decode("utf-8", "replace")[:500]
+        raise UploadError(f"Resumable upload {method} failed with {he.code}: {detail}", status=he.code)
+
+
+def tus_upload(
+    endpoint: str,
+    key: str,
+    bucket: str,
+    path: str,
+    stream: Any,
+    size: int,
+    upsert: bool = False,
+    content_type: str = "application/octet-stream",
+    chunk_size: int = TUS_CHUNK_SIZE,
+    timeout: float = 30.0,
+    retries: int = 3,
+) -> None:
+    """Upload `size` bytes of a seekable stream through the TUS protocol.
+
+    Supabase storage's /upload/resumable endpoint takes the object in
+    fixed-size PATCH requests, so no request carries more than `chunk_size`
+    bytes and `timeout` applies per chunk rather than to the whole file. A
+    chunk that fails in transit (or is rejected for an offset mismatch) is
+    resumed from the offset the server reports, up to `retries` times in a
+    row. Raises UploadError; creating an object that already exists without
+    `upsert` fails with status 409.
+    """
+    auth = {"Authorization": f"Bearer {key}", "apikey": key, "Tus-Resumable": "1.0.0"}
+    metadata = {"bucketName": bucket, "objectName": path, "contentType": content_type, "cacheControl": "3600"}
+    create = dict(auth, **{
+        "Upload-Length": str(size),
+        "Upload-Metadata": ",".join(f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}" for k, v in metadata.items()),
+        "x-upsert": "true" if upsert else "false",
+    })
+    resp = _tus_request(endpoint, "POST", create, None, timeout)
+    location = resp.headers.get("Location")
+    if not location:
+        raise UploadError("Resumable upload was not assigned a location", status=502)
+    location = urljoin(endpoint, location)
+
+    offset = 0
+    failures = 0
+    while offset < size:
+        stream.seek(offset)
+        chunk = stream.read(min(chunk_size, size - offset))
+        if not chunk:
+            raise UploadError(f"Source ended at {offset} of {size} bytes", status=500)
+        try:
+            resp = _tus_request(location, "PATCH", dict(auth, **{
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            }), chunk, timeout)
+            offset = int(resp.headers.get("Upload-Offset") or offset + len(chunk))
+            failures = 0
+        except (UploadError, OSError) as e:
+            if isinstance(e, UploadError) and e.status != 409:
+                raise
+            failures += 1
+            if failures > retries:
+                raise UploadError(f"Resumable upload stalled at {offset} of {size} bytes: {e}", status=502)
+            resp = _tus_request(location, "HEAD", auth, None, timeout)
+            offset = int(resp.headers.get("Upload-Offset") or 0)
+
+
+class UploadSpool:
+    """Disk-backed sessions for chunked, resumable uploads.
+
+    Each session is a JSON metadata file plus a `.part` file that chunks are
+    appended to, so any worker on the instance can continue an upload and no
+    chunk is ever held whole in memory. Sessions are local to the instance:
+    behind a load balancer every request of one upload must reach the same
+    instance (sticky sessions) unless `directory` is on shared storage.
+    Chunks must arrive in order: a PUT at the wrong offset is rejected with
+    the current offset so the client can resume from there.
+
+    `max_total` caps the bytes all open sessions may declare (0 = no cap) and
+    `max_per_client` the sessions one client may hold open, so a single
+    client cannot fill the disk. claim() hands a finished session to exactly
+    one caller.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = 1024 ** 3, ttl: float = 24 * 3600,
+                 read_size: int = 64 * 1024, max_total: int = 0, max_per_client: int = 0):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "codeshare-uploads")
+        self.max_size = int(max_size)
+        self.ttl = float(ttl)
+        self.read_size = int(read_size)
+        self.max_total = int(max_total)
+        self.max_per_client = int(max_per_client)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def _claimed_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.claimed")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serialize quota checks across the workers sharing the directory."""
+        with open(os.path.join(self.directory, ".lock"), "a") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _sessions(self) -> List[Dict[str, Any]]:
+        """Metadata of every open session, including ones being completed."""
+        sessions = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return sessions
+        for name in names:
+            if not name.endswith((".json", ".claimed")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as fh:
+                    sessions.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+        return sessions
+
+    def data_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def create(self, filename: str, size: int, client: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        """Start a session for `size` bytes; extra fields are stored for finalize.
+
+        `client` identifies the caller (e.g. its address) for max_per_client.
+        """
+        if size <= 0:
+            raise UploadError("Upload size must be positive")
+        if size > self.max_size:
+            raise UploadError("File too large", status=413)
+        self.sweep()
+        with self._locked():
+            sessions = self._sessions()
+            if self.max_total and sum(int(s.get("size") or 0) for s in sessions) + size > self.max_total:
+                raise UploadError("Upload storage is full, try again later", status=507)
+            if client and self.max_per_client and sum(1 for s in sessions if s.get("client") == client) >= self.max_per_client:
+                raise UploadError("Too many uploads in progress", status=429)
+            session = dict(fields)
+            session.update({
+                "upload_id": secrets.token_urlsafe(24),
+                "filename": filename,
+                "size": int(size),
+                "client": client,
+                "created_at": time.time(),
+            })
+            open(self.data_path(session["upload_id"]), "wb").close()
+            self._write_meta(session)
+        return session
+
+    def _write_meta(self, session: Dict[str, Any]) -> None:
+        path = self._meta_path(session["upload_id"])
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(session, fh)
+        os.replace(tmp, path)
+
+    def load(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Return the session with its current `offset`, or None if unknown/expired."""
+        if not upload_id or os.sep in upload_id or upload_id.startswith("."):
+            return None
+        return self._read(upload_id, self._meta_path(upload_id))
+
+    def _read(self, upload_id: str, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as fh:
+                session = json.load(fh)
+            session["offset"] = os.path.getsize(self.data_path(upload_id))
+        except (OSError, ValueError):
+            return None
+        if time.time() - float(session.get("created_at", 0)) > self.ttl:
+            self.discard(upload_id)
+            return None
+        return session
+
+    def append(self, upload_id: str, offset: int, stream: Any, length: Optional[int] = None) -> int:
+        """Append bytes read from `stream` at `offset`; returns the new offset."""
+        session = self.load(upload_id)
+        if session is None:
+            raise UploadError("Upload not found", status=404)
+        with open(self.data_path(upload_id), "ab") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            if not os.path.exists(self._meta_path(upload_id)):
+                # Claimed for completion (or discarded) while we waited
+                raise UploadError("Upload not found", status=404)
+            current = os.fstat(fh.fileno()).st_size
+            if offset != current:
+                raise UploadError("Offset mismatch", status=409, offset=current)
+            remaining = session["size"] - current
+            if length is not None and length > remaining:
+                raise UploadError("Chunk exceeds declared upload size", status=413, offset=current)
+            written = 0
+            while True:
+                chunk = stream.read(min(self.read_size, remaining - written + 1))
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > remaining:
+                    fh.truncate(current)
+                    raise UploadError("Chunk exceeds declared upload size", status=413, offset=current)
+                fh.write(chunk)
+            fh.flush()
+            return current + written
+
+    def claim(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Take a session for completion; None if unknown or already claimed.
+
+        The metadata file is renamed away, so only one caller gets the session
+        and no further chunks are accepted. Call release() to hand it back
+        (e.g. after a failed finalize) or discard() once done.
+        """
+        if not upload_id or os.sep in upload_id or upload_id.startswith("."):
+            return None
+        try:
+            # Hold the data file lock so no chunk is mid-append while claiming
+            with open(self.data_path(upload_id), "rb") as fh:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                os.rename(self._meta_path(upload_id), self._claimed_path(upload_id))
+        except OSError:
+            return None
+        session = self._read(upload_id, self._claimed_path(upload_id))
+        if session is None:
+            self.discard(upload_id)
+        return session
+
+    def release(self, upload_id: str) -> None:
+        """Return a claimed session so the client can resume or retry."""
+        try:
+            os.rename(self._claimed_path(upload_id), self._meta_path(upload_id))
+        except OSError:
+            pass
+
+    def discard(self, upload_id: str) -> None:
+        for path in (self._meta_path(upload_id), self._claimed_path(upload_id), self.data_path(upload_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def sweep(self) -> int:
+        """Remove abandoned sessions older than the TTL; returns how many."""
+        removed = 0
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            upload_id, ext = os.path.splitext(name)
+            if ext not in (".json", ".claimed"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    self.discard(upload_id)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
@@ -24,13 +24,16 @@ CREATE TABLE IF NOT EXISTS shares (
     expires_at TIMESTAMP WITH TIME ZONE,
     is_active BOOLEAN DEFAULT TRUE,
     metadata JSONB DEFAULT '{}'::jsonb,
-    language VARCHAR(50)
+    language VARCHAR(50),
+    content_digest TEXT -- SHA-256 of the uploaded file (see storage_objects)
 );
 
 -- 3. Create Indexes
 CREATE INDEX IF NOT EXISTS idx_shares_code ON shares(code);
 CREATE INDEX IF NOT EXISTS idx_shares_user_id ON shares(user_id);
 CREATE INDEX IF NOT EXISTS idx_shares_created_at ON shares(created_at);
+-- Keyset pagination of a user's shares: ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_shares_user_created_id ON shares(user_id, created_at DESC, id DESC);
 
 -- 4. Row Level Security (RLS)
 ALTER TABLE shares ENABLE ROW LEVEL SECURITY;
@@ -60,79 +63,105 @@ ON shares FOR UPDATE
 TO authenticated 
 USING (auth.uid() = user_id);
 
--- 5. RPC Function: get_share_by_code
--- This function retrieves the share and increments the view count atomically.
+-- 5. RPC Functions: get_share_by_code / view_share
+-- get_share_by_code is a read-only lookup that applies the serving rules
+-- (active, not expired, under max_views). Views are counted separately, either
+-- one at a time by view_share or in batches by increment_share_views (see
+-- 7b), so a read is never counted twice.
 DROP FUNCTION IF EXISTS get_share_by_code(text) CASCADE;
 DROP FUNCTION IF EXISTS get_share_by_code(_code text) CASCADE;
 CREATE OR REPLACE FUNCTION get_share_by_code(share_code TEXT)
-RETURNS TABLE (
-    id BIGINT,
-    code VARCHAR,
-    content_type VARCHAR,
-    text_content TEXT,
-    file_name VARCHAR,
-    file_size BIGINT,
-    file_url TEXT,
-    is_protected BOOLEAN,
-    password_hash TEXT,
-    view_count INTEGER,
-    max_views INTEGER,
-    created_at TIMESTAMP WITH TIME ZONE,
-    expires_at TIMESTAMP WITH TIME ZONE,
-    is_active BOOLEAN,
-    metadata JSONB,
-    language VARCHAR,
-    user_id UUID
-)
+RETURNS SETOF shares
+LANGUAGE sql
+STABLE
+SECURITY DEFINER -- Runs with privileges of the creator (bypass RLS)
+AS $$
+    SELECT s.*
+    FROM shares s
+    WHERE s.code = UPPER(share_code)
+      AND s.is_active = TRUE
+      AND (s.expires_at IS NULL OR s.expires_at > NOW())
+      AND (s.max_views IS NULL OR s.view_count < s.max_views);
+$$;
+
+-- 5b. Content-addressed storage objects
+-- Uploaded files are stored once per SHA-256 digest; shares reference them
+-- through shares.content_digest and ref_count tracks how many do. `ready`
+-- is set once the file is actually in storage.
+CREATE TABLE IF NOT EXISTS storage_objects (
+    digest TEXT PRIMARY KEY,
+    bucket TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size BIGINT,
+    ref_count INTEGER NOT NULL DEFAULT 1,
+    ready BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Existing deployments: rows from before the flag were uploaded synchronously
+ALTER TABLE storage_objects ADD COLUMN IF NOT EXISTS ready BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE storage_objects ALTER COLUMN ready SET DEFAULT FALSE;
+
+ALTER TABLE storage_objects ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS idx_shares_content_digest ON shares(content_digest);
+
+-- Register a reference to an object, inserting it on first sight.
+-- `created` is true when the caller registered it and must upload it. A
+-- caller that gets `ready` = false for an existing row must upload it too
+-- (overwriting with the same bytes): the first uploader has not finished.
+DROP FUNCTION IF EXISTS claim_storage_object(TEXT, TEXT, TEXT, BIGINT);
+CREATE OR REPLACE FUNCTION claim_storage_object(p_digest TEXT, p_bucket TEXT, p_path TEXT, p_size BIGINT)
+RETURNS TABLE (bucket TEXT, path TEXT, created BOOLEAN, ready BOOLEAN)
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    INSERT INTO storage_objects AS o (digest, bucket, path, size)
+    VALUES (p_digest, p_bucket, p_path, p_size)
+    ON CONFLICT (digest) DO UPDATE SET ref_count = o.ref_count + 1
+    RETURNING o.bucket, o.path, (xmax = 0) AS created, o.ready;
+$$;
+
+-- Record that the object's file is in storage.
+CREATE OR REPLACE FUNCTION mark_storage_object_ready(p_digest TEXT)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    UPDATE storage_objects SET ready = TRUE WHERE digest = p_digest;
+$$;
+
+-- Drop a reference; returns the remaining count (0 means the object row was
+-- deleted and the caller should remove the file from storage, NULL that the
+-- digest is unknown).
+CREATE OR REPLACE FUNCTION release_storage_object(p_digest TEXT)
+RETURNS INTEGER
 LANGUAGE plpgsql
-SECURITY DEFINER -- Runs with privileges of the creator (bypass RLS for the update)
+SECURITY DEFINER
 AS $$
+DECLARE
+    remaining INTEGER;
 BEGIN
-    -- Increment view count
-    UPDATE shares 
-    SET view_count = view_count + 1 
-    WHERE code = UPPER(share_code) 
-    AND (expires_at IS NULL OR expires_at > NOW())
-    AND (max_views IS NULL OR view_count < max_views)
-    AND is_active = TRUE;
-    
-    -- Return the share record
-    RETURN QUERY
-    SELECT 
-        s.id,
-        s.code,
-        s.content_type,
-        s.text_content,
-        s.file_name,
-        s.file_size,
-        s.file_url,
-        s.is_protected,
-        s.password_hash,
-        s.view_count,
-        s.max_views,
-        s.created_at,
-        s.expires_at,
-        s.is_active,
-        s.metadata,
-        s.language
-    FROM shares s
-    WHERE s.code = UPPER(share_code) 
-    AND (s.expires_at IS NULL OR s.expires_at > NOW())
-    AND (s.max_views IS NULL OR s.view_count <= s.max_views) -- Allow viewing the last one that hit the limit? Or strictly < ? 
-    -- Usually if view_count was incremented to max_views, it's still viewable this time.
-    -- If view_count was ALREADY max_views, the UPDATE above wouldn't happen (if we added check there).
-    -- Let's refine the logic:
-    -- We want to allow access if it WAS valid before this call.
-    -- The UPDATE increments. So if max is 5, and current is 4. Update makes it 5. Return it.
-    -- Next call: current is 5. Update condition "view_count < max_views" (5 < 5) is False. No update.
-    -- Select condition: we should probably return it if it's still valid or if we just viewed it.
-    -- But if no update happened, maybe we shouldn't return it?
-    -- Let's keep it simple: Return if is_active and not expired. The view count limit is a soft limit or hard limit?
-    -- If hard limit, we should hide it.
-    AND is_active = TRUE;
+    UPDATE storage_objects SET ref_count = ref_count - 1
+    WHERE digest = p_digest
+    RETURNING ref_count INTO remaining;
+    IF remaining IS NOT NULL AND remaining <= 0 THEN
+        DELETE FROM storage_objects WHERE digest = p_digest;
+        RETURN 0;
+    END IF;
+    RETURN remaining;
 END;
 $$;
 
+-- Only the backend (service role) may manage object references; SECURITY
+-- DEFINER functions are otherwise callable with the public anon key
+REVOKE EXECUTE ON FUNCTION claim_storage_object(TEXT, TEXT, TEXT, BIGINT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION mark_storage_object_ready(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION release_storage_object(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION claim_storage_object(TEXT, TEXT, TEXT, BIGINT) TO service_role;
+GRANT EXECUTE ON FUNCTION mark_storage_object_ready(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION release_storage_object(TEXT) TO service_role;
+
 -- 6. Storage Bucket Setup (Instructions)
 -- You typically need to create the bucket via the Supabase Dashboard.
 -- Bucket Name: 'shared-files'
@@ -155,6 +184,7 @@ CREATE TABLE IF NOT EXISTS activities (
 -- Indexes for activities
 CREATE INDEX IF NOT EXISTS idx_activities_user_id ON activities(user_id);
 CREATE INDEX IF NOT EXISTS idx_activities_created_at ON activities(created_at);
+CREATE INDEX IF NOT EXISTS idx_activities_share_id ON activities(share_id, created_at);
 
 -- RLS for activities
 ALTER TABLE activities ENABLE ROW LEVEL SECURITY;
@@ -169,3 +199,266 @@ USING (auth.uid() = user_id);
 -- We'll rely on backend using service role or explicit insert policies if needed.
 -- For now, allow authenticated users to insert their own activities (e.g. if we moved logic to frontend, but we are doing it in backend)
 
+
+-- 7b. View accounting RPCs (need the activities table)
+-- Count one view and return the updated row in a single statement. The
+-- serving rules are checked in the UPDATE itself, so concurrent readers can
+-- neither lose increments nor push view_count past max_views. No row means
+-- the share is missing, inactive, expired or used up.
+CREATE OR REPLACE FUNCTION view_share(share_code TEXT)
+RETURNS SETOF shares
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH viewed AS (
+        UPDATE shares s
+        SET view_count = s.view_count + 1
+        WHERE s.code = UPPER(share_code)
+          AND s.is_active = TRUE
+          AND (s.expires_at IS NULL OR s.expires_at > NOW())
+          AND (s.max_views IS NULL OR s.view_count < s.max_views)
+        RETURNING s.*
+    ), logged AS (
+        INSERT INTO activities (user_id, share_id, action_type, details)
+        SELECT user_id, id, 'VIEW', jsonb_build_object('count', 1)
+        FROM viewed
+        RETURNING 1
+    )
+    SELECT * FROM viewed;
+$$;
+
+-- view_shares
+-- view_share for a batch of codes: counts one view for each code that passes
+-- the same serving rules and returns only the rows it counted.
+CREATE OR REPLACE FUNCTION view_shares(share_codes TEXT[])
+RETURNS SETOF shares
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH viewed AS (
+        UPDATE shares s
+        SET view_count = s.view_count + 1
+        WHERE s.code IN (SELECT UPPER(c) FROM unnest(share_codes) AS c)
+          AND s.is_active = TRUE
+          AND (s.expires_at IS NULL OR s.expires_at > NOW())
+          AND (s.max_views IS NULL OR s.view_count < s.max_views)
+        RETURNING s.*
+    ), logged AS (
+        INSERT INTO activities (user_id, share_id, action_type, details)
+        SELECT user_id, id, 'VIEW', jsonb_build_object('count', 1)
+        FROM viewed
+        RETURNING 1
+    )
+    SELECT * FROM viewed;
+$$;
+
+-- open_share
+-- Read a share for viewing in one round trip: unprotected shares are counted
+-- exactly like view_share; protected ones are returned uncounted so the
+-- backend can check the password first and then call view_share.
+CREATE OR REPLACE FUNCTION open_share(share_code TEXT)
+RETURNS SETOF shares
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH viewed AS (
+        UPDATE shares s
+        SET view_count = s.view_count + 1
+        WHERE s.code = UPPER(share_code)
+          AND s.is_protected = FALSE
+          AND s.is_active = TRUE
+          AND (s.expires_at IS NULL OR s.expires_at > NOW())
+          AND (s.max_views IS NULL OR s.view_count < s.max_views)
+        RETURNING s.*
+    ), logged AS (
+        INSERT INTO activities (user_id, share_id, action_type, details)
+        SELECT user_id, id, 'VIEW', jsonb_build_object('count', 1)
+        FROM viewed
+        RETURNING 1
+    )
+    SELECT * FROM viewed
+    UNION ALL
+    SELECT * FROM shares s
+    WHERE s.code = UPPER(share_code)
+      AND s.is_protected = TRUE
+      AND s.is_active = TRUE
+      AND (s.expires_at IS NULL OR s.expires_at > NOW())
+      AND (s.max_views IS NULL OR s.view_count < s.max_views);
+$$;
+
+-- increment_share_views
+-- Applies view increments buffered by the backend in a single statement and
+-- logs them as VIEW activities (details.count) for the analytics timeline.
+CREATE OR REPLACE FUNCTION increment_share_views(share_codes TEXT[], deltas INTEGER[])
+RETURNS INTEGER
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH updated AS (
+        UPDATE shares s
+        SET view_count = s.view_count + d.delta
+        FROM unnest(share_codes, deltas) AS d(code, delta)
+        WHERE s.code = UPPER(d.code)
+        RETURNING s.id, s.user_id, d.delta
+    ), logged AS (
+        INSERT INTO activities (user_id, share_id, action_type, details)
+        SELECT user_id, id, 'VIEW', jsonb_build_object('count', delta)
+        FROM updated
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+-- View counts gate max_views and feed analytics: only the backend may move them
+REVOKE EXECUTE ON FUNCTION view_share(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION open_share(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION view_shares(TEXT[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION increment_share_views(TEXT[], INTEGER[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION view_share(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION open_share(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION view_shares(TEXT[]) TO service_role;
+GRANT EXECUTE ON FUNCTION increment_share_views(TEXT[], INTEGER[]) TO service_role;
+
+
+-- 7c. Janitor: purge expired or exhausted shares
+-- Rows removed by the backend janitor can optionally be kept here first.
+CREATE TABLE IF NOT EXISTS shares_archive (LIKE shares INCLUDING DEFAULTS);
+ALTER TABLE shares_archive ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE shares_archive ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS idx_shares_expires_at ON shares(expires_at) WHERE expires_at IS NOT NULL;
+
+-- Claim up to p_limit expired or exhausted shares (and deactivated ones only
+-- with p_include_inactive), archive them when asked, detach their activities
+-- and delete them. SKIP LOCKED lets several backend workers run the janitor
+-- at once without waiting on each other. Returns what the caller needs to
+-- clean up storage.
+DROP FUNCTION IF EXISTS purge_expired_shares(INTEGER, BOOLEAN);
+CREATE OR REPLACE FUNCTION purge_expired_shares(
+    p_limit INTEGER DEFAULT 500,
+    p_archive BOOLEAN DEFAULT FALSE,
+    p_include_inactive BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (code VARCHAR, file_url TEXT, content_digest TEXT)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+#variable_conflict use_column
+DECLARE
+    doomed BIGINT[];
+BEGIN
+    SELECT array_agg(t.id) INTO doomed
+    FROM (
+        SELECT s.id
+        FROM shares s
+        WHERE (s.expires_at IS NOT NULL AND s.expires_at <= NOW())
+           OR (s.max_views IS NOT NULL AND s.view_count >= s.max_views)
+           OR (p_include_inactive AND s.is_active = FALSE)
+        ORDER BY s.id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) t;
+
+    IF doomed IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF p_archive THEN
+        INSERT INTO shares_archive
+        SELECT s.*, NOW() FROM shares s WHERE s.id = ANY(doomed);
+    END IF;
+
+    UPDATE activities SET share_id = NULL WHERE share_id = ANY(doomed);
+
+    RETURN QUERY
+    DELETE FROM shares s WHERE s.id = ANY(doomed)
+    RETURNING s.code, s.file_url, s.content_digest;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION purge_expired_shares(INTEGER, BOOLEAN, BOOLEAN) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION purge_expired_shares(INTEGER, BOOLEAN, BOOLEAN) TO service_role;
+
+-- 8. Analytics RPCs
+-- Aggregate per-user share statistics in the database so the API never
+-- pulls whole share rows (including text_content) just to count them.
+CREATE OR REPLACE FUNCTION get_user_share_stats(p_user_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT jsonb_build_object(
+        'total_shares', COUNT(*),
+        'total_views', COALESCE(SUM(view_count), 0)
+    )
+    FROM shares
+    WHERE user_id = p_user_id;
+$$;
+
+CREATE OR REPLACE FUNCTION get_user_share_analytics(
+    p_user_id UUID,
+    p_top_n INTEGER DEFAULT 5,
+    p_recent_days INTEGER DEFAULT 7,
+    p_history_days INTEGER DEFAULT 30
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    WITH mine AS (
+        SELECT id, code, content_type, file_name, COALESCE(view_count, 0) AS view_count, created_at
+        FROM shares
+        WHERE user_id = p_user_id
+    ), days AS (
+        SELECT generate_series(
+            (NOW() AT TIME ZONE 'UTC')::date - (p_history_days - 1),
+            (NOW() AT TIME ZONE 'UTC')::date,
+            INTERVAL '1 day'
+        )::date AS day
+    ), views AS (
+        SELECT (a.created_at AT TIME ZONE 'UTC')::date AS day,
+               SUM(COALESCE((a.details->>'count')::INTEGER, 1)) AS views
+        FROM activities a
+        JOIN mine m ON m.id = a.share_id
+        WHERE a.action_type = 'VIEW'
+          AND a.created_at >= NOW() - make_interval(days => p_history_days)
+        GROUP BY 1
+    )
+    SELECT jsonb_build_object(
+        'total_shares', (SELECT COUNT(*) FROM mine),
+        'total_views', (SELECT COALESCE(SUM(view_count), 0) FROM mine),
+        'recent_shares', (
+            SELECT COUNT(*) FROM mine
+            WHERE created_at > NOW() - make_interval(days => p_recent_days)
+        ),
+        'content_types', COALESCE((
+            SELECT jsonb_object_agg(content_type, n)
+            FROM (
+                SELECT COALESCE(content_type, 'unknown') AS content_type, COUNT(*) AS n
+                FROM mine GROUP BY 1
+            ) ct
+        ), '{}'::jsonb),
+        'top_shares', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'code', code,
+                'views', view_count,
+                'type', content_type,
+                'name', COALESCE(file_name, 'Text Share')
+            ) ORDER BY view_count DESC)
+            FROM (SELECT * FROM mine ORDER BY view_count DESC LIMIT p_top_n) top
+        ), '[]'::jsonb),
+        'views_by_date', (
+            SELECT jsonb_object_agg(to_char(d.day, 'YYYY-MM-DD'), COALESCE(v.views, 0))
+            FROM days d LEFT JOIN views v ON v.day = d.day
+        )
+    );
+$$;
+
+-- The backend calls these with the service role after verifying the user's
+-- token; they take any user id, so they must not be callable with the anon key
+REVOKE EXECUTE ON FUNCTION get_user_share_stats(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION get_user_share_analytics(UUID, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_user_share_stats(UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION get_user_share_analytics(UUID, INTEGER, INTEGER, INTEGER) TO service_role;
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react';
 import { Card } from '@/components/ui/card';
+import { Button } from '@/components/ui/button';
 import { apiService } from '@/services/apiService';
 import type { ActivityItem } from '@/services/types';
 import { Activity } from 'lucide-react';
@@ -9,6 +10,8 @@ export function ActivityFeed() {
     const [activities, setActivities] = useState<ActivityItem[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         const fetchActivity = async () => {
@@ -17,6 +20,7 @@ export function ActivityFeed() {
             try {
                 const data = await apiService.getMyActivity();
                 setActivities(data.activities);
+                setNextCursor(data.next_cursor ?? null);
             } catch (e) {
                 console.error('Failed to fetch activity:', e);
                 setError(e instanceof Error ? e.message : 'Failed to load activity');
@@ -28,6 +32,20 @@ export function ActivityFeed() {
         fetchActivity();
     }, []);
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const data = await apiService.getMyActivity({ cursor: nextCursor });
+            setActivities((prev) => [...prev, ...data.activities]);
+            setNextCursor(data.next_cursor ?? null);
+        } catch (e) {
+            console.error('Failed to fetch more activity:', e);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return (
             <div className="bg-card rounded-xl border shadow-sm p-8">
@@ -98,6 +116,13 @@ export function ActivityFeed() {
                     );
                 })}
             </div>
+            {nextCursor && (
+                <div className="mt-6 flex justify-center">
+                    <Button variant="outline" size="sm" onClick={loadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </Button>
+                </div>
+            )}
         </div>
     );
 }
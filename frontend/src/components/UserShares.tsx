@@ -11,6 +11,8 @@ export const UserShares = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [shares, setShares] = useState<UserShare[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [previewShare, setPreviewShare] = useState<UserShare | null>(null);
   const [previewUrl, setPreviewUrl] = useState<string | null>(null);
   const { toast } = useToast();
@@ -22,6 +24,7 @@ export const UserShares = () => {
         const data = await apiService.getMyShares();
         if (cancelled) return;
         setShares(data.shares || []);
+        setNextCursor(data.next_cursor ?? null);
       } catch (e) {
         if (cancelled) return;
         setError(e instanceof Error ? e.message : "Failed to load your uploads");
@@ -59,6 +62,24 @@ export const UserShares = () => {
     );
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data = await apiService.getMyShares({ cursor: nextCursor });
+      setShares((prev) => [...prev, ...(data.shares || [])]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (e) {
+      toast({
+        title: "Could not load more uploads",
+        description: e instanceof Error ? e.message : "Please try again",
+        variant: "destructive",
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatSize = (size: number | null | undefined) => {
     if (!size || size <= 0) return "-";
     if (size < 1024) return `${size} B`;
@@ -224,6 +245,14 @@ export const UserShares = () => {
         </table>
       </div>
 
+      {nextCursor && (
+        <div className="mt-4 flex justify-center">
+          <Button variant="outline" size="sm" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? "Loading..." : "Load more"}
+          </Button>
+        </div>
+      )}
+
       <Dialog open={!!previewShare} onOpenChange={(open) => !open && closePreview()}>
         <DialogContent className="max-w-3xl max-h-[80vh] overflow-y-auto">
           <DialogHeader>
@@ -1,6 +1,6 @@
 /* Frontend API service to talk to our Flask backend */
 
-import type { ShareCreateResponse, ShareRetrieveResponse, UserShare, AnalyticsData, ActivityResponse } from "./types";
+import type { DashboardResponse, DashboardSection, ShareBatchResponse, ShareCreateResponse, ShareRetrieveResponse, ShareSummaryResponse, ShareContentResponse, UserShare, AnalyticsData, ActivityResponse, PageOptions } from "./types";
 import { supabase } from "@/integrations/supabase/client";
 
 export const API_BASE: string = (import.meta as any).env?.VITE_API_BASE_URL || window.location.origin;
@@ -32,6 +32,13 @@ async function handleResponse<T>(res: Response): Promise<T> {
   return res.json() as Promise<T>;
 }
 
+function withPage(path: string, page?: PageOptions): string {
+  const url = new URL(`${API_BASE}${path}`);
+  if (page?.limit) url.searchParams.set("limit", String(page.limit));
+  if (page?.cursor) url.searchParams.set("cursor", page.cursor);
+  return url.toString();
+}
+
 async function getAuthHeaders(): Promise<HeadersInit> {
   const {
     data: { session },
@@ -40,17 +47,86 @@ async function getAuthHeaders(): Promise<HeadersInit> {
   return { Authorization: `Bearer ${session.access_token}` };
 }
 
+// Sections asked for in the same tick go out as one /api/me/dashboard request
+let dashboardBatch: { sections: Set<DashboardSection>; promise: Promise<DashboardResponse> } | null = null;
+
+function loadDashboardSection<K extends DashboardSection>(section: K): Promise<NonNullable<DashboardResponse[K]>> {
+  if (!dashboardBatch) {
+    const batch = { sections: new Set<DashboardSection>(), promise: null as unknown as Promise<DashboardResponse> };
+    batch.promise = new Promise<void>((resolve) => setTimeout(resolve, 0)).then(() => {
+      dashboardBatch = null;
+      return apiService.getDashboard(Array.from(batch.sections));
+    });
+    dashboardBatch = batch;
+  }
+  dashboardBatch.sections.add(section);
+  return dashboardBatch.promise.then((body) => {
+    const value = body[section];
+    if (value === undefined) throw new Error(body.errors?.[section] || `Failed to load ${section}`);
+    return value as NonNullable<DashboardResponse[K]>;
+  });
+}
+
+async function fetchShare<T extends { access_token?: string }>(
+  code: string,
+  suffix: string,
+  password?: string,
+  params?: Record<string, string>,
+): Promise<T> {
+  const url = new URL(`${API_BASE}/api/shares/${encodeURIComponent(code)}${suffix}`);
+  if (password) {
+    url.searchParams.set("password", password);
+  }
+  for (const [key, value] of Object.entries(params || {})) {
+    url.searchParams.set(key, value);
+  }
+  // Reuse the access token from an earlier password check instead of re-sending it
+  const tokenKey = `share-token:${code.toUpperCase()}`;
+  const token = sessionStorage.getItem(tokenKey);
+  const res = await fetch(url.toString(), token ? { headers: { "X-Share-Token": token } } : undefined);
+  const share = await handleResponse<T>(res);
+  if (share.access_token) {
+    sessionStorage.setItem(tokenKey, share.access_token);
+  }
+  return share;
+}
+
 export const apiService = {
   async getShareByCode(code: string, password?: string): Promise<ShareRetrieveResponse> {
-    const url = new URL(`${API_BASE}/api/shares/${encodeURIComponent(code)}`);
-    if (password) {
-      url.searchParams.set("password", password);
+    return fetchShare<ShareRetrieveResponse>(code, "", password);
+  },
+
+  /** Share metadata without the text body; does not count a view. */
+  async getShareSummary(code: string, password?: string): Promise<ShareSummaryResponse> {
+    return fetchShare<ShareSummaryResponse>(code, "", password, { content: "0" });
+  },
+
+  async getShareContent(code: string, password?: string): Promise<ShareContentResponse> {
+    return fetchShare<ShareContentResponse>(code, "/content", password);
+  },
+
+  /** Resolve many codes in one request; per-code results come back in order. */
+  async getSharesBatch(codes: string[], opts?: { passwords?: Record<string, string>; content?: boolean }): Promise<ShareBatchResponse> {
+    const tokens: Record<string, string> = {};
+    for (const code of codes) {
+      const token = sessionStorage.getItem(`share-token:${code.toUpperCase()}`);
+      if (token) tokens[code.toUpperCase()] = token;
     }
-    const res = await fetch(url.toString());
-    return handleResponse<ShareRetrieveResponse>(res);
+    const res = await fetch(`${API_BASE}/api/shares/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ codes, passwords: opts?.passwords, tokens, content: opts?.content ?? true }),
+    });
+    const batch = await handleResponse<ShareBatchResponse>(res);
+    for (const result of batch.results) {
+      if (result.status === 'ok' && result.share.access_token) {
+        sessionStorage.setItem(`share-token:${result.code}`, result.share.access_token);
+      }
+    }
+    return batch;
   },
 
-  async createShare(opts: { text?: string; file?: File; password?: string; metadata?: Record<string, any> }): Promise<ShareCreateResponse> {
+  async createShare(opts: { text?: string; file?: File; password?: string; metadata?: Record<string, any>; expiresInHours?: number }): Promise<ShareCreateResponse> {
     // Prefer multipart when there's a file; else JSON
     const authHeaders = await getAuthHeaders();
     if (opts.file) {
@@ -65,6 +141,9 @@ export const apiService = {
       if (opts.metadata) {
         form.append("metadata", JSON.stringify(opts.metadata));
       }
+      if (opts.expiresInHours) {
+        form.append("expires_in_hours", String(opts.expiresInHours));
+      }
       const res = await fetch(`${API_BASE}/api/shares`, {
         method: "POST",
         body: form,
@@ -80,6 +159,9 @@ export const apiService = {
       if (opts.metadata) {
         body.metadata = opts.metadata;
       }
+      if (opts.expiresInHours) {
+        body.expires_in_hours = opts.expiresInHours;
+      }
       const res = await fetch(`${API_BASE}/api/shares`, {
         method: 'POST',
         headers: {
@@ -103,39 +185,41 @@ export const apiService = {
     return res.blob();
   },
 
-  async getMyStats(): Promise<{ total_shares: number; total_views: number }> {
+  async getDashboard(sections?: DashboardSection[]): Promise<DashboardResponse> {
     const authHeaders = await getAuthHeaders();
-    const res = await fetch(`${API_BASE}/api/me/stats`, {
-      method: "GET",
+    const url = new URL(`${API_BASE}/api/me/dashboard`);
+    if (sections?.length) url.searchParams.set('sections', sections.join(','));
+    const res = await fetch(url.toString(), {
+      method: 'GET',
       headers: authHeaders,
       credentials: 'include',
     });
-    return handleResponse<{ total_shares: number; total_views: number }>(res);
+    return handleResponse<DashboardResponse>(res);
   },
 
-  async getMyShares(): Promise<{ shares: UserShare[] }> {
+  async getMyStats(): Promise<{ total_shares: number; total_views: number }> {
+    return loadDashboardSection('stats');
+  },
+
+  async getMyShares(page?: PageOptions): Promise<{ shares: UserShare[]; next_cursor?: string | null }> {
+    if (!page?.cursor && !page?.limit) return loadDashboardSection('shares');
     const authHeaders = await getAuthHeaders();
-    const res = await fetch(`${API_BASE}/api/me/shares`, {
+    const res = await fetch(withPage('/api/me/shares', page), {
       method: 'GET',
       headers: authHeaders,
       credentials: 'include',
     });
-    return handleResponse<{ shares: UserShare[] }>(res);
+    return handleResponse<{ shares: UserShare[]; next_cursor?: string | null }>(res);
   },
 
   async getMyAnalytics(): Promise<AnalyticsData> {
-    const authHeaders = await getAuthHeaders();
-    const res = await fetch(`${API_BASE}/api/me/analytics`, {
-      method: 'GET',
-      headers: authHeaders,
-      credentials: 'include',
-    });
-    return handleResponse<AnalyticsData>(res);
+    return loadDashboardSection('analytics');
   },
 
-  async getMyActivity(): Promise<ActivityResponse> {
+  async getMyActivity(page?: PageOptions): Promise<ActivityResponse> {
+    if (!page?.cursor && !page?.limit) return loadDashboardSection('activity');
     const authHeaders = await getAuthHeaders();
-    const res = await fetch(`${API_BASE}/api/me/activity`, {
+    const res = await fetch(withPage('/api/me/activity', page), {
       method: 'GET',
       headers: authHeaders,
       credentials: 'include',
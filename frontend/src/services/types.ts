@@ -1,7 +1,6 @@
 // Types aligned with backend/application.py response shapes
 
 export interface ShareRetrieveResponse {
-  id: string;
   code: string;
   content_type: 'text' | 'file';
   text_content: string | null;
@@ -12,6 +11,31 @@ export interface ShareRetrieveResponse {
   expires_at: string;
   max_views: number | null;
   view_count: number;
+  language?: string | null;
+  is_protected?: boolean;
+  locked?: boolean;
+  access_token?: string;
+}
+
+export type ShareSummaryResponse = Omit<ShareRetrieveResponse, 'text_content'> & {
+  content_length: number;
+};
+
+export type ShareBatchResult =
+  | { code: string; status: 'ok'; share: ShareRetrieveResponse | ShareSummaryResponse }
+  | { code: string; status: 'locked'; locked: true; error: string }
+  | { code: string; status: 'not_found'; error: string };
+
+export interface ShareBatchResponse {
+  results: ShareBatchResult[];
+}
+
+export interface ShareContentResponse {
+  code: string;
+  content_type: 'text' | 'file';
+  text_content: string | null;
+  language?: string | null;
+  access_token?: string;
 }
 
 export interface ShareCreateResponse {
@@ -22,6 +46,7 @@ export interface ShareCreateResponse {
   file_name: string | null;
   file_size: number | null;
   file_url: string | null;
+  expires_at?: string | null;
   row?: unknown;
 }
 
@@ -78,4 +103,20 @@ export interface ActivityItem {
 
 export interface ActivityResponse {
   activities: ActivityItem[];
+  next_cursor?: string | null;
+}
+
+export interface PageOptions {
+  limit?: number;
+  cursor?: string | null;
+}
+
+export type DashboardSection = 'stats' | 'shares' | 'analytics' | 'activity';
+
+export interface DashboardResponse {
+  stats?: { total_shares: number; total_views: number };
+  shares?: { shares: UserShare[]; next_cursor?: string | null };
+  analytics?: AnalyticsData;
+  activity?: ActivityResponse;
+  errors?: Partial<Record<DashboardSection, string>>;
 }